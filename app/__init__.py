@@ -8,11 +8,18 @@ from datetime import timedelta
 import os
 from app.routes import auth_bp, appointment_bp, medical_bp, superadmin_bp, patient_bp, doctor_bp, hospital_bp, lab_bp, pharmacy_bp, prescription_bp
 from flask_cors import CORS
+from app.utils.json_provider import ORJSONProvider
+from app.utils.replicas import ReplicaRouter
+from app.utils.prescription_feed import init_prescription_feed
+from app.cli import register_commands
 
 
 bcrypt = Bcrypt()
 jwt = JWTManager()
 
+# Frontend origin allowed by CORS (also used by the ASGI mode in app/asgi.py)
+CORS_ORIGINS = "http://localhost:5173"
+
 # # Fix for 422 "Subject must be a string"
 # @jwt.user_identity_loader
 # def user_identity_lookup(identity):
@@ -54,16 +61,19 @@ def create_superadmin_if_needed():
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = ORJSONProvider(app)
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
 
     # Initialize db and migrations
     db.init_app(app)
+    if app.config.get("SQLALCHEMY_BINDS"):
+        app.extensions["replica_router"] = ReplicaRouter.from_app(app)
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     jwt.init_app(app)
 
     # CORS(app, supports_credentials=True)
-    CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}}, supports_credentials=True)
+    CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}}, supports_credentials=True)
 
 
 
@@ -79,11 +89,19 @@ def create_app():
     app.register_blueprint(pharmacy_bp)
     app.register_blueprint(prescription_bp)
 
+    register_commands(app)
 
-    # Ensure SuperAdmin exists
+    # Ensure SuperAdmin exists; start the prescription feed
     with app.app_context():
         db.create_all()
         create_superadmin_if_needed()
+        init_prescription_feed(app, db.engine)
+
+    # Appointment reminders; safe to enable in every worker, only the lock holder schedules
+    if app.config["REMINDER_SCHEDULER_ENABLED"]:
+        from app.utils.reminders import ReminderScheduler
+        app.extensions["reminder_scheduler"] = ReminderScheduler(app)
+        app.extensions["reminder_scheduler"].start()
 
     #  Close sessions after each request
     @app.teardown_appcontext
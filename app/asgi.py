@@ -0,0 +1,136 @@
+"""Optional ASGI serving mode.
+
+The hot read endpoints in app/async_routes.py run on the event loop over the async
+engine, so a single worker keeps serving while those requests wait on Postgres.
+Every other request is handed to the regular Flask app through asgiref's WSGI adapter.
+Handlers that return an async generator (the prescription feed stream) are sent as a
+streaming text/event-stream response, which parks a coroutine per client instead of a thread.
+
+Run with:  uvicorn asgi:application --workers 1
+"""
+import asyncio
+import inspect
+import re
+from contextlib import suppress
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import MultiDict
+
+from app import create_app, CORS_ORIGINS
+from app.async_db import init_async_db, dispose_async_db
+from app.async_routes import ASYNC_ROUTES
+from app.utils.email_utils import close_async_client
+
+
+class AsyncRequestContext:
+    """Per-request state handed to async handlers (scope, query args, session factory, auth claims)."""
+
+    def __init__(self, scope, flask_app, session_factory):
+        self.scope = scope
+        self.args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        self.flask_app = flask_app
+        self.session = session_factory
+        self.user_id = None
+        self.role = None
+        self.claims = {}
+
+
+class AsyncDispatcher:
+    def __init__(self, flask_app, routes=ASYNC_ROUTES):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.routes = [(re.compile(pattern), handler) for pattern, handler in routes]
+
+    def match(self, path):
+        for pattern, handler in self.routes:
+            m = pattern.fullmatch(path)
+            if m:
+                return handler, {k: int(v) for k, v in m.groupdict().items()}
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            handler, params = self.match(scope["path"])
+            if handler:
+                ctx = AsyncRequestContext(scope, self.flask_app, init_async_db())
+                payload, status = await handler(ctx, **params)
+                if inspect.isasyncgen(payload):
+                    return await self.send_stream(scope, receive, send, payload, status)
+                return await self.send_json(scope, send, payload, status)
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                init_async_db()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await dispose_async_db()
+                await close_async_client()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def send_json(self, scope, send, payload, status):
+        # Encode with the Flask app's JSON provider so bodies match the sync path byte for byte
+        body = self.flask_app.json.response(payload).get_data()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + self.cors_headers(scope)
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def send_stream(self, scope, receive, send, chunks, status):
+        """Send each chunk (str) as it is produced, until the generator ends or the client goes away."""
+        headers = [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ] + self.cors_headers(scope)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            while True:
+                chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    with suppress(asyncio.CancelledError, StopAsyncIteration):
+                        await chunk
+                    return
+                try:
+                    body = chunk.result()
+                except StopAsyncIteration:
+                    break
+                await send({"type": "http.response.body", "body": body.encode(), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+            await chunks.aclose()
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    def cors_headers(scope):
+        origin = dict(scope.get("headers", [])).get(b"origin", b"").decode("latin-1")
+        if origin != CORS_ORIGINS:
+            return []
+        return [
+            (b"access-control-allow-origin", origin.encode("latin-1")),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+
+
+def create_asgi_app():
+    return AsyncDispatcher(create_app())
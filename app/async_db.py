@@ -0,0 +1,43 @@
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from .config import Config
+
+# Async engine used by the optional ASGI serving mode (see app/asgi.py).
+# The sync Flask app keeps using app.db; this engine only serves the async read endpoints.
+
+def async_database_url(url):
+    """Map the sync DATABASE_URL onto its async driver (psycopg 3 / aiosqlite)."""
+    if not url:
+        return url
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+psycopg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def create_engine_for(url, options=None):
+    options = dict(Config.SQLALCHEMY_ENGINE_OPTIONS if options is None else options)
+    return create_async_engine(async_database_url(url), **options)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+
+def init_async_db(url=None, options=None):
+    """Create the async engine and session factory once per process."""
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        async_engine = create_engine_for(url or Config.SQLALCHEMY_DATABASE_URI, options)
+        AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    return AsyncSessionLocal
+
+
+async def dispose_async_db():
+    global async_engine, AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    AsyncSessionLocal = None
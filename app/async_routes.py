@@ -0,0 +1,335 @@
+"""Async versions of the hot read endpoints, served by the optional ASGI mode (app/asgi.py).
+
+Each handler mirrors the response of its sync Flask counterpart so clients can't tell
+which deployment answered. Queries eager-load what they serialize: lazy loads are not
+available on an AsyncSession.
+"""
+from contextlib import asynccontextmanager
+from functools import wraps
+import jwt
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload, joinedload
+
+from app.config import Config
+from app.models import MedicalRecord, Appointment, Patient, Doctor, Prescription, AccessLog, DoctorPatientPanel
+from app.utils.time import utc_now
+from app.utils.tenancy import NO_HOSPITAL, TENANT_ROLES, hospital_for_user
+from app.utils.projection import FieldError, requested_fields, undefer_options, project
+from app.utils.prescription_feed import StaleCursor, sse_message
+from app.routes.medical_routes import RECORD_FIELDS, RECORD_SUMMARY, RECORD_DEFERRED
+from app.routes.prescription import PRESCRIPTION_FIELDS, PRESCRIPTION_SUMMARY, PRESCRIPTION_DEFERRED, poll_timeout
+from app.routes import patient_routes
+
+
+def _header(scope, header):
+    for name, value in scope.get("headers", []):
+        if name == header:
+            return value.decode("latin-1")
+    return None
+
+
+def _bearer_token(scope):
+    value = _header(scope, b"authorization")
+    if value and value.startswith("Bearer "):
+        return value[len("Bearer "):]
+    return None
+
+
+def async_jwt_required(*roles):
+    """Async counterpart of jwt_required/role_required (same claims, same error bodies).
+
+    With no roles any authenticated user is let through, like @jwt_required().
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        async def decorated(ctx, **kwargs):
+            token = _bearer_token(ctx.scope)
+            if not token:
+                return {"msg": "Missing Authorization Header"}, 401
+            try:
+                claims = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
+            except jwt.ExpiredSignatureError:
+                return {"msg": "Token has expired"}, 401
+            except jwt.InvalidTokenError:
+                return {"msg": "Invalid token"}, 422
+            if claims.get("type", "access") != "access":
+                return {"msg": "Only non-refresh tokens are allowed"}, 422
+
+            if roles and claims.get("role") not in roles:
+                return {"error": "Unauthorized role"}, 403
+
+            ctx.user_id = int(claims["sub"])
+            ctx.role = claims.get("role")
+            ctx.claims = claims
+            return await fn(ctx, **kwargs)
+        return decorated
+    return wrapper
+
+
+@asynccontextmanager
+async def _session(ctx):
+    """Async session scoped to the caller's hospital, like the tenant filter on the sync side."""
+    async with ctx.session() as session:
+        if ctx.role in TENANT_ROLES:
+            if "hospital_id" in ctx.claims:
+                hospital_id = ctx.claims["hospital_id"]
+            else:
+                hospital_id = await session.run_sync(hospital_for_user, ctx.role, ctx.user_id)
+            session.sync_session.info["tenant_hospital_id"] = NO_HOSPITAL if hospital_id is None else hospital_id
+        yield session
+
+
+async def _current_patient(session, user_id):
+    result = await session.execute(select(Patient.id).where(Patient.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+async def _current_doctor(session, user_id):
+    result = await session.execute(select(Doctor.id).where(Doctor.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+# GET /medical-records/patient/<patient_id>
+@async_jwt_required()
+async def get_records_for_patient(ctx, patient_id):
+    async with _session(ctx) as session:
+        doctor_id = None
+        if ctx.role == "patient" and ctx.user_id != patient_id:
+            return {"error": "Unauthorized"}, 403
+
+        if ctx.role == "doctor":
+            doctor_id = await _current_doctor(session, ctx.user_id)
+            if not doctor_id:
+                return {"error": "Doctor profile not found"}, 404
+
+            if await session.get(DoctorPatientPanel, (doctor_id, patient_id)) is None:
+                return {"error": "Doctor has no access to this patient's records"}, 403
+
+        try:
+            fields = requested_fields(ctx.args, RECORD_FIELDS, RECORD_SUMMARY)
+        except FieldError as e:
+            return {"error": str(e)}, 400
+
+        session.add(AccessLog(
+            doctor_id=doctor_id,
+            patient_id=patient_id,
+            purpose="viewed record",
+            accessed_at=utc_now()
+        ))
+        await session.commit()
+
+        result = await session.execute(
+            select(MedicalRecord)
+            .where(MedicalRecord.patient_id == patient_id)
+            .options(
+                joinedload(MedicalRecord.doctor).joinedload(Doctor.user),
+                joinedload(MedicalRecord.appointment),
+                *undefer_options(fields, RECORD_DEFERRED),
+            )
+        )
+        records = result.scalars().all()
+
+    with ctx.flask_app.app_context():
+        return [project(r, fields, RECORD_FIELDS) for r in records], 200
+
+
+# GET /patients/appointments
+@async_jwt_required("patient")
+async def get_patient_appointments(ctx):
+    async with _session(ctx) as session:
+        patient_id = await _current_patient(session, ctx.user_id)
+        if not patient_id:
+            return {"error": "Patient not found"}, 404
+
+        result = await session.execute(
+            select(Appointment.id, Appointment.date, Appointment.time, Appointment.status)
+            .where(Appointment.patient_id == patient_id)
+        )
+        appointments = result.all()
+
+    if not appointments:
+        return {"message": "No appointments found"}, 404
+
+    return [
+        {"id": a.id, "date": str(a.date), "time": str(a.time), "status": a.status}
+        for a in appointments
+    ], 200
+
+
+# GET /doctors/appointments
+@async_jwt_required("doctor")
+async def get_doctor_appointments(ctx):
+    async with _session(ctx) as session:
+        doctor_id = await _current_doctor(session, ctx.user_id)
+        if not doctor_id:
+            return {"error": "Doctor profile not found"}, 404
+
+        result = await session.execute(
+            select(Appointment)
+            .where(Appointment.doctor_id == doctor_id)
+            .options(joinedload(Appointment.patient).joinedload(Patient.user))
+        )
+        appointments = result.scalars().all()
+
+    return {
+        "message": "Appointments retrieved successfully.",
+        "data": [
+            {
+                "id": a.id,
+                "patient_id": a.patient.id,
+                "patient_name": a.patient.user.name,
+                "date": a.date.isoformat() if a.date else None,
+                "status": a.status,
+            }
+            for a in appointments
+        ]
+    }, 200
+
+
+# GET /patients/prescriptions
+@async_jwt_required("patient")
+async def get_patient_prescriptions(ctx):
+    async with _session(ctx) as session:
+        patient_id = await _current_patient(session, ctx.user_id)
+        if not patient_id:
+            return {"error": "Patient not found"}, 404
+
+        try:
+            fields = requested_fields(ctx.args, patient_routes.PRESCRIPTION_FIELDS, patient_routes.PRESCRIPTION_SUMMARY)
+        except FieldError as e:
+            return {"error": str(e)}, 400
+
+        columns = [Prescription.id, Prescription.issued_date]
+        if "medication_details" in fields:
+            columns.append(Prescription.medication_details)
+        result = await session.execute(select(*columns).where(Prescription.patient_id == patient_id))
+        prescriptions = result.all()
+
+    if not prescriptions:
+        return {"message": "No prescriptions found"}, 404
+
+    return [project(p, fields, patient_routes.PRESCRIPTION_FIELDS) for p in prescriptions], 200
+
+
+# GET /prescriptions/patient/<patient_id>
+@async_jwt_required("patient", "doctor", "admin")
+async def get_prescriptions_by_patient(ctx, patient_id):
+    getters = {name: getter for name, getter in PRESCRIPTION_FIELDS.items() if name != "patient"}
+    try:
+        fields = requested_fields(ctx.args, getters, PRESCRIPTION_SUMMARY)
+    except FieldError as e:
+        return {"error": str(e)}, 400
+
+    async with _session(ctx) as session:
+        result = await session.execute(
+            select(Prescription)
+            .where(Prescription.patient_id == patient_id)
+            .options(
+                selectinload(Prescription.doctor).joinedload(Doctor.user),
+                *undefer_options(fields, PRESCRIPTION_DEFERRED),
+            )
+        )
+        prescriptions = result.scalars().all()
+
+    if not prescriptions:
+        return {"message": "No prescriptions found for this patient"}, 404
+
+    return [project(p, fields, getters) for p in prescriptions], 200
+
+
+async def _unclaimed_snapshot(ctx, session, feed):
+    """Cursor (taken first) and the current unclaimed list, as on the sync side; raises FieldError."""
+    fields = requested_fields(ctx.args, PRESCRIPTION_FIELDS, PRESCRIPTION_SUMMARY)
+    cursor = feed.cursor()
+    result = await session.execute(
+        select(Prescription)
+        .where(Prescription.pharmacy_id.is_(None), Prescription.status == "issued")
+        .order_by(Prescription.issued_date.desc())
+        .options(
+            joinedload(Prescription.doctor).joinedload(Doctor.user),
+            joinedload(Prescription.patient).joinedload(Patient.user),
+            *undefer_options(fields, PRESCRIPTION_DEFERRED),
+        )
+    )
+    return cursor, [project(p, fields, PRESCRIPTION_FIELDS) for p in result.scalars().unique()]
+
+
+# GET /prescriptions/unclaimed/stream
+@async_jwt_required("pharmacist")
+async def stream_unclaimed_prescriptions(ctx):
+    feed = ctx.flask_app.extensions["prescription_feed"]
+    heartbeat = ctx.flask_app.config["PRESCRIPTION_FEED_HEARTBEAT_SECONDS"]
+    cursor = _header(ctx.scope, b"last-event-id") or ctx.args.get("cursor")
+
+    async with _session(ctx) as session:
+        hospital_id = session.sync_session.info.get("tenant_hospital_id")
+        snapshot = None
+        try:
+            feed.read(cursor, hospital_id)
+        except StaleCursor:
+            try:
+                cursor, result = await _unclaimed_snapshot(ctx, session, feed)
+            except FieldError as e:
+                return {"error": str(e)}, 400
+            snapshot = sse_message("snapshot", ctx.flask_app.json.dumps(result), cursor)
+
+    async def events(cursor):
+        if snapshot:
+            yield snapshot
+        while True:
+            try:
+                batch, cursor = await feed.wait_async(cursor, hospital_id, heartbeat)
+            except StaleCursor:
+                yield sse_message("reset", "{}")
+                return
+            if not batch:
+                yield ": keep-alive\n\n"
+            for seq, event_type, _, data in batch:
+                yield sse_message(event_type, data, feed.cursor(seq))
+
+    return events(cursor), 200
+
+
+# GET /prescriptions/unclaimed/changes
+@async_jwt_required("pharmacist")
+async def poll_unclaimed_prescriptions(ctx):
+    feed = ctx.flask_app.extensions["prescription_feed"]
+    max_timeout = ctx.flask_app.config["PRESCRIPTION_FEED_POLL_SECONDS"]
+    try:
+        timeout = poll_timeout(ctx.args.get("timeout", max_timeout), max_timeout)
+    except ValueError:
+        return {"error": "timeout must be a number of seconds"}, 400
+
+    cursor = ctx.args.get("cursor")
+    async with _session(ctx) as session:
+        hospital_id = session.sync_session.info.get("tenant_hospital_id")
+        try:
+            feed.read(cursor, hospital_id)
+        except StaleCursor:
+            try:
+                cursor, result = await _unclaimed_snapshot(ctx, session, feed)
+            except FieldError as e:
+                return {"error": str(e)}, 400
+            return {"cursor": cursor, "reset": True, "prescriptions": result}, 200
+
+    try:
+        batch, cursor = await feed.wait_async(cursor, hospital_id, timeout)
+    except StaleCursor:
+        return {"cursor": None, "reset": True, "prescriptions": None}, 200
+    return {
+        "cursor": cursor,
+        "reset": False,
+        "events": [{"type": event_type, "data": ctx.flask_app.json.loads(data)} for _, event_type, _, data in batch],
+    }, 200
+
+
+# (path pattern, handler) — only GETs are served async, everything else falls through to Flask
+ASYNC_ROUTES = [
+    (r"/medical-records/patient/(?P<patient_id>\d+)", get_records_for_patient),
+    (r"/patients/appointments", get_patient_appointments),
+    (r"/doctors/appointments", get_doctor_appointments),
+    (r"/patients/prescriptions", get_patient_prescriptions),
+    (r"/prescriptions/patient/(?P<patient_id>\d+)", get_prescriptions_by_patient),
+    (r"/prescriptions/unclaimed/stream", stream_unclaimed_prescriptions),
+    (r"/prescriptions/unclaimed/changes", poll_unclaimed_prescriptions),
+]
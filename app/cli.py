@@ -0,0 +1,230 @@
+import click
+from flask.cli import with_appcontext
+from app.db import db
+
+
+# flask reindex-medical-records — rebuild the blind index from existing ciphertext
+@click.command("reindex-medical-records")
+@click.option("--batch-size", default=500, show_default=True)
+@with_appcontext
+def reindex_medical_records(batch_size):
+    from sqlalchemy.orm import undefer
+    from app.models import MedicalRecord
+    from app.utils.blind_index import INDEXED_FIELDS, index_medical_record
+
+    last_id, total = 0, 0
+    while True:
+        batch = (
+            MedicalRecord.query
+            .options(undefer(MedicalRecord._notes))
+            .filter(MedicalRecord.id > last_id)
+            .order_by(MedicalRecord.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for record in batch:
+            index_medical_record(record, {f: getattr(record, f) for f in INDEXED_FIELDS})
+        db.session.commit()
+        last_id = batch[-1].id
+        total += len(batch)
+        click.echo(f"Indexed {total} records (last id {last_id})")
+
+
+# flask resume-hospital-deletions — finish deletion jobs interrupted by a restart or failure
+@click.command("resume-hospital-deletions")
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def resume_hospital_deletions(batch_size):
+    from app.models import HospitalDeletionJob
+    from app.utils.hospital_deletion import claim_hospital_deletion, run_hospital_deletion
+
+    jobs = HospitalDeletionJob.query.filter(HospitalDeletionJob.status != "completed").all()
+    for job in jobs:
+        if not claim_hospital_deletion(job.id):
+            click.echo(f"Skipping job {job.id}: another worker is running it")
+            continue
+        click.echo(f"Resuming job {job.id} (hospital {job.hospital_id}) at {job.current_step or 'start'}")
+        job = run_hospital_deletion(job.id, batch_size)
+        click.echo(f"Job {job.id}: {job.status} {job.deleted_counts}")
+
+
+# flask rebuild-doctor-patient-panel — recompute the panel from appointments (backfill / repair)
+@click.command("rebuild-doctor-patient-panel")
+@with_appcontext
+def rebuild_doctor_patient_panel():
+    from sqlalchemy import select, func, insert, delete
+    from app.models import Appointment, DoctorPatientPanel
+
+    panel = DoctorPatientPanel.__table__
+    db.session.execute(delete(panel))
+    db.session.execute(insert(panel).from_select(
+        ["doctor_id", "patient_id", "first_visit", "last_visit", "visit_count", "updated_at"],
+        select(
+            Appointment.doctor_id, Appointment.patient_id,
+            func.min(Appointment.date), func.max(Appointment.date), func.count(Appointment.id),
+            func.current_timestamp(),
+        ).group_by(Appointment.doctor_id, Appointment.patient_id)
+    ))
+    db.session.commit()
+    click.echo(f"Doctor–patient panel rebuilt: {db.session.query(func.count()).select_from(panel).scalar()} pairs")
+
+
+# flask rebuild-activity-rollups — recompute hospital activity rollups from the source tables (backfill / repair)
+@click.command("rebuild-activity-rollups")
+@click.option("--hospital-id", type=int, default=None, help="Only this hospital (default: all)")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Only days from this date on")
+@with_appcontext
+def rebuild_activity_rollups(hospital_id, since):
+    from app.utils.activity_rollups import rebuild_rollups
+
+    days = rebuild_rollups(db.session, hospital_id, since.date() if since else None)
+    db.session.commit()
+    click.echo(f"Activity rollups rebuilt: {days} hospital-days")
+
+
+# flask refresh-doctor-search — recompute doctor search rows and scores (daily: availability moves with the date)
+@click.command("refresh-doctor-search")
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def refresh_doctor_search_command(batch_size):
+    from app.models import Doctor
+    from app.utils.doctor_search import refresh_doctor_search
+
+    last_id, total = 0, 0
+    while True:
+        doctor_ids = db.session.execute(
+            db.select(Doctor.id).where(Doctor.id > last_id).order_by(Doctor.id).limit(batch_size)
+        ).scalars().all()
+        if not doctor_ids:
+            break
+        total += refresh_doctor_search(db.session.connection(), doctor_ids)
+        db.session.commit()
+        last_id = doctor_ids[-1]
+        click.echo(f"Refreshed {total} doctors (last id {last_id})")
+
+
+# flask maintain-access-logs — create upcoming monthly partitions, archive and drop expired ones
+@click.command("maintain-access-logs")
+@click.option("--retain-months", type=int, default=None, help="Defaults to ACCESS_LOG_RETENTION_MONTHS")
+@click.option("--archive-dir", default=None, help="Defaults to ACCESS_LOG_ARCHIVE_DIR")
+@click.option("--months-ahead", default=3, show_default=True)
+@with_appcontext
+def maintain_access_logs(retain_months, archive_dir, months_ahead):
+    from flask import current_app
+    from app.utils.access_log_partitions import ensure_partitions, archive_old_partitions
+
+    retain_months = retain_months if retain_months is not None else current_app.config["ACCESS_LOG_RETENTION_MONTHS"]
+    archive_dir = archive_dir or current_app.config["ACCESS_LOG_ARCHIVE_DIR"]
+
+    for name in ensure_partitions(months_ahead):
+        click.echo(f"Partition ready: {name}")
+    for month, path, count in archive_old_partitions(retain_months, archive_dir):
+        click.echo(f"Archived {count} access logs for {month:%Y-%m} to {path}")
+
+
+# flask export-access-logs — write a gzip-compressed audit extract to a file
+@click.command("export-access-logs")
+@click.option("--output", "-o", required=True, type=click.Path(dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="csv", show_default=True)
+@click.option("--from", "from_", default=None, help="YYYY-MM-DD (inclusive)")
+@click.option("--to", default=None, help="YYYY-MM-DD (inclusive)")
+@click.option("--doctor-id", type=int, default=None)
+@click.option("--patient-id", type=int, default=None)
+@click.option("--batch-size", default=5000, show_default=True)
+@with_appcontext
+def export_access_logs_command(output, fmt, from_, to, doctor_id, patient_id, batch_size):
+    from app.utils.audit_export import export_access_logs
+
+    filters = {"from": from_, "to": to, "doctor_id": doctor_id, "patient_id": patient_id}
+    written = 0
+    with open(output, "wb") as out:
+        for chunk in export_access_logs(filters, fmt, batch_size):
+            out.write(chunk)
+            written += len(chunk)
+    click.echo(f"Wrote {written} compressed bytes to {output}")
+
+
+# flask run-reminders — dedicated appointment reminder worker (blocks; leader-elected)
+@click.command("run-reminders")
+@click.option("--poll-seconds", type=int, default=None, help="Defaults to REMINDER_POLL_SECONDS")
+@with_appcontext
+def run_reminders(poll_seconds):
+    from flask import current_app
+    from app.utils.reminders import ReminderScheduler
+
+    scheduler = ReminderScheduler(current_app._get_current_object(), poll_seconds=poll_seconds)
+    click.echo(f"Reminder offsets (minutes): {', '.join(map(str, scheduler.offsets))}")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+# flask drain-outbox — send queued emails now
+@click.command("drain-outbox")
+@click.option("--batch-size", default=50, show_default=True)
+@with_appcontext
+def drain_outbox_command(batch_size):
+    from app.utils.outbox import drain_outbox
+
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = drain_outbox(batch_size)
+        total_sent, total_failed = total_sent + sent, total_failed + failed
+        if sent + failed < batch_size:
+            break
+    click.echo(f"Sent {total_sent} emails, {total_failed} failed attempts")
+
+
+# flask sweep-expired-invites — purge (optionally archive) invites past their expiry, in batches
+@click.command("sweep-expired-invites")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--grace-days", default=0, show_default=True, help="Keep invites this many days past expiry")
+@click.option("--archive-dir", default=None, help="Append swept invites to gzip NDJSON files here before deleting")
+@with_appcontext
+def sweep_expired_invites_command(batch_size, grace_days, archive_dir):
+    from app.utils.invites import sweep_expired_invites
+
+    removed = sweep_expired_invites(batch_size, grace_days, archive_dir)
+    click.echo(f"Removed {removed} expired invites" + (f" (archived to {archive_dir})" if archive_dir and removed else ""))
+
+
+# flask rotate-encryption-key — re-encrypt medical records under the current ENCRYPTION_KEY (resumable)
+@click.command("rotate-encryption-key")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--workers", default=4, show_default=True, help="Threads re-encrypting each batch")
+@with_appcontext
+def rotate_encryption_key(batch_size, workers):
+    from flask import current_app
+    from app.utils.key_rotation import get_or_create_job, run_key_rotation
+
+    if not current_app.config.get("BLIND_INDEX_KEY"):
+        click.echo("Warning: BLIND_INDEX_KEY is not set, so the search index is keyed from ENCRYPTION_KEY; "
+                   "run `flask reindex-medical-records` after rotating.")
+
+    job = get_or_create_job()
+    if job.status == "completed":
+        click.echo(f"Medical records are already encrypted with key {job.key_id} (job {job.id})")
+        return
+    click.echo(f"Rotating to key {job.key_id}, job {job.id}, resuming after id {job.last_id}")
+    job = run_key_rotation(
+        job.id, batch_size, workers,
+        on_batch=lambda j: click.echo(f"Re-encrypted {j.rows_rotated} records (last id {j.last_id})"),
+    )
+    click.echo(f"Job {job.id}: {job.status}" + (f" ({job.error})" if job.error else ""))
+
+
+def register_commands(app):
+    app.cli.add_command(reindex_medical_records)
+    app.cli.add_command(resume_hospital_deletions)
+    app.cli.add_command(rebuild_doctor_patient_panel)
+    app.cli.add_command(rebuild_activity_rollups)
+    app.cli.add_command(refresh_doctor_search_command)
+    app.cli.add_command(maintain_access_logs)
+    app.cli.add_command(export_access_logs_command)
+    app.cli.add_command(run_reminders)
+    app.cli.add_command(drain_outbox_command)
+    app.cli.add_command(sweep_expired_invites_command)
+    app.cli.add_command(rotate_encryption_key)
@@ -11,9 +11,47 @@ class Config:
     SQLALCHEMY_DATABASE_URI=os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS=False
 
+    # Read replicas (app/utils/replicas.py): comma-separated URLs, GET requests read from them
+    SQLALCHEMY_BINDS = {
+        f"replica_{i}": url
+        for i, url in enumerate(u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip())
+    }
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))  # read from the primary beyond this
+    REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "10"))  # how often each replica's lag is probed
+
     SECRET_KEY = os.getenv("SECRET_KEY")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+    ENCRYPTION_PREVIOUS_KEYS = os.getenv("ENCRYPTION_PREVIOUS_KEYS", "")  # still decrypt while rotating
+    BLIND_INDEX_KEY = os.getenv("BLIND_INDEX_KEY")  # HMAC key for searchable medical record terms
+
+    # Content-addressed storage for uploaded images (patient profile pictures)
+    BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")  # relative to the instance folder
+    MAX_PROFILE_PIC_BYTES = int(os.getenv("MAX_PROFILE_PIC_BYTES", str(5 * 1024 * 1024)))
+
+    # Access log partition retention (flask maintain-access-logs)
+    ACCESS_LOG_RETENTION_MONTHS = int(os.getenv("ACCESS_LOG_RETENTION_MONTHS", "12"))
+    ACCESS_LOG_ARCHIVE_DIR = os.getenv("ACCESS_LOG_ARCHIVE_DIR", "archives/access_logs")
+
+    # Appointment reminders (app/utils/reminders.py); run in-process or with `flask run-reminders`
+    REMINDER_SCHEDULER_ENABLED = os.getenv("REMINDER_SCHEDULER_ENABLED", "false").lower() == "true"
+    REMINDER_OFFSETS_MINUTES = os.getenv("REMINDER_OFFSETS_MINUTES", "1440,120")  # 24h and 2h before
+    REMINDER_POLL_SECONDS = int(os.getenv("REMINDER_POLL_SECONDS", "30"))
+    APPOINTMENT_TIMEZONE = os.getenv("APPOINTMENT_TIMEZONE", "UTC")  # zone of Appointment.date/time
+
+    # Live unclaimed-prescription feed (app/utils/prescription_feed.py)
+    PRESCRIPTION_FEED_FANOUT = os.getenv("PRESCRIPTION_FEED_FANOUT", "local").lower()  # local | postgres (LISTEN/NOTIFY)
+    PRESCRIPTION_FEED_BUFFER = int(os.getenv("PRESCRIPTION_FEED_BUFFER", "500"))  # events kept for reconnects
+    PRESCRIPTION_FEED_HEARTBEAT_SECONDS = float(os.getenv("PRESCRIPTION_FEED_HEARTBEAT_SECONDS", "15"))
+    PRESCRIPTION_FEED_POLL_SECONDS = float(os.getenv("PRESCRIPTION_FEED_POLL_SECONDS", "25"))  # longest long-poll wait
+
+    LAB_ANALYTICS_CACHE_SIZE = int(os.getenv("LAB_ANALYTICS_CACHE_SIZE", "1024"))  # cached patient analytics per worker
+
+    # Doctor search ranking (app/utils/doctor_search.py)
+    DOCTOR_RATING_PRIOR = float(os.getenv("DOCTOR_RATING_PRIOR", "3.5"))  # rating assumed before any reviews
+    DOCTOR_RATING_PRIOR_WEIGHT = float(os.getenv("DOCTOR_RATING_PRIOR_WEIGHT", "5"))  # ...worth this many reviews
+    DOCTOR_WEEKLY_CAPACITY = int(os.getenv("DOCTOR_WEEKLY_CAPACITY", "40"))  # appointments that make a doctor fully booked
+    DOCTOR_AVAILABILITY_WEIGHT = float(os.getenv("DOCTOR_AVAILABILITY_WEIGHT", "0.2"))  # share of the score from availability
 
     SQLALCHEMY_ENGINE_OPTIONS = {
         "connect_args": {"options": "-4"},  # Force IPv4 connections
@@ -1,5 +1,20 @@
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 
-db=SQLAlchemy()
+
+class RoutingSession(Session):
+    """Lets the replica router (app/utils/replicas.py) send plain reads to a read replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        router = current_app.extensions.get("replica_router") if bind is None else None
+        if router is not None:
+            key = router.route(self, clause)
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db=SQLAlchemy(session_options={"class_": RoutingSession})
 migrate=Migrate()
\ No newline at end of file
@@ -6,6 +6,12 @@ def utc_now():
 
 class Appointment(db.Model):
     __tablename__ = "appointments"
+    __table_args__ = (
+        db.Index("ix_appointments_patient_date_time", "patient_id", "date", "time"),
+        db.Index("ix_appointments_status_date", "status", "date"),
+        db.Index("ix_appointments_updated_at", "updated_at"),
+        db.Index("ix_appointments_doctor_date", "doctor_id", "date"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
@@ -15,6 +21,7 @@ class Appointment(db.Model):
     time = db.Column(db.Time, nullable=False)
     status = db.Column(db.Enum("pending", "accepted", "declined", "completed", name="appointment_status"), default="pending")
     created_at = db.Column(db.DateTime, default=utc_now)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
 
     patient = db.relationship("Patient", back_populates="appointments")
     doctor = db.relationship("Doctor", back_populates="appointments")
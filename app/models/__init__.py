@@ -10,4 +10,11 @@ from .reviews import *
 from .access import *
 from .notification import *
 from .pendingUser import *
-from .technician import *
\ No newline at end of file
+from .technician import *
+from .panel import *
+from .outbox import *
+from .reminder import *
+from .key_rotation import *
+from .lab_results import *
+from .activity import *
+from .doctor_search import *
\ No newline at end of file
@@ -6,13 +6,22 @@ def utc_now():
 
 
 
+# On Postgres access_logs is range-partitioned by month on accessed_at (primary key (id, accessed_at)),
+# see migrations and app/utils/access_log_partitions.py. The ORM only needs id for identity.
 class AccessLog(db.Model):
     __tablename__ = "access_logs"
+    __table_args__ = (
+        db.Index("ix_access_logs_accessed_at", "accessed_at"),
+        db.Index("ix_access_logs_doctor_accessed", "doctor_id", "accessed_at"),
+        db.Index("ix_access_logs_patient_accessed", "patient_id", "accessed_at"),
+        db.Index("ix_access_logs_hospital_accessed", "hospital_id", "accessed_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"))
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"))
-    accessed_at = db.Column(db.DateTime, default=utc_now)
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id"))  # the doctor's; none for patient/admin access
+    accessed_at = db.Column(db.DateTime, nullable=False, default=utc_now)
     purpose = db.Column(db.String(255))  # e.g., "viewed record", "updated prescription"
 
     doctor = db.relationship("Doctor", back_populates="access_logs")
@@ -0,0 +1,178 @@
+from app.db import db
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from .Appointment import Appointment
+from .prescriptions import Prescription
+from .technician import TestRequest
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+APPOINTMENT_STATUSES = tuple(Appointment.status.type.enums)
+
+# Pre-aggregated hospital activity, one row per hospital and day (appointment date; UTC day of
+# prescriptions and lab tests). Kept current by the mapper events below, which add or subtract
+# one per written row with an atomic upsert, so dashboards read a year as ~365 rows.
+class HospitalDailyActivity(db.Model):
+    __tablename__ = "hospital_daily_activity"
+
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    appointments_pending = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    appointments_accepted = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    appointments_declined = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    appointments_completed = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    prescriptions_issued = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    lab_tests_requested = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    lab_tests_completed = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<HospitalDailyActivity Hospital:{self.hospital_id} {self.day}>"
+
+
+# Appointments per doctor and day, by status
+class HospitalDoctorDailyActivity(db.Model):
+    __tablename__ = "hospital_doctor_daily_activity"
+
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True)
+    appointments_pending = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    appointments_accepted = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    appointments_declined = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    appointments_completed = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<HospitalDoctorDailyActivity Hospital:{self.hospital_id} Doctor:{self.doctor_id} {self.day}>"
+
+
+# Appointments per hour of the day they are booked for
+class HospitalHourlyAppointments(db.Model):
+    __tablename__ = "hospital_hourly_appointments"
+
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.SmallInteger, primary_key=True)  # 0-23
+    appointments = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<HospitalHourlyAppointments Hospital:{self.hospital_id} {self.day} {self.hour}:00>"
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def appointment_counts(a, sign=1):
+    """(model, key, counts) an appointment contributes; `a` maps hospital_id, doctor_id, date, time, status."""
+    if a["hospital_id"] is None or a["date"] is None:
+        return
+    status = f"appointments_{a['status'] or 'pending'}"
+    yield HospitalDailyActivity, {"hospital_id": a["hospital_id"], "day": a["date"]}, {status: sign}
+    yield (HospitalDoctorDailyActivity, {"hospital_id": a["hospital_id"], "day": a["date"], "doctor_id": a["doctor_id"]},
+           {status: sign})
+    if a["time"] is not None:
+        yield (HospitalHourlyAppointments, {"hospital_id": a["hospital_id"], "day": a["date"], "hour": a["time"].hour},
+               {"appointments": sign})
+
+
+def prescription_counts(p, sign=1):
+    if p["hospital_id"] is None or p["issued_date"] is None:
+        return
+    yield HospitalDailyActivity, {"hospital_id": p["hospital_id"], "day": _day(p["issued_date"])}, {"prescriptions_issued": sign}
+
+
+def test_request_counts(t, sign=1):
+    if t["hospital_id"] is None:
+        return
+    if t["date_requested"] is not None:
+        yield HospitalDailyActivity, {"hospital_id": t["hospital_id"], "day": _day(t["date_requested"])}, {"lab_tests_requested": sign}
+    if t["status"] == "Completed" and t["date_completed"] is not None:
+        yield HospitalDailyActivity, {"hospital_id": t["hospital_id"], "day": _day(t["date_completed"])}, {"lab_tests_completed": sign}
+
+
+def apply_rollup_counts(connection, *contributions):
+    """Add up (model, key, counts) contributions and upsert each touched rollup row once (counter += delta)."""
+    totals = {}
+    for model, key, counts in (c for group in contributions for c in group):
+        totals.setdefault((model, tuple(key.items())), Counter()).update(counts)
+
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    for (model, key), counts in totals.items():
+        counts = {column: n for column, n in counts.items() if n}
+        if not counts:
+            continue  # e.g. an update that changed nothing we count
+        table = model.__table__
+        stmt = insert(table).values(**dict(key), **counts, updated_at=utc_now())
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[column for column, _ in key],
+            set_={**{column: table.c[column] + stmt.excluded[column] for column in counts}, "updated_at": stmt.excluded.updated_at},
+        ))
+
+
+# Source model -> (contribution function, attributes it reads)
+ROLLUP_SOURCES = {
+    Appointment: (appointment_counts, ("hospital_id", "doctor_id", "date", "time", "status")),
+    Prescription: (prescription_counts, ("hospital_id", "issued_date")),
+    TestRequest: (test_request_counts, ("hospital_id", "date_requested", "date_completed", "status")),
+}
+
+
+def _current(target, fields):
+    return {f: getattr(target, f) for f in fields}
+
+
+def _previous(target, fields):
+    state = inspect(target)
+    values = {}
+    for f in fields:
+        history = state.attrs[f].history
+        values[f] = history.deleted[0] if history.deleted else getattr(target, f)
+    return values
+
+
+def _written(mapper, connection, target, sign):
+    counts, fields = ROLLUP_SOURCES[mapper.class_]
+    apply_rollup_counts(connection, counts(_current(target, fields), sign))
+
+
+def _updated(mapper, connection, target):
+    counts, fields = ROLLUP_SOURCES[mapper.class_]
+    state = inspect(target)
+    if not any(state.attrs[f].history.has_changes() for f in fields):
+        return
+    apply_rollup_counts(connection, counts(_previous(target, fields), -1), counts(_current(target, fields), 1))
+
+
+def _load_previous(target, value, oldvalue, initiator):
+    pass  # registered for active_history only, see below
+
+
+for _model, (_, _fields) in ROLLUP_SOURCES.items():
+    event.listen(_model, "after_insert", lambda m, c, t: _written(m, c, t, 1))
+    event.listen(_model, "after_delete", lambda m, c, t: _written(m, c, t, -1))
+    event.listen(_model, "after_update", _updated)
+    # Load the old value when one of these is set on an expired instance (e.g. after a commit),
+    # otherwise its history has no "deleted" side and the old bucket would never be decremented
+    for _field in _fields:
+        event.listen(getattr(_model, _field), "set", _load_previous, active_history=True)
+
+
+def rollup_appointment_statuses(connection, rows, statuses):
+    """Rollup changes for a bulk status UPDATE, which skips the mapper events.
+
+    `rows` are the appointments as read before the update; `statuses` maps id -> new status.
+    """
+    fields = ROLLUP_SOURCES[Appointment][1]
+    changed = [row for row in rows if row.id in statuses]
+    before = [{f: getattr(row, f) for f in fields} for row in changed]
+    apply_rollup_counts(
+        connection,
+        *(appointment_counts(a, -1) for a in before),
+        *(appointment_counts({**a, "status": statuses[row.id]}) for a, row in zip(before, changed)),
+    )
@@ -0,0 +1,45 @@
+from app.db import db
+from datetime import datetime, timezone
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+# Precomputed doctor search row: display fields plus the ranking score, so a search page is one
+# index walk in score order. Maintained by app/utils/doctor_search.py.
+class DoctorSearchEntry(db.Model):
+    __tablename__ = "doctor_search"
+    __table_args__ = (
+        db.Index("ix_doctor_search_score", db.text("score DESC"), "doctor_id"),
+        db.Index("ix_doctor_search_hospital_score", "hospital_id", db.text("score DESC"), "doctor_id"),
+    )
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True)
+    hospital_id = db.Column(db.Integer)
+    name = db.Column(db.String(150))
+    specialization = db.Column(db.String(100))
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating = db.Column(db.Float, nullable=False)  # Bayesian average, pulled toward DOCTOR_RATING_PRIOR
+    upcoming_appointments = db.Column(db.Integer, nullable=False, default=0)  # next 7 days
+    availability = db.Column(db.Float, nullable=False)  # 0 (fully booked or inactive) .. 1 (free week)
+    score = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<DoctorSearchEntry Doctor:{self.doctor_id} {self.score:.3f}>"
+
+
+# Normalized words of a doctor's name and specialization; queries match them by prefix
+class DoctorSearchTerm(db.Model):
+    __tablename__ = "doctor_search_terms"
+    __table_args__ = (
+        # varchar_pattern_ops lets Postgres serve `token LIKE 'abc%'` from the index under any collation
+        db.Index("ix_doctor_search_terms_token", "token", "doctor_id", postgresql_ops={"token": "varchar_pattern_ops"}),
+    )
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True)
+    token = db.Column(db.String(64), primary_key=True)
+
+    def __repr__(self):
+        return f"<DoctorSearchTerm {self.doctor_id}:{self.token}>"
@@ -1,4 +1,8 @@
 from app.db import db
+from datetime import datetime, timezone
+
+def utc_now():
+    return datetime.now(timezone.utc)
 
 class Hospital(db.Model):
     __tablename__ = "hospitals"
@@ -20,4 +24,38 @@ class Hospital(db.Model):
 
 
 def __repr__(self):
-    return f"<Hospital {self.name}>"
\ No newline at end of file
+    return f"<Hospital {self.name}>"
+
+
+# Background hospital deletion (see app/utils/hospital_deletion.py).
+# No FK to hospitals: the job row outlives the hospital it deletes.
+class HospitalDeletionJob(db.Model):
+    __tablename__ = "hospital_deletion_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    hospital_id = db.Column(db.Integer, nullable=False, index=True)
+    requested_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"))
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    current_step = db.Column(db.String(50))
+    deleted_counts = db.Column(db.JSON, default=dict)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+    completed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "hospital_id": self.hospital_id,
+            "status": self.status,
+            "current_step": self.current_step,
+            "deleted_counts": self.deleted_counts or {},
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "completed_at": self.completed_at,
+        }
+
+    def __repr__(self):
+        return f"<HospitalDeletionJob hospital:{self.hospital_id} {self.status}>"
+
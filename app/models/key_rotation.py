@@ -0,0 +1,38 @@
+from app.db import db
+from datetime import datetime, timezone
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+# Progress of re-encrypting a table under a new ENCRYPTION_KEY (see app/utils/key_rotation.py).
+# last_id is the checkpoint: every row up to it has been rotated and committed.
+class KeyRotationJob(db.Model):
+    __tablename__ = "key_rotation_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    key_id = db.Column(db.String(12), nullable=False, index=True)  # fingerprint of the target key
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_rotated = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+    completed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "table_name": self.table_name,
+            "key_id": self.key_id,
+            "status": self.status,
+            "last_id": self.last_id,
+            "rows_rotated": self.rows_rotated,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "completed_at": self.completed_at,
+        }
+
+    def __repr__(self):
+        return f"<KeyRotationJob {self.table_name} -> {self.key_id} {self.status}>"
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from app.db import db
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+# Flags relative to the reference range (HL7 abnormal flags)
+LAB_FLAGS = ("L", "N", "H")
+
+
+# One numeric measurement from a lab test, so trends are a range scan instead of parsing results text
+class LabResultValue(db.Model):
+    __tablename__ = "lab_result_values"
+    __table_args__ = (
+        db.Index("ix_lab_result_values_patient_analyte_measured", "patient_id", "analyte", "measured_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # On Postgres the foreign key is (test_request_id, hospital_id), matching the partitioned test_requests key
+    test_request_id = db.Column(db.Integer, db.ForeignKey("test_requests.id", ondelete="CASCADE"), nullable=False, index=True)
+    hospital_id = db.Column(db.Integer, nullable=False)  # copied from the test request
+    patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
+    analyte = db.Column(db.String(32), nullable=False)  # upper-case code, e.g. HGB, GLU, LDL
+    value = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(20))
+    ref_low = db.Column(db.Float)
+    ref_high = db.Column(db.Float)
+    flag = db.Column(db.String(1))  # L, N, H; null without a reference range
+    measured_at = db.Column(db.DateTime, nullable=False, default=utc_now)
+
+    test = db.relationship("TestRequest", back_populates="values")
+
+    def to_dict(self):
+        return {
+            "analyte": self.analyte,
+            "value": self.value,
+            "unit": self.unit,
+            "ref_low": self.ref_low,
+            "ref_high": self.ref_high,
+            "flag": self.flag,
+            "measured_at": self.measured_at.isoformat() if self.measured_at else None,
+            "test_id": self.test_request_id,
+        }
+
+    def __repr__(self):
+        return f"<LabResultValue {self.analyte}={self.value} patient:{self.patient_id}>"
@@ -1,21 +1,28 @@
 from app.db import db
 from datetime import datetime, timezone
-from app.utils.encryption import encrypt_text, decrypt_text
+from app.utils.encryption import encrypted_field
 
 def utc_now():
     return datetime.now(timezone.utc)
 
-# Medical Record model
+# Medical Record model. On Postgres hash-partitioned by hospital_id (primary key (id, hospital_id)),
+# see migrations and app/utils/tenancy.py. The ORM only needs id for identity.
 class MedicalRecord(db.Model):
     __tablename__ = "medical_records"
+    __table_args__ = (
+        db.Index("ix_medical_records_patient_created", "patient_id", "created_at"),
+        db.Index("ix_medical_records_hospital_created", "hospital_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), nullable=False)
     appointment_id = db.Column(db.Integer, db.ForeignKey("appointments.id"), nullable=True)
-    diagnosis = db.Column(db.Text, nullable=True)
-    treatment = db.Column(db.Text, nullable=True)
-    notes = db.Column(db.Text, nullable=True)
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id"), nullable=False)  # the doctor's, set on insert
+    # Ciphertext columns; read and assign plaintext through the fields below
+    _diagnosis = db.Column("diagnosis", db.Text, nullable=True)
+    _treatment = db.Column("treatment", db.Text, nullable=True)
+    _notes = db.deferred(db.Column("notes", db.Text, nullable=True), group="detail")  # free text, loaded on demand
     created_at = db.Column(db.DateTime, default=utc_now)
     updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
 
@@ -23,28 +30,30 @@ class MedicalRecord(db.Model):
     patient = db.relationship("Patient", back_populates="medical_records")
     doctor = db.relationship("Doctor", back_populates="medical_records")
     appointment = db.relationship("Appointment", back_populates="medical_record", uselist=False)
+    terms = db.relationship("MedicalRecordTerm", back_populates="record", cascade="all, delete-orphan", passive_deletes=True)
 
-    # @property
-    # def diagnosis(self):
-    #     return decrypt_text(self._diagnosis)
+    # Decrypted lazily on first access and cached per instance; assigning encrypts
+    diagnosis = encrypted_field("_diagnosis")
+    treatment = encrypted_field("_treatment")
+    notes = encrypted_field("_notes")
 
-    # @diagnosis.setter
-    # def diagnosis(self, value):
-    #     self._diagnosis = encrypt_text(value)
 
-    # @property
-    # def treatment(self):
-    #     return decrypt_text(self._treatment)
+# Blind index: keyed HMAC tokens of normalized plaintext terms (see app/utils/blind_index.py).
+# Lets search match encrypted records with an indexed equality lookup instead of decrypting every row.
+class MedicalRecordTerm(db.Model):
+    __tablename__ = "medical_record_terms"
+    __table_args__ = (
+        db.Index("ix_medical_record_terms_field_token", "field", "token"),
+    )
 
-    # @treatment.setter
-    # def treatment(self, value):
-    #     self._treatment = encrypt_text(value)
-
-    # @property
-    # def notes(self):
-    #     return decrypt_text(self._notes)
+    id = db.Column(db.Integer, primary_key=True)
+    # On Postgres the foreign key is (record_id, hospital_id), matching the partitioned medical_records key
+    record_id = db.Column(db.Integer, db.ForeignKey("medical_records.id", ondelete="CASCADE"), nullable=False, index=True)
+    hospital_id = db.Column(db.Integer, nullable=False)  # copied from the record
+    field = db.Column(db.String(20), nullable=False)  # diagnosis, treatment, notes
+    token = db.Column(db.String(64), nullable=False)
 
-    # @notes.setter
-    # def notes(self, value):
-    #     self._notes = encrypt_text(value)
+    record = db.relationship("MedicalRecord", back_populates="terms")
 
+    def __repr__(self):
+        return f"<MedicalRecordTerm {self.field} record:{self.record_id}>"
@@ -0,0 +1,27 @@
+from app.db import db
+from datetime import datetime, timezone
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+# Emails queued in the same transaction as the change that triggers them and sent
+# afterwards by drain_outbox (app/utils/outbox.py), with retries and backoff.
+class EmailOutbox(db.Model):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_content = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, default=utc_now)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.to_email} {self.status}>"
@@ -0,0 +1,71 @@
+from app.db import db
+from datetime import datetime, timezone
+from sqlalchemy import event, select, delete, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from .Appointment import Appointment
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+# Materialized doctor–patient relationship, one row per pair that has appointments.
+# Kept current by the Appointment mapper events below, so the doctor's panel and the
+# "has this doctor seen this patient" check are single primary-key/index lookups.
+class DoctorPatientPanel(db.Model):
+    __tablename__ = "doctor_patient_panel"
+    __table_args__ = (
+        db.Index("ix_doctor_patient_panel_doctor_last_visit", "doctor_id", "last_visit"),
+    )
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True)
+    first_visit = db.Column(db.Date)
+    last_visit = db.Column(db.Date)
+    visit_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<DoctorPatientPanel Doctor:{self.doctor_id} Patient:{self.patient_id} ({self.visit_count})>"
+
+
+def refresh_panel_pair(connection, doctor_id, patient_id):
+    """Recompute one panel row from that pair's appointments (upsert, or delete when none are left)."""
+    if doctor_id is None or patient_id is None:
+        return
+    panel = DoctorPatientPanel.__table__
+    first_visit, last_visit, visit_count = connection.execute(
+        select(func.min(Appointment.date), func.max(Appointment.date), func.count(Appointment.id))
+        .where(Appointment.doctor_id == doctor_id, Appointment.patient_id == patient_id)
+    ).one()
+
+    if not visit_count:
+        connection.execute(delete(panel).where(panel.c.doctor_id == doctor_id, panel.c.patient_id == patient_id))
+        return
+
+    values = dict(first_visit=first_visit, last_visit=last_visit, visit_count=visit_count, updated_at=utc_now())
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    connection.execute(
+        insert(panel)
+        .values(doctor_id=doctor_id, patient_id=patient_id, **values)
+        .on_conflict_do_update(index_elements=["doctor_id", "patient_id"], set_=values)
+    )
+
+
+@event.listens_for(Appointment, "after_insert")
+@event.listens_for(Appointment, "after_delete")
+def _appointment_written(mapper, connection, target):
+    refresh_panel_pair(connection, target.doctor_id, target.patient_id)
+
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    state = inspect(target)
+    changed = [state.attrs[key].history for key in ("doctor_id", "patient_id", "date")]
+    if not any(h.has_changes() for h in changed):
+        return
+
+    # A reassigned appointment also leaves its old pair
+    old_doctor = (changed[0].deleted or [target.doctor_id])[0]
+    old_patient = (changed[1].deleted or [target.patient_id])[0]
+    if (old_doctor, old_patient) != (target.doctor_id, target.patient_id):
+        refresh_panel_pair(connection, old_doctor, old_patient)
+    refresh_panel_pair(connection, target.doctor_id, target.patient_id)
@@ -10,7 +10,9 @@ class Patient(db.Model):
     gender = db.Column(db.String(10))
     phone = db.Column(db.String(20))
     address = db.Column(db.String(255))
-    profile_pic = db.Column(db.Text)  # base64 or image URL
+    # Profile picture lives in the blob store (app/utils/blob_store.py); the row only keeps its hash
+    profile_pic_hash = db.Column(db.String(64))
+    profile_pic_type = db.Column(db.String(50))
 
     next_of_kin_name = db.Column(db.String(150))
     next_of_kin_id = db.Column(db.String(50))
@@ -24,5 +26,9 @@ class Patient(db.Model):
     reviews = db.relationship("Review", back_populates="patient")
     access_logs = db.relationship("AccessLog", back_populates="patient")
 
+    @property
+    def profile_pic_url(self):
+        return f"/patients/{self.id}/profile-picture" if self.profile_pic_hash else None
+
     def __repr__(self):
         return f"<Patient {self.user.name}>"
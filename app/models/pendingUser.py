@@ -5,6 +5,9 @@ def utc_now():
     return datetime.now(timezone.utc)
 class PendingUser(db.Model):
     __tablename__ = "pending_users"
+    __table_args__ = (
+        db.Index("ix_pending_users_is_accepted_expires_at", "is_accepted", "expires_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False)
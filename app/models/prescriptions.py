@@ -4,19 +4,72 @@ from datetime import datetime, timezone
 def utc_now():
     return datetime.now(timezone.utc)
 
+# Lifecycle: issued -> claimed -> verified -> dispensed, cancellable until dispensed
+PRESCRIPTION_TRANSITIONS = {
+    "issued": ("claimed", "cancelled"),
+    "claimed": ("verified", "cancelled"),
+    "verified": ("dispensed", "cancelled"),
+    "dispensed": (),
+    "cancelled": (),
+}
+# Column stamped when a prescription enters each status
+TRANSITION_TIMESTAMPS = {
+    "claimed": "claimed_at",
+    "verified": "verified_at",
+    "dispensed": "dispensed_at",
+    "cancelled": "cancelled_at",
+}
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def statuses_before(status):
+    """Statuses a prescription may move to `status` from."""
+    return [s for s, nexts in PRESCRIPTION_TRANSITIONS.items() if status in nexts]
+
+# On Postgres hash-partitioned by hospital_id (primary key (id, hospital_id)), see app/utils/tenancy.py
 class Prescription(db.Model):
     __tablename__ = "prescriptions"
+    __table_args__ = (
+        db.Index("ix_prescriptions_patient_issued", "patient_id", "issued_date"),
+        db.Index("ix_prescriptions_hospital_issued", "hospital_id", "issued_date"),
+        db.Index("ix_prescriptions_pharmacy_status_issued", "pharmacy_id", "status", "issued_date"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), nullable=False)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
     pharmacy_id = db.Column(db.Integer, db.ForeignKey("pharmacies.id"))
-    medication_details = db.Column(db.Text, nullable=False)
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id"), nullable=False)  # the doctor's, set on insert
+    # Unbounded text: deferred so list queries only read it when asked (see app/utils/projection.py)
+    medication_details = db.deferred(db.Column(db.Text, nullable=False), group="detail")
     issued_date = db.Column(db.DateTime, default=utc_now)
+    status = db.Column(db.String(20), nullable=False, default="issued", server_default="issued")  # see PRESCRIPTION_TRANSITIONS
+    claimed_at = db.Column(db.DateTime)
+    verified_at = db.Column(db.DateTime)
+    dispensed_at = db.Column(db.DateTime)
+    cancelled_at = db.Column(db.DateTime)
 
     doctor = db.relationship("Doctor", back_populates="prescriptions")
     patient = db.relationship("Patient", back_populates="prescriptions")
     pharmacy = db.relationship("Pharmacy", back_populates="prescriptions")
 
+    @db.validates("status")
+    def _check_transition(self, key, status):
+        if status not in PRESCRIPTION_TRANSITIONS:
+            raise InvalidTransition(f"Unknown prescription status {status!r}")
+        if self.status is not None and status != self.status and status not in PRESCRIPTION_TRANSITIONS[self.status]:
+            raise InvalidTransition(f"Cannot move a {self.status} prescription to {status}")
+        return status
+
+    def transition_to(self, status, at=None):
+        """Move to `status` along PRESCRIPTION_TRANSITIONS and stamp its timestamp column."""
+        if status == (self.status or "issued"):
+            raise InvalidTransition(f"Prescription is already {status}")
+        self.status = status
+        setattr(self, TRANSITION_TIMESTAMPS[status], at or utc_now())
+
     def __repr__(self):
-        return f"<Prescription {self.id}>"
\ No newline at end of file
+        return f"<Prescription {self.id} {self.status}>"
\ No newline at end of file
@@ -0,0 +1,24 @@
+from app.db import db
+from datetime import datetime, timezone
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+# One row per reminder sent, so a scheduler restart or leader change never sends it twice.
+# The slot (date, time) it was sent for is part of the key: a rescheduled appointment gets new reminders.
+class AppointmentReminder(db.Model):
+    __tablename__ = "appointment_reminders"
+    __table_args__ = (
+        db.UniqueConstraint("appointment_id", "offset_minutes", "appointment_date", "appointment_time",
+                            name="uq_appointment_reminders_appointment_offset_slot"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False)
+    offset_minutes = db.Column(db.Integer, nullable=False)
+    appointment_date = db.Column(db.Date, nullable=False)
+    appointment_time = db.Column(db.Time, nullable=False)
+    sent_at = db.Column(db.DateTime, default=utc_now)
+
+    def __repr__(self):
+        return f"<AppointmentReminder Appointment:{self.appointment_id} {self.appointment_date} {self.appointment_time} -{self.offset_minutes}m>"
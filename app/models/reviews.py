@@ -20,7 +20,7 @@ class Review(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"))
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), index=True)
     hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id"))
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
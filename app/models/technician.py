@@ -12,7 +12,7 @@ class Technician(db.Model):
     hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id"), nullable=True)  
 
     profile_pic = db.Column(db.String(255))
-    notes = db.Column(db.Text)
+    notes = db.deferred(db.Column(db.Text), group="detail")
     is_active = db.Column(db.Boolean, default=True)
     last_login = db.Column(db.DateTime, default=utc_now)
 
@@ -26,26 +26,34 @@ class Technician(db.Model):
 
 
 
+# On Postgres hash-partitioned by hospital_id (primary key (id, hospital_id)), see app/utils/tenancy.py
 class TestRequest(db.Model):
     __tablename__ = "test_requests"
+    __table_args__ = (
+        db.Index("ix_test_requests_patient_requested", "patient_id", "date_requested"),
+        db.Index("ix_test_requests_hospital_requested", "hospital_id", "date_requested"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     test_name = db.Column(db.String(150), nullable=False)
     status = db.Column(db.String(20), default="Pending") 
     date_requested = db.Column(db.DateTime, default=utc_now)
     date_completed = db.Column(db.DateTime, nullable=True)
-    results = db.Column(db.Text, nullable=True)
+    results = db.deferred(db.Column(db.Text, nullable=True), group="detail")  # loaded on demand
 
 
     # Foreign keys
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id"), nullable=False)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id"), nullable=False)
     technician_id = db.Column(db.Integer, db.ForeignKey("technicians.id"), nullable=True)
+    hospital_id = db.Column(db.Integer, db.ForeignKey("hospitals.id"), nullable=False)  # the doctor's, set on insert
 
     # Relationships
     doctor = db.relationship("Doctor", backref="test_requests")
     patient = db.relationship("Patient", backref="test_requests")
     technician = db.relationship("Technician", back_populates="test_requests")
+    values = db.relationship("LabResultValue", back_populates="test", cascade="all, delete-orphan",
+                             passive_deletes=True, order_by="LabResultValue.id")
 
     def __repr__(self):
         return f"<TestRequest {self.test_name} - {self.status}>"
@@ -1,11 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from uuid import uuid4
 from datetime import datetime, timedelta
 from app.db import db
 from app.models import PendingUser, User, Hospital, AccessLog
 from app.utils.role_required import role_required
-from app.utils.email_utils import send_invite_email
+from app.utils.email_utils import send_invite_email, send_invite_emails
+from app.utils.invites import live_invite, release_expired_invite
+from app.utils.access_log_partitions import apply_window
+from app.utils.audit_export import EXPORT_FORMATS, export_access_logs
 
 superadmin_bp = Blueprint("superadmin_bp", __name__, url_prefix="/admin")
 
@@ -25,7 +28,8 @@ def invite_user():
     if not email or not role or not name:
         return jsonify({"error": "Missing required fields (email, name, role)"}), 400
 
-    # Prevent duplicates
+    # Prevent duplicates (an expired invite no longer blocks the address)
+    release_expired_invite(email)
     if PendingUser.query.filter_by(email=email).first() or User.query.filter_by(email=email).first():
         return jsonify({"error": "A user with this email already exists"}), 400
 
@@ -73,7 +77,7 @@ def invite_user():
 @superadmin_bp.route("/pending-invites", methods=["GET"])
 @role_required("superadmin")
 def pending_invites():
-    invites = PendingUser.query.filter_by(is_accepted=False).all()
+    invites = PendingUser.query.filter(live_invite()).all()
     return jsonify([{
         "id": inv.id,
         "email": inv.email,
@@ -116,7 +120,7 @@ def pending_staff():
     # Filter pending users who match these roles and haven't accepted yet
     pending = PendingUser.query.filter(
         PendingUser.role.in_(roles),
-        PendingUser.is_accepted == False
+        live_invite()
     ).all()
 
     # Return a structured JSON list
@@ -138,7 +142,7 @@ def pending_staff():
 @superadmin_bp.route("/pending-doctors", methods=["GET"])
 @role_required("superadmin")
 def pending_doctors():
-    pending = PendingUser.query.filter_by(role="doctor", is_accepted=False).all()
+    pending = PendingUser.query.filter(PendingUser.role == "doctor", live_invite()).all()
     return jsonify([{
         "id": p.id,
         "name": p.name,
@@ -198,7 +202,7 @@ def overview():
     total_patients = User.query.filter_by(role="patient").count()
     total_doctors = User.query.filter_by(role="doctor").count()
     total_hospitals = Hospital.query.count()
-    pending_invites = PendingUser.query.filter_by(is_accepted=False).count()
+    pending_invites = PendingUser.query.filter(live_invite()).count()
 
     return jsonify({
         "total_users": total_users,
@@ -212,7 +216,13 @@ def overview():
 @superadmin_bp.route("/access-logs", methods=["GET"])
 @role_required("superadmin")
 def access_logs():
-    logs = AccessLog.query.order_by(AccessLog.accessed_at.desc()).all()
+    limit = min(request.args.get("limit", 500, type=int), 5000)
+    try:
+        query = apply_window(AccessLog.query, request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date. Use YYYY-MM-DD"}), 400
+
+    logs = query.order_by(AccessLog.accessed_at.desc()).limit(limit).all()
     return jsonify([
         {
             "id": log.id,
@@ -225,6 +235,26 @@ def access_logs():
         } for log in logs
     ]), 200
 
+#  GET /admin/access-logs/export?format=csv|ndjson&from=&to=&doctor_id=&patient_id=
+#  Streams a gzip-compressed audit extract; rows are fetched in batches from a server-side cursor
+@superadmin_bp.route("/access-logs/export", methods=["GET"])
+@role_required("superadmin")
+def export_access_logs_route():
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        stream = export_access_logs(request.args, fmt)
+    except ValueError:
+        return jsonify({"error": "Invalid filter. Dates must be YYYY-MM-DD, ids must be integers"}), 400
+
+    filename = f"access_logs_{request.args.get('from', 'all')}_{request.args.get('to', 'now')}.{fmt}.gz"
+    return Response(
+        stream_with_context(stream),
+        mimetype="application/gzip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 #  Bulk upload staff (Superadmin)
 
 @superadmin_bp.route("/upload-staff", methods=["POST"])
@@ -262,6 +292,7 @@ def upload_staff():
             continue
 
         # Skip if user or pending already exists
+        release_expired_invite(email)
         if User.query.filter_by(email=email).first() or PendingUser.query.filter_by(email=email).first():
             continue
 
@@ -279,20 +310,20 @@ def upload_staff():
             is_accepted=False,
         )
         db.session.add(pending)
-
-        # Email invite link
-        verify_link = f"{request.host_url}auth/setup-password/{token}"
-        try:
-            send_invite_email(email, token)
-        except Exception as e:
-            print(f"Failed to send email to {email}: {e}")
-        invites_sent.append(email)
+        invites_sent.append((email, token))
 
     db.session.commit()
 
+    # Email invite links in provider batches
+    failed = set(send_invite_emails(invites_sent))
+    emails = [email for email, _ in invites_sent]
+    invites_sent = [email for email in emails if email not in failed]
+    failed = [email for email in emails if email in failed]
+
     return jsonify({
         "message": f"Invites sent successfully to {len(invites_sent)} users",
-        "emails": invites_sent
+        "emails": invites_sent,
+        "failed": failed
     }), 201
 
 
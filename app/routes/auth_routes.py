@@ -8,6 +8,8 @@ from flask_jwt_extended import (
 from datetime import timedelta
 from app.db import db
 from app.models import User, PendingUser, Patient, Doctor, Hospital, Pharmacy, Technician
+from app.utils.invites import find_live_invite
+from app.utils.tenancy import tenant_claims
 from app.utils.email_utils import send_invite_email, send_reset_email
 from app.utils.tokens import generate_token, verify_token
 
@@ -38,7 +40,7 @@ def register():
 
     access_token = create_access_token(
         identity=str(user.id),
-        additional_claims={"role": user.role},
+        additional_claims={"role": user.role, **tenant_claims(db.session, user)},
         expires_delta=timedelta(days=1)
     )
 
@@ -65,7 +67,7 @@ def login():
 
     token = create_access_token(
         identity=str(user.id),
-        additional_claims={"role": user.role},
+        additional_claims={"role": user.role, **tenant_claims(db.session, user)},
         expires_delta=timedelta(days=1)
     )
 
@@ -150,7 +152,7 @@ def confirm_reset_password(token):
 # ET/POST — Invite Activation
 @auth_bp.route("/setup-password/<token>", methods=["GET", "POST"])
 def setup_password(token):
-    pending = PendingUser.query.filter_by(invite_token=token, is_accepted=False).first()
+    pending = find_live_invite(token)
     if not pending:
         return jsonify({"error": "Invalid or expired invite link"}), 400
 
@@ -237,7 +239,7 @@ def setup_password(token):
     # Generate access token
     token = create_access_token(
         identity=str(user.id),
-        additional_claims={"role": user.role},
+        additional_claims={"role": user.role, **tenant_claims(db.session, user)},
         expires_delta=timedelta(hours=2)
     )
 
@@ -1,16 +1,25 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity
 from datetime import datetime
+from sqlalchemy import select, update, cast, case, column, values as sa_values
 from app.db import db
-from app.models import Doctor, Appointment, Patient, MedicalRecord, AccessLog
+from app.models import Doctor, Appointment, Patient, MedicalRecord, AccessLog, User, DoctorPatientPanel
+from app.models.activity import rollup_appointment_statuses
 from app.utils.role_required import role_required
+from app.utils.replicas import use_primary
+from app.utils.access_log_partitions import apply_window
+from app.utils.blind_index import index_medical_record
+from app.utils.doctor_search import refresh_doctor_search
 
 doctor_bp = Blueprint("doctor_bp", __name__, url_prefix="/doctors")
 
+MAX_BULK_STATUS_UPDATES = 200
+
 
 #  GET /doctors/profile — View doctor profile
 @doctor_bp.route("/profile", methods=["GET"])
 @role_required("doctor")
+@use_primary  # shown right after profile edits
 def get_doctor_profile():
     user_id = int(get_jwt_identity())
     doctor = Doctor.query.filter_by(user_id=user_id).first()
@@ -105,6 +114,82 @@ def update_appointment_status(appointment_id):
     return jsonify({"message": f"Appointment status updated to '{new_status}'."}), 200
 
 
+def _bulk_status_update(doctor_id, statuses):
+    """One UPDATE for {appointment_id: status}: joined to a VALUES list on Postgres, a CASE elsewhere (SQLite)."""
+    table = Appointment.__table__
+    stmt = update(table).where(table.c.doctor_id == doctor_id)
+    if db.session.get_bind().dialect.name == "postgresql":
+        # UPDATE appointments SET status = v.status FROM (VALUES ...) AS v(id, status) WHERE appointments.id = v.id
+        new_values = sa_values(column("id", db.Integer), column("status", db.String), name="v").data(list(statuses.items()))
+        return stmt.where(table.c.id == new_values.c.id).values(status=cast(new_values.c.status, table.c.status.type))
+    return stmt.where(table.c.id.in_(statuses)).values(status=case(statuses, value=table.c.id))
+
+
+# PUT /doctors/appointments/status — Update many appointment statuses at once
+# Body: {"updates": [{"appointment_id": 1, "status": "accepted"}, ...]}
+@doctor_bp.route("/appointments/status", methods=["PUT"])
+@role_required("doctor")
+def bulk_update_appointment_status():
+    user_id = int(get_jwt_identity())
+    doctor = Doctor.query.filter_by(user_id=user_id).first()
+
+    if not doctor:
+        return jsonify({"error": "Doctor profile not found"}), 404
+
+    updates = (request.get_json() or {}).get("updates")
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "updates must be a non-empty list of {appointment_id, status}"}), 400
+    if len(updates) > MAX_BULK_STATUS_UPDATES:
+        return jsonify({"error": f"At most {MAX_BULK_STATUS_UPDATES} updates per request"}), 400
+
+    valid_statuses = ["accepted", "declined", "completed"]
+    results, pending, seen = [], {}, set()
+    for item in updates:
+        item = item if isinstance(item, dict) else {}
+        appointment_id, new_status = item.get("appointment_id"), item.get("status")
+        result = {"appointment_id": appointment_id, "status": new_status}
+        results.append(result)
+        if not isinstance(appointment_id, int) or isinstance(appointment_id, bool):
+            result["error"] = "appointment_id must be an integer"
+        elif appointment_id in seen:
+            result["error"] = "Duplicate appointment_id in request"
+        elif new_status not in valid_statuses:
+            result["error"] = f"Invalid status. Must be one of {valid_statuses}"
+        else:
+            pending[appointment_id] = new_status
+            seen.add(appointment_id)
+
+    # Ownership of every candidate in one query (rows stay locked until the update commits)
+    owned = []
+    if pending:
+        owned = db.session.execute(
+            select(Appointment.id, Appointment.hospital_id, Appointment.doctor_id, Appointment.date,
+                   Appointment.time, Appointment.status)
+            .where(Appointment.id.in_(pending), Appointment.doctor_id == doctor.id)
+            .with_for_update()
+        ).all()
+    owned_ids = {row.id for row in owned}
+    for result in results:
+        if "error" not in result and result["appointment_id"] not in owned_ids:
+            result["error"] = "Appointment not found"
+            pending.pop(result["appointment_id"], None)
+
+    if pending:
+        db.session.execute(_bulk_status_update(doctor.id, pending))
+        # The bulk UPDATE skips mapper events, so refresh the rollups and the doctor's search row here
+        rollup_appointment_statuses(db.session.connection(), owned, pending)
+        refresh_doctor_search(db.session.connection(), {doctor.id})
+        db.session.commit()
+
+    for result in results:
+        result["updated"] = "error" not in result
+
+    return jsonify({
+        "message": f"{len(pending)} of {len(results)} appointments updated.",
+        "data": results
+    }), 200
+
+
 # POST /doctors/medical-records — Add or update a medical record
 @doctor_bp.route("/medical-records", methods=["POST"])
 @role_required("doctor")
@@ -123,23 +208,28 @@ def add_or_update_medical_record():
     if not all([patient_id, diagnosis, prescription]):
         return jsonify({"error": "Missing required fields (patient_id, diagnosis, prescription)."}), 400
 
+    if not doctor.hospital_id:
+        return jsonify({"error": "Doctor is not assigned to a hospital"}), 400
+
     record = MedicalRecord.query.filter_by(doctor_id=doctor.id, patient_id=patient_id).first()
 
+    # The prescription is kept in the record's treatment field
     if record:
         record.diagnosis = diagnosis
-        record.prescription = prescription
+        record.treatment = prescription
         record.updated_at = datetime.utcnow()
         message = "Medical record updated."
     else:
-        new_record = MedicalRecord(
+        record = MedicalRecord(
             doctor_id=doctor.id,
             patient_id=patient_id,
             diagnosis=diagnosis,
-            prescription=prescription,
+            treatment=prescription,
             created_at=datetime.utcnow(),
         )
-        db.session.add(new_record)
+        db.session.add(record)
         message = "Medical record added."
+    index_medical_record(record, {"diagnosis": diagnosis, "treatment": prescription})
 
     db.session.commit()
     return jsonify({"message": message}), 201
@@ -155,11 +245,15 @@ def get_doctor_patients():
     if not doctor:
         return jsonify({"error": "Doctor profile not found"}), 404
 
-    patients = (
-        db.session.query(Patient)
-        .join(Appointment, Appointment.patient_id == Patient.id)
-        .filter(Appointment.doctor_id == doctor.id)
-        .distinct()
+    panel = (
+        db.session.query(
+            Patient.id, User.name, User.email, Patient.gender,
+            DoctorPatientPanel.first_visit, DoctorPatientPanel.last_visit, DoctorPatientPanel.visit_count
+        )
+        .join(Patient, Patient.id == DoctorPatientPanel.patient_id)
+        .join(User, User.id == Patient.user_id)
+        .filter(DoctorPatientPanel.doctor_id == doctor.id)
+        .order_by(DoctorPatientPanel.last_visit.desc())
         .all()
     )
 
@@ -168,11 +262,14 @@ def get_doctor_patients():
         "data": [
             {
                 "id": p.id,
-                "name": p.user.name,
-                "email": p.user.email,
-                "gender": getattr(p, "gender", None)
+                "name": p.name,
+                "email": p.email,
+                "gender": p.gender,
+                "first_visit": p.first_visit,
+                "last_visit": p.last_visit,
+                "visit_count": p.visit_count,
             }
-            for p in patients
+            for p in panel
         ]
     }), 200
 
@@ -187,7 +284,13 @@ def get_access_logs():
     if not doctor:
         return jsonify({"error": "Doctor profile not found"}), 404
 
-    logs = AccessLog.query.filter_by(doctor_id=doctor.id).order_by(AccessLog.accessed_at.desc()).all()
+    limit = min(request.args.get("limit", 500, type=int), 5000)
+    try:
+        query = apply_window(AccessLog.query.filter_by(doctor_id=doctor.id), request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date. Use YYYY-MM-DD"}), 400
+
+    logs = query.order_by(AccessLog.accessed_at.desc()).limit(limit).all()
     return jsonify({
         "message": "Access logs retrieved successfully.",
         "data": [
@@ -1,12 +1,19 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 from sqlalchemy.exc import IntegrityError
 from app.db import db
-from app.models import Hospital, User, Doctor, Technician, Pharmacy, PendingUser
-from app.utils.email_utils import send_invite_email
+from app.models import Hospital, HospitalDeletionJob, User, Doctor, Technician, Pharmacy, PendingUser
+from app.utils.hospital_deletion import claim_hospital_deletion, start_hospital_deletion
+from app.utils.staff_roster import staff_roster, normalize_role, STAFF_ROLES
+from app.utils.email_utils import send_invite_email, send_invite_emails
+from app.utils.invites import release_expired_invite
 from app.utils.tokens import generate_token
 from app.utils.time import utc_now
 from app.utils.role_required import role_required
+from app.utils.tenancy import current_hospital_id
+from app.utils.activity_rollups import (
+    GRANULARITIES, ReportRangeError, daily_activity, doctor_activity, hourly_activity, report_range
+)
 import csv, io, json
 from uuid import uuid4
 from datetime import datetime, timedelta
@@ -39,6 +46,7 @@ def invite_staff():
         # Prevent duplicate invites or existing accounts
         if User.query.filter_by(email=email).first():
             return jsonify({"error": "A user with this email already exists"}), 400
+        release_expired_invite(email)
         if PendingUser.query.filter_by(email=email).first():
             return jsonify({"error": "An invite has already been sent to this email"}), 400
 
@@ -77,7 +85,7 @@ def invite_staff():
         return jsonify({"error": "Failed to send invite", "details": str(e)}), 500
 
 
-# delete hospital — Superadmin only
+# delete hospital — Superadmin only (runs as a background job, see app/utils/hospital_deletion.py)
 @hospital_bp.delete("/hospitals/<int:id>")
 @role_required("superadmin")
 def delete_hospital(id):
@@ -85,15 +93,47 @@ def delete_hospital(id):
     if not hospital:
         return jsonify({"error": "Hospital not found"}), 404
 
-    for doc in hospital.doctors:
-        if doc.user:
-            db.session.delete(doc.user)
-    for pending in hospital.pending_users:
-        db.session.delete(pending)
+    job = HospitalDeletionJob.query.filter(
+        HospitalDeletionJob.hospital_id == id,
+        HospitalDeletionJob.status.in_(["pending", "running"])
+    ).first()
+    if not job:
+        job = HospitalDeletionJob(hospital_id=id, requested_by=int(get_jwt_identity()), status="pending")
+        db.session.add(job)
+        db.session.commit()
+        if claim_hospital_deletion(job.id):
+            start_hospital_deletion(current_app._get_current_object(), job.id)
 
-    db.session.delete(hospital)
-    db.session.commit()
-    return jsonify({"message": f"Hospital {id} deleted successfully"}), 200
+    return jsonify({
+        "message": f"Deletion of hospital {id} started",
+        "job": job.to_dict()
+    }), 202
+
+
+# deletion job progress — Superadmin only
+@hospital_bp.get("/hospitals/deletion-jobs/<int:job_id>")
+@role_required("superadmin")
+def get_deletion_job(job_id):
+    job = HospitalDeletionJob.query.get(job_id)
+    if not job:
+        return jsonify({"error": "Deletion job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+# resume a failed or interrupted deletion job — Superadmin only
+@hospital_bp.post("/hospitals/deletion-jobs/<int:job_id>/resume")
+@role_required("superadmin")
+def resume_deletion_job(job_id):
+    job = HospitalDeletionJob.query.get(job_id)
+    if not job:
+        return jsonify({"error": "Deletion job not found"}), 404
+    if job.status == "completed":
+        return jsonify({"error": "Deletion job already completed"}), 400
+    if not claim_hospital_deletion(job.id):
+        return jsonify({"error": "Deletion job is already running"}), 409
+
+    start_hospital_deletion(current_app._get_current_object(), job.id)
+    return jsonify({"message": f"Deletion job {job.id} resumed", "job": job.to_dict()}), 202
 
 
 # upload staff(CSV or JSON) — Hospital Admin only
@@ -136,6 +176,7 @@ def upload_staff(id):
             continue
 
         # Prevent duplicates
+        release_expired_invite(email)
         if User.query.filter_by(email=email).first() or PendingUser.query.filter_by(email=email).first():
             skipped.append({"email": email, "reason": "Already exists or invited"})
             continue
@@ -155,14 +196,7 @@ def upload_staff(id):
             is_accepted=False
         )
         db.session.add(pending)
-
-        try:
-            # Send invite email
-            send_invite_email(email, token)
-            invites_sent.append(email)
-        except Exception as e:
-            print(f"Email send failed for {email}: {e}")
-            skipped.append({"email": email, "reason": "Email send failed"})
+        invites_sent.append((email, token))
 
     # Commit all valid invites
     try:
@@ -171,6 +205,11 @@ def upload_staff(id):
         db.session.rollback()
         return jsonify({"error": "Some invites could not be processed"}), 400
 
+    # Send invite emails in provider batches
+    failed = set(send_invite_emails(invites_sent))
+    skipped.extend({"email": email, "reason": "Email send failed"} for email, _ in invites_sent if email in failed)
+    invites_sent = [email for email, _ in invites_sent if email not in failed]
+
     return jsonify({
         "message": f"Processed {len(staff_data)} staff records",
         "invites_sent": invites_sent,
@@ -178,6 +217,13 @@ def upload_staff(id):
     }), 201
 
 
+def _page_args():
+    """Optional ?limit=&offset= pagination shared by the roster endpoints."""
+    limit = request.args.get("limit", type=int)
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    return (min(max(limit, 1), 500) if limit else None), offset
+
+
 # get staff— Hospital Admin or Superadmin
 @hospital_bp.get("/hospitals/<int:id>/staff")
 @role_required("hospital_admin", "superadmin","hospital")
@@ -186,51 +232,44 @@ def get_staff(id):
     if not hospital:
         return jsonify({"error": "Hospital not found"}), 404
 
-    doctors = [
-        {"id": d.id, "name": d.user.name, "email": d.user.email, "role": "doctor"}
-        for d in hospital.doctors
-    ]
-    techs = [
-        {"id": t.id, "name": t.user.name, "email": t.user.email, "role": "labtech"}
-        for t in Technician.query.filter_by(hospital_id=id).all()
-    ]
-    pharmas = [
-        {"id": p.id, "name": p.user.name, "email": p.user.email, "role": "pharmacist"}
-        for p in Pharmacy.query.filter_by(hospital_id=id).all()
-    ]
+    role = request.args.get("role")
+    if role and not normalize_role(role):
+        return jsonify({"error": f"Invalid role. Must be one of {list(STAFF_ROLES)}"}), 400
+
+    limit, offset = _page_args()
+    staff = staff_roster(id, role=normalize_role(role), limit=limit, offset=offset)
+    return jsonify([
+        {"id": s.id, "name": s.name, "email": s.email, "role": s.role} for s in staff
+    ]), 200
+
 
-    staff = doctors + techs + pharmas
-    return jsonify(staff), 200
+def _role_roster(id, role):
+    limit, offset = _page_args()
+    return jsonify([
+        {"id": s.id, "name": s.name, "email": s.email}
+        for s in staff_roster(id, role=role, limit=limit, offset=offset)
+    ]), 200
 
 
 # get doctors — Any Authenticated Role
 @hospital_bp.get("/hospitals/<int:id>/doctors")
 @role_required("superadmin", "hospital_admin", "doctor", "pharmacist", "labtech","hospital")
 def get_doctors(id):
-    doctors = Doctor.query.filter_by(hospital_id=id).all()
-    return jsonify([
-        {"id": d.id, "name": d.user.name, "email": d.user.email} for d in doctors
-    ]), 200
+    return _role_roster(id, "doctor")
 
 
 # get lab techs — Any Authenticated Role
 @hospital_bp.get("/hospitals/<int:id>/labtechs")
 @role_required("superadmin", "hospital_admin", "doctor", "pharmacist", "labtech","hospital")
 def get_labtechs(id):
-    techs = Technician.query.filter_by(hospital_id=id).all()
-    return jsonify([
-        {"id": t.id, "name": t.user.name, "email": t.user.email} for t in techs
-    ]), 200
+    return _role_roster(id, "labtech")
 
 
 # get pharmacy — Any Authenticated Role
 @hospital_bp.get("/hospitals/<int:id>/pharmacists")
 @role_required("superadmin", "hospital_admin", "doctor", "pharmacist", "labtech","hospital")
 def get_pharmacists(id):
-    pharmas = Pharmacy.query.filter_by(hospital_id=id).all()
-    return jsonify([
-        {"id": p.id, "name": p.user.name, "email": p.user.email} for p in pharmas
-    ]), 200
+    return _role_roster(id, "pharmacist")
 
 
 # Getting hospital information after signing the agreement
@@ -265,4 +304,74 @@ def update_agreement(id):
     return jsonify({
         "message": f"Hospital {hospital.name} has signed the Data-Sharing Agreement",
         "agreement_signed": True
+    }), 200
+
+
+def _activity_args(id):
+    """(start, end) of an activity report, or an error response for the caller or the range."""
+    if get_jwt().get("role") != "superadmin" and current_hospital_id(db.session) != id:
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+    if not db.session.get(Hospital, id):
+        return None, (jsonify({"error": "Hospital not found"}), 404)
+    try:
+        return report_range(request.args), None
+    except ReportRangeError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+
+# Activity dashboard: appointments by status, prescriptions issued, lab tests requested/completed
+# GET /hospitals/<id>/activity?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month
+@hospital_bp.get("/hospitals/<int:id>/activity")
+@role_required("hospital_admin", "superadmin", "hospital")
+def get_hospital_activity(id):
+    window, error = _activity_args(id)
+    if error:
+        return error
+
+    granularity = request.args.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"Invalid granularity. Must be one of {list(GRANULARITIES)}"}), 400
+
+    start, end = window
+    return jsonify({
+        "hospital_id": id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "granularity": granularity,
+        **daily_activity(db.session, id, start, end, granularity),
+    }), 200
+
+
+# GET /hospitals/<id>/activity/doctors?from=&to=&limit=&offset= — appointments per doctor by status
+@hospital_bp.get("/hospitals/<int:id>/activity/doctors")
+@role_required("hospital_admin", "superadmin", "hospital")
+def get_hospital_doctor_activity(id):
+    window, error = _activity_args(id)
+    if error:
+        return error
+
+    start, end = window
+    limit, offset = _page_args()
+    return jsonify({
+        "hospital_id": id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "doctors": doctor_activity(db.session, id, start, end, limit, offset),
+    }), 200
+
+
+# GET /hospitals/<id>/activity/hours?from=&to= — appointments per hour of the day
+@hospital_bp.get("/hospitals/<int:id>/activity/hours")
+@role_required("hospital_admin", "superadmin", "hospital")
+def get_hospital_hourly_activity(id):
+    window, error = _activity_args(id)
+    if error:
+        return error
+
+    start, end = window
+    return jsonify({
+        "hospital_id": id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "hours": hourly_activity(db.session, id, start, end),
     }), 200
\ No newline at end of file
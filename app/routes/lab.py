@@ -1,12 +1,57 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from app.db import db
-from app.models import Technician, TestRequest, User, Patient, Doctor
+from app.models import Technician, TestRequest, User, Patient, Doctor, DoctorPatientPanel, LabResultValue
 from app.utils.role_required import role_required
+from app.utils.projection import FieldError, requested_fields, undefer_options, project
+from app.utils.lab_results import (
+    LabValueError, apply_trend_window, build_result_values, normalize_analyte, parse_result_lines
+)
+from app.utils.lab_analytics import (
+    DEFAULT_DELTA_PERCENT, DEFAULT_WINDOW, cached_patient_analytics, invalidate_patient, population_bands
+)
+from app.utils.tenancy import NO_HOSPITAL, current_hospital_id
 
 lab_bp = Blueprint("lab_bp", __name__)
 
+
+def _user_attr(person, attr):
+    return getattr(person.user, attr) if person and person.user else None
+
+
+# Lab test output; `results` is deferred and only returned with ?detail=true or ?fields=
+LAB_TEST_FIELDS = {
+    "id": lambda t: t.id,
+    "test_name": lambda t: t.test_name,
+    "patient_name": lambda t: _user_attr(t.patient, "name"),
+    "patient_email": lambda t: _user_attr(t.patient, "email"),
+    "doctor_name": lambda t: _user_attr(t.doctor, "name"),
+    "doctor_email": lambda t: _user_attr(t.doctor, "email"),
+    "technician_name": lambda t: _user_attr(t.technician, "name"),
+    "technician_email": lambda t: _user_attr(t.technician, "email"),
+    "status": lambda t: t.status,
+    "results": lambda t: t.results,
+    "date_requested": lambda t: t.date_requested.isoformat() if t.date_requested else None,
+    "date_completed": lambda t: t.date_completed.isoformat() if t.date_completed else None,
+}
+LAB_TEST_DEFERRED = {"results": TestRequest.results}
+ASSIGNED_FIELDS = ("id", "test_name", "patient_name", "patient_email", "doctor_name", "doctor_email",
+                   "technician_name", "technician_email", "status", "results", "date_requested")
+HISTORY_FIELDS = ("id", "test_name", "patient_name", "doctor_name", "status", "results",
+                  "date_requested", "date_completed")
+
+
+def list_lab_tests(query, available):
+    """Run a lab test list query; summary rows leave out `results` unless requested."""
+    getters = {name: LAB_TEST_FIELDS[name] for name in available}
+    fields = requested_fields(request.args, getters, [name for name in available if name != "results"])
+    tests = query.options(*undefer_options(fields, LAB_TEST_DEFERRED)).all()
+    return [project(t, fields, getters) for t in tests]
+
+
 # GET /labtests — Get assigned & pending tests
 @lab_bp.route("/labtests", methods=["GET"])
 @jwt_required()
@@ -15,27 +60,33 @@ def get_assigned_tests():
     user_id = get_jwt_identity()
     technician = Technician.query.filter_by(user_id=user_id).first_or_404()
 
-    tests = TestRequest.query.filter_by(technician_id=technician.id, status="Pending").all()
-
-    response = []
-    for t in tests:
-        response.append({
-            "id": t.id,
-            "test_name": t.test_name,
-            "patient_name": t.patient.user.name if t.patient and t.patient.user else None,
-            "patient_email": t.patient.user.email if t.patient and t.patient.user else None,
-            "doctor_name": t.doctor.user.name if t.doctor and t.doctor.user else None,
-            "doctor_email": t.doctor.user.email if t.doctor and t.doctor.user else None,
-            "technician_name": technician.user.name if technician.user else None,
-            "technician_email": technician.user.email if technician.user else None,
-            "status": t.status,
-            "results": t.results,
-            "date_requested": t.date_requested.isoformat() if t.date_requested else None,
-        })
+    try:
+        response = list_lab_tests(
+            TestRequest.query.filter_by(technician_id=technician.id, status="Pending"), ASSIGNED_FIELDS
+        )
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify(response), 200
 
 
+# GET /labtests/<id> — One test with its full results
+@lab_bp.route("/labtests/<int:id>", methods=["GET"])
+@jwt_required()
+@role_required("technician")
+def get_test(id):
+    user_id = get_jwt_identity()
+    technician = Technician.query.filter_by(user_id=user_id).first_or_404()
+
+    test = (
+        TestRequest.query
+        .filter_by(id=id, technician_id=technician.id)
+        .options(undefer(TestRequest.results))
+        .first_or_404()
+    )
+    return jsonify(project(test, LAB_TEST_FIELDS, LAB_TEST_FIELDS)), 200
+
+
 # POST /labtests/<id>/update — Update test results
 @lab_bp.route("/labtests/<int:id>/update", methods=["POST"])
 @jwt_required()
@@ -52,6 +103,9 @@ def update_test(id):
         return jsonify({"error": "Invalid status. Must be 'Pending' or 'Completed'."}), 400
 
     results = data.get("results")
+    values = data.get("values")
+    if values is not None and not isinstance(values, list):
+        return jsonify({"error": "values must be a list of {analyte, value, unit, ref_low, ref_high}"}), 400
 
     if results:
         test.results = results.strip()
@@ -60,13 +114,27 @@ def update_test(id):
         if status == "Completed":
             test.date_completed = datetime.utcnow()
 
+    # Explicit values replace the test's previous ones; otherwise new text replaces them with
+    # what can be parsed from it, which may be nothing
+    if values is None and results:
+        values = parse_result_lines(results)
+    if values is not None:
+        try:
+            test.values = build_result_values(test, values, test.date_completed or datetime.utcnow())
+        except LabValueError as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
+
     db.session.commit()
+    if values is not None or status == "Completed":
+        invalidate_patient(test.patient_id)
 
     return jsonify({
         "message": "Test request updated successfully.",
         "id": test.id,
         "status": test.status,
-        "results": test.results
+        "results": test.results,
+        "values": [v.to_dict() for v in test.values]
     }), 200
 
 
@@ -78,24 +146,123 @@ def completed_tests_history():
     user_id = get_jwt_identity()
     technician = Technician.query.filter_by(user_id=user_id).first_or_404()
 
-    completed_tests = (
-        TestRequest.query
-        .filter_by(technician_id=technician.id, status="Completed")
-        .order_by(TestRequest.date_completed.desc())
-        .all()
+    try:
+        response = list_lab_tests(
+            TestRequest.query
+            .filter_by(technician_id=technician.id, status="Completed")
+            .order_by(TestRequest.date_completed.desc()),
+            HISTORY_FIELDS,
+        )
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(response), 200
+
+
+def _patient_access_error(patient_id):
+    """Error response if the caller may not read this patient's lab results, else None."""
+    user_id = int(get_jwt_identity())
+    role = get_jwt().get("role")
+
+    if role == "patient":
+        patient = Patient.query.filter_by(user_id=user_id).first()
+        if not patient or patient.id != patient_id:
+            return jsonify({"error": "Unauthorized"}), 403
+    elif role == "doctor":
+        doctor = Doctor.query.filter_by(user_id=user_id).first()
+        if not doctor:
+            return jsonify({"error": "Doctor profile not found"}), 404
+        if not db.session.get(DoctorPatientPanel, (doctor.id, patient_id)):
+            return jsonify({"error": "Doctor has no access to this patient's records"}), 403
+    return None
+
+
+# GET /patients/<patient_id>/lab-results/<analyte>?from=YYYY-MM-DD&to=YYYY-MM-DD — one analyte over time
+@lab_bp.route("/patients/<int:patient_id>/lab-results/<analyte>", methods=["GET"])
+@role_required("patient", "doctor", "admin")
+def get_analyte_trend(patient_id, analyte):
+    denied = _patient_access_error(patient_id)
+    if denied:
+        return denied
+
+    try:
+        analyte = normalize_analyte(analyte)
+    except LabValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # One range scan on ix_lab_result_values_patient_analyte_measured
+    stmt = (
+        select(LabResultValue.measured_at, LabResultValue.value, LabResultValue.unit, LabResultValue.ref_low,
+               LabResultValue.ref_high, LabResultValue.flag, LabResultValue.test_request_id)
+        .where(LabResultValue.patient_id == patient_id, LabResultValue.analyte == analyte)
+        .order_by(LabResultValue.measured_at)
     )
+    try:
+        stmt = apply_trend_window(stmt, request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date. Use YYYY-MM-DD"}), 400
 
-    response = []
-    for t in completed_tests:
-        response.append({
-            "id": t.id,
-            "test_name": t.test_name,
-            "patient_name": t.patient.user.name if t.patient and t.patient.user else None,
-            "doctor_name": t.doctor.user.name if t.doctor and t.doctor.user else None,
-            "status": t.status,
-            "results": t.results,
-            "date_requested": t.date_requested.isoformat() if t.date_requested else None,
-            "date_completed": t.date_completed.isoformat() if t.date_completed else None,
-        })
+    points = [
+        {
+            "measured_at": row.measured_at.isoformat(),
+            "value": row.value,
+            "unit": row.unit,
+            "ref_low": row.ref_low,
+            "ref_high": row.ref_high,
+            "flag": row.flag,
+            "test_id": row.test_request_id,
+        }
+        for row in db.session.execute(stmt)
+    ]
+    return jsonify({"patient_id": patient_id, "analyte": analyte, "count": len(points), "points": points}), 200
 
-    return jsonify(response), 200
+
+# GET /patients/<patient_id>/lab-analytics?analyte=HGB,GLU&window=5&delta_percent=25
+# Per analyte: range flags, deltas with delta checks, rolling mean/std and a summary
+@lab_bp.route("/patients/<int:patient_id>/lab-analytics", methods=["GET"])
+@role_required("doctor", "admin")
+def get_patient_lab_analytics(patient_id):
+    denied = _patient_access_error(patient_id)
+    if denied:
+        return denied
+
+    try:
+        analytes = [normalize_analyte(a) for a in request.args.get("analyte", "").split(",") if a.strip()]
+    except LabValueError as e:
+        return jsonify({"error": str(e)}), 400
+    window = request.args.get("window", DEFAULT_WINDOW, type=int)
+    delta_percent = request.args.get("delta_percent", DEFAULT_DELTA_PERCENT, type=float)
+    if not 2 <= window <= 100 or not 0 < delta_percent <= 1000:
+        return jsonify({"error": "window must be 2-100 and delta_percent 0-1000"}), 400
+
+    analytics = cached_patient_analytics(
+        db.session, patient_id, current_hospital_id(db.session), analytes, window, delta_percent
+    )
+    return jsonify({
+        "patient_id": patient_id,
+        "window": window,
+        "delta_percent": delta_percent,
+        "analytes": analytics,
+    }), 200
+
+
+# GET /lab-analytics/population/<analyte>?hospital_id=&from=YYYY-MM-DD — percentile bands across a hospital
+# Hospital staff always get their own hospital; admins choose one with ?hospital_id= (or all hospitals)
+@lab_bp.route("/lab-analytics/population/<analyte>", methods=["GET"])
+@role_required("doctor", "hospital", "hospital_admin", "admin")
+def get_population_bands(analyte):
+    try:
+        analyte = normalize_analyte(analyte)
+        since = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+    except LabValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid date. Use YYYY-MM-DD"}), 400
+
+    hospital_id = current_hospital_id(db.session)
+    if get_jwt().get("role") == "admin":
+        hospital_id = request.args.get("hospital_id", type=int)
+    elif hospital_id is NO_HOSPITAL:
+        return jsonify({"error": "Not assigned to a hospital"}), 403
+
+    return jsonify({"hospital_id": hospital_id, **population_bands(db.session, analyte, hospital_id, since)}), 200
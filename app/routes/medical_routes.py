@@ -1,38 +1,52 @@
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from flask import Blueprint, request, jsonify
 from app.db import db
-from app.models import MedicalRecord, Appointment, Patient, Doctor
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app.models import MedicalRecord, MedicalRecordTerm, Appointment, Patient, Doctor, Hospital, DoctorPatientPanel
 from app.utils.role_required import role_required
 from app.utils.log_access import log_access
-from app.utils.encryption import encrypt_text, decrypt_text  # <-- import helpers
+from app.utils.blind_index import INDEXED_FIELDS, index_medical_record, query_tokens
+from app.utils.projection import FieldError, requested_fields, undefer_options, project
 
 medical_bp = Blueprint("medical_bp", __name__, url_prefix="/medical-records")
 
-def serialize_record(r):
-    appointment = Appointment.query.get(r.appointment_id)
-    doctor = Doctor.query.get(r.doctor_id)
-    patient = Patient.query.get(r.patient_id)
-
-    return {
-        "id": r.id,
-        "diagnosis": decrypt_text(r.diagnosis),
-        "treatment": decrypt_text(r.treatment),
-        "notes": decrypt_text(r.notes),
-        "doctor": {
-            "id": doctor.id,
-            "name": doctor.user.name,
-            "specialization": doctor.specialization
-        } if doctor else None,
-        "patient": {
-            "id": patient.id,
-        } if patient else None,
-        "appointment": {
-            "id": appointment.id,
-            "date": str(appointment.date),
-            "time": str(appointment.time)
-        } if appointment else None,
-        "created_at": r.created_at.isoformat()
-    }
+# Record output; notes are deferred and only returned with ?detail=true or ?fields=
+RECORD_FIELDS = {
+    "id": lambda r: r.id,
+    "diagnosis": lambda r: r.diagnosis,
+    "treatment": lambda r: r.treatment,
+    "notes": lambda r: r.notes,
+    "doctor": lambda r: {
+        "id": r.doctor.id,
+        "name": r.doctor.user.name,
+        "specialization": r.doctor.specialization
+    } if r.doctor else None,
+    "patient": lambda r: {
+        "id": r.patient_id,
+    } if r.patient_id else None,
+    "appointment": lambda r: {
+        "id": r.appointment.id,
+        "date": str(r.appointment.date),
+        "time": str(r.appointment.time)
+    } if r.appointment else None,
+    "created_at": lambda r: r.created_at.isoformat(),
+}
+RECORD_SUMMARY = tuple(f for f in RECORD_FIELDS if f != "notes")
+RECORD_DEFERRED = {"notes": MedicalRecord._notes}
+
+
+def serialize_record(r, fields=RECORD_FIELDS):
+    return project(r, fields, RECORD_FIELDS)
+
+
+def record_list_query(fields):
+    """MedicalRecord query loading what the requested fields serialize in the same round trip."""
+    return MedicalRecord.query.options(
+        joinedload(MedicalRecord.doctor).joinedload(Doctor.user),
+        joinedload(MedicalRecord.appointment),
+        *undefer_options(fields, RECORD_DEFERRED),
+    )
 
 # GET all records for a specific patient
 @medical_bp.route("/patient/<int:patient_id>", methods=["GET"])
@@ -51,18 +65,104 @@ def get_records_for_patient(patient_id):
         if not doctor:
             return jsonify({"error": "Doctor profile not found"}), 404
 
-        appointment = Appointment.query.filter_by(
-            patient_id=patient_id,
-            doctor_id=doctor.id
-        ).first()
-
-        if not appointment:
+        if not db.session.get(DoctorPatientPanel, (doctor.id, patient_id)):
             return jsonify({"error": "Doctor has no access to this patient's records"}), 403
 
+    try:
+        fields = requested_fields(request.args, RECORD_FIELDS, RECORD_SUMMARY)
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
     log_access(doctor_id=doctor.id if doctor else None, patient_id=patient_id)
 
-    records = MedicalRecord.query.filter_by(patient_id=patient_id).all()
-    return jsonify([serialize_record(r) for r in records]), 200
+    records = record_list_query(fields).filter_by(patient_id=patient_id).all()
+    return jsonify([serialize_record(r, fields) for r in records]), 200
+
+
+# GET one record with its notes
+@medical_bp.route("/<int:id>", methods=["GET"])
+@jwt_required()
+def get_record(id):
+    user_id = int(get_jwt_identity())
+    role = get_jwt().get("role")
+
+    record = record_list_query(RECORD_FIELDS).filter_by(id=id).first_or_404()
+
+    if role == "patient" and user_id != record.patient_id:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    doctor = None
+    if role == "doctor":
+        doctor = Doctor.query.filter_by(user_id=user_id).first()
+        if not doctor:
+            return jsonify({"error": "Doctor profile not found"}), 404
+
+        if not db.session.get(DoctorPatientPanel, (doctor.id, record.patient_id)):
+            return jsonify({"error": "Doctor has no access to this patient's records"}), 403
+
+    log_access(doctor_id=doctor.id if doctor else None, patient_id=record.patient_id)
+    return jsonify(serialize_record(record)), 200
+
+# GET /medical-records/search?q=<terms>&field=diagnosis — match encrypted records via the blind index
+@medical_bp.route("/search", methods=["GET"])
+@role_required("doctor", "hospital", "hospital_admin", "admin", "superadmin")
+def search_records():
+    user_id = int(get_jwt_identity())
+    role = get_jwt().get("role")
+
+    field = request.args.get("field", "diagnosis")
+    if field not in INDEXED_FIELDS:
+        return jsonify({"error": f"Invalid field. Must be one of {list(INDEXED_FIELDS)}"}), 400
+
+    exact = request.args.get("exact", "false").lower() == "true"
+    tokens = query_tokens(field, request.args.get("q", ""), exact=exact)
+    if not tokens:
+        return jsonify({"error": "Search query is required"}), 400
+
+    limit = min(request.args.get("limit", 50, type=int), 200)
+    try:
+        fields = requested_fields(request.args, RECORD_FIELDS, RECORD_SUMMARY)
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Records carrying every token: one indexed lookup on (field, token)
+    matches = (
+        db.session.query(MedicalRecordTerm.record_id)
+        .filter(MedicalRecordTerm.field == field, MedicalRecordTerm.token.in_(tokens))
+        .group_by(MedicalRecordTerm.record_id)
+        .having(func.count(func.distinct(MedicalRecordTerm.token)) == len(tokens))
+    )
+    query = record_list_query(fields).filter(MedicalRecord.id.in_(matches))
+
+    doctor = None
+    if role == "doctor":
+        doctor = Doctor.query.filter_by(user_id=user_id).first()
+        if not doctor:
+            return jsonify({"error": "Doctor profile not found"}), 404
+        query = query.filter(MedicalRecord.doctor_id == doctor.id)
+    elif role in ("hospital", "hospital_admin"):
+        hospital = Hospital.query.filter_by(user_id=user_id).first()
+        if not hospital:
+            return jsonify({"error": "Hospital not found"}), 404
+        query = query.filter(MedicalRecord.hospital_id == hospital.id)
+    else:
+        if request.args.get("doctor_id", type=int):
+            query = query.filter(MedicalRecord.doctor_id == request.args.get("doctor_id", type=int))
+        if request.args.get("hospital_id", type=int):
+            query = query.filter(MedicalRecord.hospital_id == request.args.get("hospital_id", type=int))
+
+    # Only the hits are decrypted
+    records = query.order_by(MedicalRecord.created_at.desc()).limit(limit).all()
+
+    if doctor:
+        for patient_id in {r.patient_id for r in records}:
+            log_access(doctor_id=doctor.id, patient_id=patient_id, purpose="searched records")
+
+    return jsonify({
+        "field": field,
+        "count": len(records),
+        "records": [serialize_record(r, fields) for r in records]
+    }), 200
 
 # POST — Doctor only
 @medical_bp.route("/", methods=["POST"])
@@ -82,14 +182,17 @@ def create_record():
     doctor = Doctor.query.filter_by(user_id=user_id).first()
     if not doctor:
         return jsonify({"error": "Doctor profile not found"}), 404
+    if not doctor.hospital_id:
+        return jsonify({"error": "Doctor is not assigned to a hospital"}), 400
 
     new_record = MedicalRecord(
         patient_id=patient_id,
         doctor_id=doctor.id,
-        diagnosis=encrypt_text(data.get("diagnosis")),
-        treatment=encrypt_text(data.get("treatment")),
-        notes=encrypt_text(data.get("notes"))
+        diagnosis=data.get("diagnosis"),
+        treatment=data.get("treatment"),
+        notes=data.get("notes")
     )
+    index_medical_record(new_record, {f: data.get(f) for f in INDEXED_FIELDS})
 
     db.session.add(new_record)
     db.session.commit()
@@ -115,11 +218,12 @@ def update_record(id):
 
     if role in ["admin", "superadmin"] or record.doctor.user_id == user_id:
         if data.get("diagnosis"):
-            record.diagnosis = encrypt_text(data["diagnosis"])
+            record.diagnosis = data["diagnosis"]
         if data.get("treatment"):
-            record.treatment = encrypt_text(data["treatment"])
+            record.treatment = data["treatment"]
         if data.get("notes"):
-            record.notes = encrypt_text(data["notes"])
+            record.notes = data["notes"]
+        index_medical_record(record, {f: data[f] for f in INDEXED_FIELDS if data.get(f)})
 
         db.session.commit()
         return jsonify({
@@ -1,5 +1,5 @@
 """Secure Patient routes for MedBeta backend API."""
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file, current_app
 from flask_jwt_extended import get_jwt_identity
 from datetime import datetime
 import logging
@@ -12,9 +12,18 @@ from app.models.prescriptions import Prescription
 from app.models.doctor import Doctor
 from app.models.hospital import Hospital
 from app.models.users import User
+from app.models.panel import DoctorPatientPanel
 from app.db import db
 from app.utils.role_required import role_required
-from app.utils.encryption import decrypt_text
+from app.utils.replicas import use_primary
+from app.utils.log_access import log_access
+from app.utils.timeline import patient_timeline
+from app.utils.blob_store import get_blob_store, sniff_image, THUMBNAIL_SIZES
+from app.utils.projection import FieldError, requested_fields, undefer_options, project
+from app.utils.doctor_search import search_doctors
+import base64
+import binascii
+from flask_jwt_extended import get_jwt
 
 patient_bp = Blueprint("patient_bp", __name__, url_prefix="/patients")
 
@@ -51,6 +60,28 @@ def get_doctors():
     return jsonify(doctor_list), 200
 
 
+# GET /patients/doctors/search?q=card&hospital_id=&limit=20&cursor= — ranked by rating and availability
+@patient_bp.route("/doctors/search", methods=["GET"])
+@role_required("patient")
+def search_doctors_route():
+    """Doctors whose name or specialization words start with every word of `q`, best first.
+
+    Pass `next_cursor` back as ?cursor= for the next page.
+    """
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    try:
+        page = search_doctors(
+            db.session,
+            query=request.args.get("q"),
+            hospital_id=request.args.get("hospital_id", type=int),
+            limit=limit,
+            cursor=request.args.get("cursor"),
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify(page), 200
+
+
 # --- GET all hospitals ---
 @patient_bp.route("/hospitals", methods=["GET"])
 @role_required("patient")
@@ -82,6 +113,7 @@ def get_doctors_by_hospital(hospital_id):
 # GET: View patient profile
 @patient_bp.route("/profile", methods=["GET"])
 @role_required("patient")
+@use_primary  # shown right after profile edits
 def get_patient_profile():
     """Retrieve logged-in patient's profile."""
     patient, err, code = get_current_patient()
@@ -92,7 +124,8 @@ def get_patient_profile():
         "id": patient.id,
         "phone": patient.phone,
         "address": patient.address,
-        "dob": str(patient.dob) if patient.dob else None
+        "dob": str(patient.dob) if patient.dob else None,
+        "profile_pic": patient.profile_pic_url
     }), 200
 
 
@@ -159,8 +192,8 @@ def get_medical_records():
             doctor = Doctor.query.get(r.doctor_id)
             decrypted_records.append({
                 "id": r.id,
-                "diagnosis": decrypt_text(r.diagnosis),
-                "treatment": decrypt_text(r.treatment),
+                "diagnosis": r.diagnosis,
+                "treatment": r.treatment,
                 "doctor": {
                     "id": doctor.id if doctor else None,
                     "name": doctor.user.name if doctor and doctor.user else None,
@@ -298,7 +331,13 @@ def add_review():
         return jsonify({"error": "Failed to add review"}), 500
 
 
-# GET: View prescriptions linked to patient
+# GET: View prescriptions linked to patient (?detail=true or ?fields= for medication_details)
+PRESCRIPTION_FIELDS = {
+    "id": lambda p: p.id,
+    "medication_details": lambda p: p.medication_details,
+    "issued_date": lambda p: str(p.issued_date),
+}
+PRESCRIPTION_SUMMARY = ("id", "issued_date")
 
 @patient_bp.route("/prescriptions", methods=["GET"])
 @role_required("patient")  # Added missing decorator
@@ -308,14 +347,138 @@ def get_prescriptions():
     if err:
         return err, code
 
-    prescriptions = Prescription.query.filter_by(patient_id=patient.id).all()
+    try:
+        fields = requested_fields(request.args, PRESCRIPTION_FIELDS, PRESCRIPTION_SUMMARY)
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
+    prescriptions = (
+        Prescription.query
+        .filter_by(patient_id=patient.id)
+        .options(*undefer_options(fields, {"medication_details": Prescription.medication_details}))
+        .all()
+    )
     if not prescriptions:
         return jsonify({"message": "No prescriptions found"}), 404
 
-    return jsonify([
-        {
-            "id": p.id,
-            "medication_details": p.medication_details,
-            "issued_date": str(p.issued_date)
-        } for p in prescriptions
-    ]), 200
+    return jsonify([project(p, fields, PRESCRIPTION_FIELDS) for p in prescriptions]), 200
+
+
+# GET: Unified chart timeline (appointments, records, prescriptions, lab tests), newest first
+@patient_bp.route("/<int:patient_id>/timeline", methods=["GET"])
+@role_required("patient", "doctor", "admin", "superadmin")
+def get_timeline(patient_id):
+    """Paginated timeline for one patient; pass `next_cursor` back as ?cursor= for the next page."""
+    role = get_jwt().get("role")
+    user_id = int(get_jwt_identity())
+
+    doctor = None
+    if role == "patient":
+        patient, err, code = get_current_patient()
+        if err:
+            return err, code
+        if patient.id != patient_id:
+            return jsonify({"error": "Unauthorized"}), 403
+    elif role == "doctor":
+        doctor = Doctor.query.filter_by(user_id=user_id).first()
+        if not doctor:
+            return jsonify({"error": "Doctor profile not found"}), 404
+        if not db.session.get(DoctorPatientPanel, (doctor.id, patient_id)):
+            return jsonify({"error": "Doctor has no access to this patient's records"}), 403
+
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    try:
+        page = patient_timeline(patient_id, limit=limit, cursor=request.args.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    if doctor:
+        log_access(doctor_id=doctor.id, patient_id=patient_id, purpose="viewed timeline")
+
+    return jsonify(page), 200
+
+
+# PUT: Upload profile picture (multipart "file", or JSON {"image": "<base64 or data: URI>"})
+@patient_bp.route("/profile/picture", methods=["PUT"])
+@role_required("patient")
+def upload_profile_picture():
+    patient, err, code = get_current_patient()
+    if err:
+        return err, code
+
+    upload = request.files.get("file")
+    if upload:
+        data = upload.read()
+    else:
+        image = (request.get_json(silent=True) or {}).get("image") or ""
+        try:
+            data = base64.b64decode(image.split(",", 1)[-1], validate=True)
+        except (binascii.Error, ValueError):
+            return jsonify({"error": "image must be base64 encoded"}), 400
+
+    if not data:
+        return jsonify({"error": "No image provided"}), 400
+    if len(data) > current_app.config["MAX_PROFILE_PIC_BYTES"]:
+        return jsonify({"error": "Image is too large"}), 413
+    mimetype = sniff_image(data)
+    if not mimetype:
+        return jsonify({"error": "Unsupported image format"}), 400
+
+    patient.profile_pic_hash = get_blob_store().put(data)
+    patient.profile_pic_type = mimetype
+    db.session.commit()
+
+    return jsonify({
+        "message": "Profile picture updated",
+        "profile_pic": patient.profile_pic_url,
+        "etag": patient.profile_pic_hash
+    }), 200
+
+
+# DELETE: Remove profile picture (the blob stays; it may be shared by other rows)
+@patient_bp.route("/profile/picture", methods=["DELETE"])
+@role_required("patient")
+def delete_profile_picture():
+    patient, err, code = get_current_patient()
+    if err:
+        return err, code
+
+    patient.profile_pic_hash = None
+    patient.profile_pic_type = None
+    db.session.commit()
+    return jsonify({"message": "Profile picture removed"}), 200
+
+
+# GET: Stream a patient's profile picture (?size=64|128|256 for a thumbnail); supports Range and ETag
+@patient_bp.route("/<int:patient_id>/profile-picture", methods=["GET"])
+@role_required("patient", "doctor", "admin", "superadmin")
+def get_profile_picture(patient_id):
+    role = get_jwt().get("role")
+    user_id = int(get_jwt_identity())
+
+    patient = db.session.get(Patient, patient_id)
+    if not patient or not patient.profile_pic_hash:
+        return jsonify({"error": "Profile picture not found"}), 404
+
+    if role == "patient" and patient.user_id != user_id:
+        return jsonify({"error": "Unauthorized"}), 403
+    if role == "doctor":
+        doctor = Doctor.query.filter_by(user_id=user_id).first()
+        if not doctor or not db.session.get(DoctorPatientPanel, (doctor.id, patient_id)):
+            return jsonify({"error": "Doctor has no access to this patient"}), 403
+
+    store = get_blob_store()
+    size = request.args.get("size", type=int)
+    if size:
+        if size not in THUMBNAIL_SIZES:
+            return jsonify({"error": f"size must be one of {list(THUMBNAIL_SIZES)}"}), 400
+        path, mimetype, etag = store.thumbnail(patient.profile_pic_hash, size), "image/jpeg", f"{patient.profile_pic_hash}-{size}"
+    else:
+        path, mimetype, etag = store.path(patient.profile_pic_hash), patient.profile_pic_type, patient.profile_pic_hash
+
+    # Content-addressed, so the bytes behind an ETag never change
+    response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=31536000)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
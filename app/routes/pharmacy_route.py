@@ -1,15 +1,39 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func, select, update
 from app.db import db
 from app.models import Pharmacy, Prescription, User
+from app.models.prescriptions import PRESCRIPTION_TRANSITIONS, TRANSITION_TIMESTAMPS, InvalidTransition, statuses_before
+from app.utils.time import utc_now
 from app.utils.role_required import role_required
+from app.utils.replicas import use_primary
+from app.utils.projection import FieldError, requested_fields, undefer_options, project
 
 pharmacy_bp = Blueprint("pharmacy_bp", __name__, url_prefix="/pharmacies")
 
+PRESCRIPTION_FIELDS = {
+    "id": lambda p: p.id,
+    "doctor_id": lambda p: p.doctor_id,
+    "patient_id": lambda p: p.patient_id,
+    "medication_details": lambda p: p.medication_details,
+    "issued_date": lambda p: p.issued_date.isoformat(),
+    "status": lambda p: p.status,
+    "claimed_at": lambda p: p.claimed_at,
+    "verified_at": lambda p: p.verified_at,
+    "dispensed_at": lambda p: p.dispensed_at,
+    "cancelled_at": lambda p: p.cancelled_at,
+}
+PRESCRIPTION_SUMMARY = ("id", "doctor_id", "patient_id", "issued_date", "status")
+
+# action in the request body -> status it moves the prescription to
+ACTIONS = {"verify": "verified", "dispense": "dispensed", "cancel": "cancelled"}
+MAX_BULK_ACTIONS = 200
+
 
 # GET /pharmacies/profile
 @pharmacy_bp.route("/profile", methods=["GET"])
 @role_required("pharmacy")
+@use_primary  # shown right after profile edits
 def get_pharmacy_profile():
     user_id = int(get_jwt_identity())
     pharmacy = Pharmacy.query.filter_by(user_id=user_id).first()
@@ -34,7 +58,7 @@ def get_pharmacy_profile():
     }), 200
 
 
-# GET /pharmacies/prescriptions
+# GET /pharmacies/prescriptions?status=claimed,verified — the pharmacy's prescriptions, optionally one queue
 @pharmacy_bp.route("/prescriptions", methods=["GET"])
 @role_required("pharmacy")
 def get_pharmacy_prescriptions():
@@ -44,23 +68,54 @@ def get_pharmacy_prescriptions():
     if not pharmacy:
         return jsonify({"error": "Pharmacy profile not found"}), 404
 
-    prescriptions = Prescription.query.filter_by(pharmacy_id=pharmacy.id).all()
+    try:
+        fields = requested_fields(request.args, PRESCRIPTION_FIELDS, PRESCRIPTION_SUMMARY)
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = Prescription.query.filter_by(pharmacy_id=pharmacy.id)
+    if request.args.get("status"):
+        statuses = [st.strip() for st in request.args["status"].split(",") if st.strip()]
+        unknown = [st for st in statuses if st not in PRESCRIPTION_TRANSITIONS]
+        if unknown:
+            return jsonify({"error": f"Unknown status(es): {', '.join(unknown)}. Use {', '.join(PRESCRIPTION_TRANSITIONS)}"}), 400
+        query = query.filter(Prescription.status.in_(statuses))
+
+    # Oldest first, walking ix_prescriptions_pharmacy_status_issued
+    prescriptions = (
+        query
+        .order_by(Prescription.issued_date, Prescription.id)
+        .options(*undefer_options(fields, {"medication_details": Prescription.medication_details}))
+        .all()
+    )
     return jsonify({
         "message": "Prescriptions retrieved successfully",
-        "data": [
-            {
-                "id": p.id,
-                "doctor_id": p.doctor_id,
-                "patient_id": p.patient_id,
-                "medication_details": p.medication_details,
-                "issued_date": p.issued_date.isoformat(),
-                "status": p.status
-            } for p in prescriptions
-        ]
+        "data": [project(p, fields, PRESCRIPTION_FIELDS) for p in prescriptions]
+    }), 200
+
+
+# GET /pharmacies/prescriptions/queue — how many prescriptions sit in each status
+@pharmacy_bp.route("/prescriptions/queue", methods=["GET"])
+@role_required("pharmacy")
+def get_prescription_queue():
+    user_id = int(get_jwt_identity())
+    pharmacy = Pharmacy.query.filter_by(user_id=user_id).first()
+
+    if not pharmacy:
+        return jsonify({"error": "Pharmacy profile not found"}), 404
+
+    counts = dict(db.session.execute(
+        select(Prescription.status, func.count())
+        .where(Prescription.pharmacy_id == pharmacy.id)
+        .group_by(Prescription.status)
+    ).all())
+    return jsonify({
+        "message": "Prescription queue retrieved successfully",
+        "data": {status: counts.get(status, 0) for status in PRESCRIPTION_TRANSITIONS}
     }), 200
 
 
-# PUT /pharmacies/prescriptions/<prescription_id>/action
+# PUT /pharmacies/prescriptions/<prescription_id>/action — Body: {"action": "verify" | "dispense" | "cancel"}
 @pharmacy_bp.route("/prescriptions/<int:prescription_id>/action", methods=["PUT"])
 @role_required("pharmacy")
 def verify_or_dispense_prescription(prescription_id):
@@ -77,14 +132,16 @@ def verify_or_dispense_prescription(prescription_id):
     data = request.get_json() or {}
     action = data.get("action", "").lower()
 
-    if action not in ["verify", "dispense"]:
-        return jsonify({"error": "Invalid action. Use 'verify' or 'dispense'."}), 400
+    if action not in ACTIONS:
+        return jsonify({"error": "Invalid action. Use 'verify', 'dispense' or 'cancel'."}), 400
 
-    # Optional: enforce logical order
     if action == "dispense" and prescription.status != "verified":
         return jsonify({"error": "Prescription must be verified before dispensing"}), 400
 
-    prescription.status = "verified" if action == "verify" else "dispensed"
+    try:
+        prescription.transition_to(ACTIONS[action])
+    except InvalidTransition as e:
+        return jsonify({"error": str(e)}), 400
     db.session.commit()
 
     return jsonify({
@@ -94,3 +151,68 @@ def verify_or_dispense_prescription(prescription_id):
             "status": prescription.status
         }
     }), 200
+
+
+def _bulk_transition(pharmacy_id, prescription_ids, status):
+    """One UPDATE moving the pharmacy's listed prescriptions that may reach `status`; returns the ids it moved."""
+    stmt = (
+        update(Prescription)
+        .where(
+            Prescription.id.in_(prescription_ids),
+            Prescription.pharmacy_id == pharmacy_id,
+            Prescription.status.in_(statuses_before(status)),
+        )
+        .values({"status": status, TRANSITION_TIMESTAMPS[status]: utc_now()})
+        .returning(Prescription.id)
+    )
+    return set(db.session.scalars(stmt))
+
+
+# PUT /pharmacies/prescriptions/action — Verify, dispense or cancel many prescriptions at once
+# Body: {"action": "verify", "prescription_ids": [1, 2, 3]}
+@pharmacy_bp.route("/prescriptions/action", methods=["PUT"])
+@role_required("pharmacy")
+def bulk_prescription_action():
+    user_id = int(get_jwt_identity())
+    pharmacy = Pharmacy.query.filter_by(user_id=user_id).first()
+
+    if not pharmacy:
+        return jsonify({"error": "Pharmacy profile not found"}), 404
+
+    data = request.get_json() or {}
+    action = str(data.get("action", "")).lower()
+    ids = data.get("prescription_ids")
+
+    if action not in ACTIONS:
+        return jsonify({"error": "Invalid action. Use 'verify', 'dispense' or 'cancel'."}), 400
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"error": "prescription_ids must be a non-empty list of integers"}), 400
+    if len(ids) > MAX_BULK_ACTIONS:
+        return jsonify({"error": f"At most {MAX_BULK_ACTIONS} prescriptions per request"}), 400
+
+    status = ACTIONS[action]
+    moved = _bulk_transition(pharmacy.id, set(ids), status)
+
+    # Explain the rest with one read of their current state
+    current = {}
+    if len(moved) < len(set(ids)):
+        current = dict(db.session.execute(
+            select(Prescription.id, Prescription.status)
+            .where(Prescription.id.in_(set(ids) - moved), Prescription.pharmacy_id == pharmacy.id)
+        ).all())
+    db.session.commit()
+
+    results = []
+    for prescription_id in dict.fromkeys(ids):
+        result = {"prescription_id": prescription_id, "updated": prescription_id in moved}
+        if prescription_id not in moved:
+            if prescription_id not in current:
+                result["error"] = "Prescription not found or not assigned to this pharmacy"
+            else:
+                result["error"] = f"Cannot {action} a {current[prescription_id]} prescription"
+        results.append(result)
+
+    return jsonify({
+        "message": f"{len(moved)} of {len(results)} prescriptions {status}.",
+        "data": results
+    }), 200
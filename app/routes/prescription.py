@@ -1,14 +1,42 @@
-from flask import Blueprint, request, jsonify
+import math
+from flask import Blueprint, Response, current_app, request, jsonify
 from app.db import db
-from app.models.prescriptions import Prescription
+from app.models.prescriptions import Prescription, InvalidTransition
 from app.models.doctor import Doctor
 from app.models.patient import Patient
 from app.models.Pharmacy import Pharmacy
 from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm import undefer
 from app.utils.role_required import role_required  
+from app.utils.projection import FieldError, requested_fields, undefer_options, project
+from app.utils.prescription_feed import StaleCursor, publish_prescription_event, sse_message
+from app.utils.tenancy import current_hospital_id
+from app.utils.time import utc_now
 
 prescription_bp = Blueprint("prescription_bp", __name__)
 
+# List output; medication_details is deferred and only returned with ?detail=true or ?fields=
+PRESCRIPTION_FIELDS = {
+    "id": lambda p: p.id,
+    "doctor": lambda p: p.doctor.user.name if p.doctor and p.doctor.user else "Unknown Doctor",
+    "patient": lambda p: p.patient.user.name if p.patient and p.patient.user else "Unknown Patient",
+    "medication_details": lambda p: p.medication_details,
+    "issued_date": lambda p: p.issued_date,
+    "status": lambda p: p.status,
+}
+PRESCRIPTION_SUMMARY = ("id", "doctor", "patient", "issued_date")
+PRESCRIPTION_DEFERRED = {"medication_details": Prescription.medication_details}
+
+
+def list_prescriptions(query, omit=()):
+    """Run a prescription list query with the fields requested in the query string."""
+    getters = {name: getter for name, getter in PRESCRIPTION_FIELDS.items() if name not in omit}
+    fields = requested_fields(request.args, getters, PRESCRIPTION_SUMMARY)
+    prescriptions = query.options(*undefer_options(fields, PRESCRIPTION_DEFERRED)).all()
+    return [project(p, fields, getters) for p in prescriptions]
+
+
 # creating prescriptions(Doctor → Pharmacy)
 @prescription_bp.post("/prescriptions")
 @role_required("doctor")  
@@ -27,6 +55,8 @@ def create_prescription():
 
     if not doctor:
         return jsonify({"error": "Doctor not found"}), 404
+    if not doctor.hospital_id:
+        return jsonify({"error": "Doctor is not assigned to a hospital"}), 400
     if not patient:
         return jsonify({"error": "Patient not found"}), 404
 
@@ -38,6 +68,9 @@ def create_prescription():
 
     db.session.add(new_prescription)
     db.session.commit()
+    publish_prescription_event(
+        "created", new_prescription, project(new_prescription, PRESCRIPTION_SUMMARY, PRESCRIPTION_FIELDS)
+    )
 
     return jsonify({
         "message": "Prescription created successfully and sent to pharmacy",
@@ -53,21 +86,108 @@ def create_prescription():
 @prescription_bp.get("/prescriptions/unclaimed")
 @role_required("pharmacist")
 def get_unclaimed_prescriptions():
-    prescriptions = Prescription.query.filter_by(pharmacy_id=None).order_by(Prescription.issued_date.desc()).all()
-
-    result = []
-    for p in prescriptions:
-        result.append({
-            "id": p.id,
-            "doctor": p.doctor.user.name if p.doctor and p.doctor.user else "Unknown Doctor",
-            "patient": p.patient.user.name if p.patient and p.patient.user else "Unknown Patient",
-            "medication_details": p.medication_details,
-            "issued_date": p.issued_date,
-        })
+    try:
+        result = list_prescriptions(
+            Prescription.query.filter_by(pharmacy_id=None, status="issued").order_by(Prescription.issued_date.desc())
+        )
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify(result), 200
 
-from flask_jwt_extended import get_jwt_identity
+
+def _unclaimed_snapshot(feed):
+    """Cursor and current unclaimed list; the cursor is taken first so nothing committed in between is missed."""
+    cursor = feed.cursor()
+    result = list_prescriptions(
+        Prescription.query.filter_by(pharmacy_id=None, status="issued").order_by(Prescription.issued_date.desc())
+    )
+    return cursor, result
+
+
+# GET /prescriptions/unclaimed/stream — Server-Sent Events: a snapshot, then created/claimed/removed events
+# Reconnects send Last-Event-ID and only get what they missed (a new snapshot if it is too old)
+@prescription_bp.get("/prescriptions/unclaimed/stream")
+@role_required("pharmacist")
+def stream_unclaimed_prescriptions():
+    feed = current_app.extensions["prescription_feed"]
+    heartbeat = current_app.config["PRESCRIPTION_FEED_HEARTBEAT_SECONDS"]
+    hospital_id = current_hospital_id(db.session)
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor")
+
+    snapshot = None
+    try:
+        feed.read(cursor, hospital_id)
+    except StaleCursor:
+        try:
+            cursor, result = _unclaimed_snapshot(feed)
+        except FieldError as e:
+            return jsonify({"error": str(e)}), 400
+        snapshot = sse_message("snapshot", current_app.json.dumps(result), cursor)
+    db.session.close()  # don't hold a connection for the life of the stream
+
+    def events(cursor):
+        if snapshot:
+            yield snapshot
+        while True:
+            try:
+                batch, cursor = feed.wait(cursor, hospital_id, heartbeat)
+            except StaleCursor:
+                yield sse_message("reset", "{}")  # fell behind the buffer; reconnect for a new snapshot
+                return
+            if not batch:
+                yield ": keep-alive\n\n"
+            for seq, event_type, _, data in batch:
+                yield sse_message(event_type, data, feed.cursor(seq))
+
+    return Response(events(cursor), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def poll_timeout(value, max_timeout):
+    """Seconds to long-poll, clamped to [0, max_timeout]; ValueError unless `value` is a finite number."""
+    timeout = float(value)
+    if not math.isfinite(timeout):  # nan would never time out, and min/max don't clamp it
+        raise ValueError("timeout must be finite")
+    return min(max(timeout, 0), max_timeout)
+
+
+# GET /prescriptions/unclaimed/changes?cursor=&timeout= — long-poll fallback for clients without SSE
+# Without a (valid) cursor returns {"reset": true, "prescriptions": [...], "cursor"}; otherwise waits up to
+# `timeout` seconds for events and returns {"reset": false, "events": [{"type", "data"}], "cursor"}
+@prescription_bp.get("/prescriptions/unclaimed/changes")
+@role_required("pharmacist")
+def poll_unclaimed_prescriptions():
+    feed = current_app.extensions["prescription_feed"]
+    max_timeout = current_app.config["PRESCRIPTION_FEED_POLL_SECONDS"]
+    hospital_id = current_hospital_id(db.session)
+    try:
+        timeout = poll_timeout(request.args.get("timeout", max_timeout), max_timeout)
+    except ValueError:
+        return jsonify({"error": "timeout must be a number of seconds"}), 400
+
+    cursor = request.args.get("cursor")
+    try:
+        feed.read(cursor, hospital_id)
+    except StaleCursor:
+        try:
+            cursor, result = _unclaimed_snapshot(feed)
+        except FieldError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"cursor": cursor, "reset": True, "prescriptions": result}), 200
+    db.session.close()
+
+    try:
+        batch, cursor = feed.wait(cursor, hospital_id, timeout)
+    except StaleCursor:
+        return jsonify({"cursor": None, "reset": True, "prescriptions": None}), 200
+    return jsonify({
+        "cursor": cursor,
+        "reset": False,
+        "events": [{"type": event_type, "data": current_app.json.loads(data)} for _, event_type, _, data in batch],
+    }), 200
+
+from flask_jwt_extended import get_jwt_identity, get_jwt
 
 @prescription_bp.get("/prescriptions/pharmacy")
 @role_required("pharmacist")
@@ -77,14 +197,12 @@ def get_pharmacy_prescriptions():
     if not pharmacy:
         return jsonify({"error": "Pharmacy not found"}), 404
 
-    prescriptions = Prescription.query.filter_by(pharmacy_id=pharmacy.id).order_by(Prescription.issued_date.desc()).all()
-    result = [{
-        "id": p.id,
-        "doctor": p.doctor.user.name if p.doctor and p.doctor.user else "Unknown Doctor",
-        "patient": p.patient.user.name if p.patient and p.patient.user else "Unknown Patient",
-        "medication_details": p.medication_details,
-        "issued_date": p.issued_date,
-    } for p in prescriptions]
+    try:
+        result = list_prescriptions(
+            Prescription.query.filter_by(pharmacy_id=pharmacy.id).order_by(Prescription.issued_date.desc())
+        )
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify(result), 200
 
@@ -102,9 +220,20 @@ def claim_prescription(prescription_id):
 
     if prescription.pharmacy_id is not None:
         return jsonify({"error": "Prescription already claimed"}), 400
-
-    prescription.pharmacy_id = pharmacy.id  # use correct pharmacy id
+    if prescription.status != "issued":
+        return jsonify({"error": f"Prescription is {prescription.status}"}), 400
+
+    # Conditional on the status so two pharmacies claiming at once can't both win
+    claimed = db.session.execute(
+        update(Prescription)
+        .where(Prescription.id == prescription.id, Prescription.status == "issued")
+        .values(pharmacy_id=pharmacy.id, status="claimed", claimed_at=utc_now())
+    )
+    if claimed.rowcount == 0:
+        db.session.rollback()
+        return jsonify({"error": "Prescription already claimed"}), 409
     db.session.commit()
+    publish_prescription_event("claimed", prescription)
 
     return jsonify({
         "message": "Prescription claimed successfully",
@@ -117,18 +246,29 @@ def claim_prescription(prescription_id):
 @prescription_bp.get("/prescriptions")
 @role_required("pharmacist", "admin")
 def get_all_prescriptions():
-    prescriptions = Prescription.query.order_by(Prescription.issued_date.desc()).all()
-    result = []
-
-    for p in prescriptions:
-        result.append({
-            "id": p.id,
-            "doctor": p.doctor.user.name if p.doctor and p.doctor.user else "Unknown Doctor",
-            "patient": p.patient.user.name if p.patient and p.patient.user else "Unknown Patient",
-            "medication_details": p.medication_details,
-            "issued_date": p.issued_date,
-        })
+    try:
+        result = list_prescriptions(Prescription.query.order_by(Prescription.issued_date.desc()))
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(result), 200
 
+
+# get one prescription with its full medication details
+@prescription_bp.get("/prescriptions/<int:prescription_id>")
+@role_required("patient", "doctor", "pharmacist", "admin")
+def get_prescription(prescription_id):
+    prescription = db.session.get(Prescription, prescription_id, options=[undefer(Prescription.medication_details)])
+    if not prescription:
+        return jsonify({"error": "Prescription not found"}), 404
+
+    if get_jwt().get("role") == "patient":
+        patient = Patient.query.filter_by(user_id=int(get_jwt_identity())).first()
+        if not patient or patient.id != prescription.patient_id:
+            return jsonify({"error": "Unauthorized"}), 403
+
+    result = project(prescription, PRESCRIPTION_FIELDS, PRESCRIPTION_FIELDS)
+    result["pharmacy_id"] = prescription.pharmacy_id
     return jsonify(result), 200
 
 
@@ -136,17 +276,13 @@ def get_all_prescriptions():
 @prescription_bp.get("/prescriptions/patient/<int:patient_id>")
 @role_required("patient", "doctor", "admin")
 def get_prescriptions_by_patient(patient_id):
-    prescriptions = Prescription.query.filter_by(patient_id=patient_id).all()
-    if not prescriptions:
+    try:
+        result = list_prescriptions(Prescription.query.filter_by(patient_id=patient_id), omit=("patient",))
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+    if not result:
         return jsonify({"message": "No prescriptions found for this patient"}), 404
 
-    result = [{
-        "id": p.id,
-        "doctor": p.doctor.user.name if p.doctor and p.doctor.user else "Unknown Doctor",
-        "medication_details": p.medication_details,
-        "issued_date": p.issued_date,
-    } for p in prescriptions]
-
     return jsonify(result), 200
 
 
@@ -154,17 +290,13 @@ def get_prescriptions_by_patient(patient_id):
 @prescription_bp.get("/prescriptions/doctor/<int:doctor_id>")
 @role_required("doctor", "admin")
 def get_prescriptions_by_doctor(doctor_id):
-    prescriptions = Prescription.query.filter_by(doctor_id=doctor_id).all()
-    if not prescriptions:
+    try:
+        result = list_prescriptions(Prescription.query.filter_by(doctor_id=doctor_id), omit=("doctor",))
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+    if not result:
         return jsonify({"message": "No prescriptions found for this doctor"}), 404
 
-    result = [{
-        "id": p.id,
-        "patient": p.patient.user.name if p.patient and p.patient.user else "Unknown Patient",
-        "medication_details": p.medication_details,
-        "issued_date": p.issued_date,
-    } for p in prescriptions]
-
     return jsonify(result), 200
 
 
@@ -176,7 +308,38 @@ def delete_prescription(id):
     if not prescription:
         return jsonify({"error": "Prescription not found"}), 404
 
+    unclaimed = prescription.status == "issued"
     db.session.delete(prescription)
     db.session.commit()
+    if unclaimed:
+        publish_prescription_event("removed", prescription)
 
     return jsonify({"message": f"Prescription {id} deleted successfully"}), 200
+
+
+# PUT /prescriptions/<id>/cancel — the issuing doctor (or an admin) withdraws a prescription before it is dispensed
+@prescription_bp.put("/prescriptions/<int:prescription_id>/cancel")
+@role_required("doctor", "admin")
+def cancel_prescription(prescription_id):
+    prescription = db.session.get(Prescription, prescription_id)
+    if not prescription:
+        return jsonify({"error": "Prescription not found"}), 404
+
+    if get_jwt().get("role") == "doctor":
+        doctor = Doctor.query.filter_by(user_id=int(get_jwt_identity())).first()
+        if not doctor or doctor.id != prescription.doctor_id:
+            return jsonify({"error": "Unauthorized"}), 403
+
+    was_unclaimed = prescription.status == "issued"
+    try:
+        prescription.transition_to("cancelled")
+    except InvalidTransition as e:
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+    if was_unclaimed:
+        publish_prescription_event("removed", prescription)
+
+    return jsonify({
+        "message": "Prescription cancelled",
+        "data": {"id": prescription.id, "status": prescription.status, "cancelled_at": prescription.cancelled_at}
+    }), 200
@@ -0,0 +1,181 @@
+"""Monthly partitions for access_logs: creation ahead of time, archival and retention.
+
+On Postgres each month lives in its own partition (access_logs_YYYY_MM); rows for a month with
+no partition yet land in access_logs_default until the next ensure_partitions(). Archiving a month
+streams its rows to a gzip-compressed NDJSON file and then detaches and drops the partition,
+which is instant and leaves no bloat. Other databases (SQLite in development) keep a plain
+table, so the same month is exported and then deleted by range.
+"""
+import gzip
+import os
+import re
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import text, select, delete
+from app.db import db
+from app.models import AccessLog
+
+PARTITION_RE = re.compile(r"^access_logs_(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "access_logs_default"
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def add_months(d, n):
+    months = d.year * 12 + d.month - 1 + n
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"access_logs_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned():
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def list_partitions():
+    """Months that currently have a partition, oldest first."""
+    rows = db.session.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'access_logs'
+    """)).scalars()
+    months = []
+    for name in rows:
+        m = PARTITION_RE.match(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def _create_partition(month):
+    """
+    Create one month's partition. Postgres refuses a new partition while the default partition
+    holds rows of its range, so those rows are moved into the new table before it is attached.
+    """
+    name, start, end = partition_name(month), month.isoformat(), add_months(month, 1).isoformat()
+    db.session.execute(text(f"CREATE TABLE {name} (LIKE access_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.session.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE accessed_at >= :start AND accessed_at < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"start": start, "end": end})
+    db.session.execute(text(f"ALTER TABLE access_logs ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """
+    Create partitions for the current month and the next `months_ahead` months, plus any month
+    whose rows fell into the default partition (so they can be archived and dropped like the rest).
+    """
+    if not is_partitioned():
+        return []
+    db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF access_logs DEFAULT"))
+    current = month_start(today or date.today())
+    wanted = {add_months(current, n) for n in range(months_ahead + 1)}
+    wanted.update(db.session.execute(text(
+        f"SELECT DISTINCT date_trunc('month', accessed_at)::date FROM {DEFAULT_PARTITION}"
+    )).scalars())
+
+    existing = set(list_partitions())
+    for month in sorted(wanted - existing):
+        _create_partition(month)
+    db.session.commit()
+    return [partition_name(month) for month in sorted(wanted)]
+
+
+def _serialize(log):
+    return {
+        "id": log.id,
+        "doctor_id": log.doctor_id,
+        "hospital_id": log.hospital_id,
+        "patient_id": log.patient_id,
+        "accessed_at": log.accessed_at.isoformat() if log.accessed_at else None,
+        "purpose": log.purpose,
+    }
+
+
+def export_month(month, archive_dir, batch_size=5000):
+    """
+    Stream one month of access logs to <archive_dir>/access_logs_YYYY_MM.ndjson.gz.
+    The range predicate prunes to that month's partition; the file is written under a
+    temporary name and renamed once complete, so a crash never leaves a partial archive.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{partition_name(month)}.ndjson.gz")
+    tmp_path = path + ".tmp"
+
+    query = (
+        select(AccessLog)
+        .where(AccessLog.accessed_at >= month, AccessLog.accessed_at < add_months(month, 1))
+        .order_by(AccessLog.accessed_at, AccessLog.id)
+        .execution_options(yield_per=batch_size)
+    )
+    count = 0
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for log in db.session.scalars(query):
+                out.write(current_app.json.dumps(_serialize(log)).encode("utf-8") + b"\n")
+                count += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    db.session.expunge_all()
+    return path, count
+
+
+def drop_month(month):
+    if is_partitioned():
+        name = partition_name(month)
+        db.session.execute(text(f"ALTER TABLE access_logs DETACH PARTITION {name}"))
+        db.session.execute(text(f"DROP TABLE {name}"))
+    else:
+        db.session.execute(
+            delete(AccessLog)
+            .where(AccessLog.accessed_at >= month, AccessLog.accessed_at < add_months(month, 1))
+        )
+    db.session.commit()
+
+
+def archive_old_partitions(retain_months, archive_dir, today=None):
+    """Export and drop every month older than the last `retain_months` months."""
+    cutoff = add_months(month_start(today or date.today()), -retain_months)
+
+    if is_partitioned():
+        months = [m for m in list_partitions() if m < cutoff]
+    else:
+        oldest = db.session.query(db.func.min(AccessLog.accessed_at)).scalar()
+        months = []
+        if oldest:
+            month = month_start(oldest)
+            while month < cutoff:
+                months.append(month)
+                month = add_months(month, 1)
+
+    archived = []
+    for month in months:
+        path, count = export_month(month, archive_dir)
+        drop_month(month)
+        archived.append((month, path, count))
+    return archived
+
+
+def apply_window(query, args):
+    """
+    Restrict an AccessLog query to ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive days) so Postgres
+    only scans the matching partitions. Raises ValueError on malformed dates.
+    """
+    if args.get("from"):
+        query = query.filter(AccessLog.accessed_at >= datetime.fromisoformat(args["from"]))
+    if args.get("to"):
+        end = datetime.fromisoformat(args["to"])
+        if len(args["to"]) == 10:  # a bare date includes that whole day
+            query = query.filter(AccessLog.accessed_at < end + timedelta(days=1))
+        else:
+            query = query.filter(AccessLog.accessed_at <= end)
+    return query
@@ -0,0 +1,178 @@
+"""Hospital activity dashboards, read from the rollup tables (app/models/activity.py).
+
+The rollups are kept current by mapper events on appointments, prescriptions and lab
+tests, so a report over a date range reads one row per day (per doctor or hour for the
+breakdowns) instead of every appointment. Writes that bypass the ORM — bulk SQL, manual
+fixes, or data from before the tables existed — are repaired with `rebuild_rollups`
+(`flask rebuild-activity-rollups`), which recomputes them from the source tables.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, case, delete, extract, func, insert, select, true
+from app.models import (
+    Appointment, Prescription, TestRequest, Doctor, User,
+    HospitalDailyActivity, HospitalDoctorDailyActivity, HospitalHourlyAppointments, APPOINTMENT_STATUSES,
+)
+
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 1100  # three years of daily rows
+GRANULARITIES = ("day", "week", "month")
+APPOINTMENT_COLUMNS = tuple(f"appointments_{s}" for s in APPOINTMENT_STATUSES)
+DAILY_COLUMNS = APPOINTMENT_COLUMNS + ("prescriptions_issued", "lab_tests_requested", "lab_tests_completed")
+
+
+class ReportRangeError(ValueError):
+    pass
+
+
+def report_range(args, today=None):
+    """(start, end) dates from ?from=&to= (inclusive); defaults to the last DEFAULT_REPORT_DAYS days."""
+    today = today or date.today()
+    try:
+        end = date.fromisoformat(args["to"]) if args.get("to") else today
+        start = date.fromisoformat(args["from"]) if args.get("from") else end - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    except ValueError:
+        raise ReportRangeError("Invalid date. Use YYYY-MM-DD")
+    if start > end:
+        raise ReportRangeError("from must not be after to")
+    if (end - start).days + 1 > MAX_REPORT_DAYS:
+        raise ReportRangeError(f"Range is limited to {MAX_REPORT_DAYS} days")
+    return start, end
+
+
+def _period(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _with_total(counts):
+    return {**counts, "appointments_total": sum(counts[c] for c in APPOINTMENT_COLUMNS)}
+
+
+def daily_activity(session, hospital_id, start, end, granularity="day"):
+    """Activity counts per day, week or month in [start, end], plus totals; days without activity are left out."""
+    model = HospitalDailyActivity
+    rows = session.execute(
+        select(model.day, *(getattr(model, c) for c in DAILY_COLUMNS))
+        .where(model.hospital_id == hospital_id, model.day.between(start, end))
+        .order_by(model.day)
+    ).all()
+
+    periods, totals = {}, dict.fromkeys(DAILY_COLUMNS, 0)
+    for row in rows:
+        bucket = periods.setdefault(_period(row.day, granularity), dict.fromkeys(DAILY_COLUMNS, 0))
+        for c in DAILY_COLUMNS:
+            bucket[c] += getattr(row, c)
+            totals[c] += getattr(row, c)
+    return {
+        "periods": [{"period": p.isoformat(), **_with_total(counts)} for p, counts in periods.items()],
+        "totals": _with_total(totals),
+    }
+
+
+def doctor_activity(session, hospital_id, start, end, limit=None, offset=0):
+    """Appointments per doctor by status over [start, end], busiest doctors first."""
+    model = HospitalDoctorDailyActivity
+    sums = [func.sum(getattr(model, c)).label(c) for c in APPOINTMENT_COLUMNS]
+    total = sum(sums[1:], sums[0]).label("appointments_total")
+    stmt = (
+        select(model.doctor_id, User.name, Doctor.specialization, *sums, total)
+        .join(Doctor, Doctor.id == model.doctor_id)
+        .join(User, User.id == Doctor.user_id)
+        .where(model.hospital_id == hospital_id, model.day.between(start, end))
+        .group_by(model.doctor_id, User.name, Doctor.specialization)
+        .order_by(total.desc(), model.doctor_id)
+        .offset(offset)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return [
+        {"doctor_id": row.doctor_id, "name": row.name, "specialization": row.specialization,
+         **{c: int(getattr(row, c)) for c in APPOINTMENT_COLUMNS + ("appointments_total",)}}
+        for row in session.execute(stmt)
+    ]
+
+
+def hourly_activity(session, hospital_id, start, end):
+    """Appointments per hour of the day (0-23) over [start, end]."""
+    model = HospitalHourlyAppointments
+    counts = dict(session.execute(
+        select(model.hour, func.sum(model.appointments))
+        .where(model.hospital_id == hospital_id, model.day.between(start, end))
+        .group_by(model.hour)
+    ).all())
+    return [{"hour": hour, "appointments": int(counts.get(hour) or 0)} for hour in range(24)]
+
+
+def _utc_day(column):
+    return func.date(column, type_=HospitalDailyActivity.day.type)
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def rebuild_rollups(session, hospital_id=None, since=None):
+    """Recompute the rollup rows of one hospital (or all) from `since` (or the beginning) from the source tables."""
+    since_dt = datetime.combine(since, datetime.min.time()) if since else None
+
+    def scope(model, column, bound=since):
+        conditions = [true()]
+        if hospital_id is not None:
+            conditions.append(model.hospital_id == hospital_id)
+        if bound is not None:
+            conditions.append(column >= bound)
+        return and_(*conditions)
+
+    for model in (HospitalDailyActivity, HospitalDoctorDailyActivity, HospitalHourlyAppointments):
+        session.execute(delete(model).where(scope(model, model.day)))
+
+    status = func.coalesce(Appointment.status, "pending")
+    appointment_sums = [_count_if(status == s).label(f"appointments_{s}") for s in APPOINTMENT_STATUSES]
+
+    # Daily rows merge three sources, so they are added up here (one row per hospital and day)
+    daily = {}
+    sources = [
+        select(Appointment.hospital_id, Appointment.date.label("day"), *appointment_sums)
+        .where(scope(Appointment, Appointment.date))
+        .group_by(Appointment.hospital_id, Appointment.date),
+        select(Prescription.hospital_id, _utc_day(Prescription.issued_date).label("day"),
+               func.count().label("prescriptions_issued"))
+        .where(scope(Prescription, Prescription.issued_date, since_dt), Prescription.issued_date.isnot(None))
+        .group_by(Prescription.hospital_id, _utc_day(Prescription.issued_date)),
+        select(TestRequest.hospital_id, _utc_day(TestRequest.date_requested).label("day"),
+               func.count().label("lab_tests_requested"))
+        .where(scope(TestRequest, TestRequest.date_requested, since_dt), TestRequest.date_requested.isnot(None))
+        .group_by(TestRequest.hospital_id, _utc_day(TestRequest.date_requested)),
+        select(TestRequest.hospital_id, _utc_day(TestRequest.date_completed).label("day"),
+               func.count().label("lab_tests_completed"))
+        .where(scope(TestRequest, TestRequest.date_completed, since_dt), TestRequest.status == "Completed",
+               TestRequest.date_completed.isnot(None))
+        .group_by(TestRequest.hospital_id, _utc_day(TestRequest.date_completed)),
+    ]
+    for stmt in sources:
+        for row in session.execute(stmt.execution_options(skip_tenant_filter=True)).mappings():
+            counts = daily.setdefault((row["hospital_id"], row["day"]), dict.fromkeys(DAILY_COLUMNS, 0))
+            for c in DAILY_COLUMNS:
+                counts[c] += int(row.get(c) or 0)
+    if daily:
+        session.execute(insert(HospitalDailyActivity), [
+            {"hospital_id": h, "day": d, **counts} for (h, d), counts in daily.items()
+        ])
+
+    session.execute(insert(HospitalDoctorDailyActivity).from_select(
+        ["hospital_id", "day", "doctor_id", *APPOINTMENT_COLUMNS],
+        select(Appointment.hospital_id, Appointment.date, Appointment.doctor_id, *appointment_sums)
+        .where(scope(Appointment, Appointment.date))
+        .group_by(Appointment.hospital_id, Appointment.date, Appointment.doctor_id),
+    ))
+    hour = extract("hour", Appointment.time)
+    session.execute(insert(HospitalHourlyAppointments).from_select(
+        ["hospital_id", "day", "hour", "appointments"],
+        select(Appointment.hospital_id, Appointment.date, hour, func.count())
+        .where(scope(Appointment, Appointment.date), Appointment.time.isnot(None))
+        .group_by(Appointment.hospital_id, Appointment.date, hour),
+    ))
+    return len(daily)
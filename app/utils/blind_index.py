@@ -0,0 +1,69 @@
+import hashlib
+import hmac
+import re
+import unicodedata
+from flask import current_app
+
+# Fields of MedicalRecord that get a blind index
+INDEXED_FIELDS = ("diagnosis", "treatment", "notes")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _index_key() -> bytes:
+    """
+    Key for the blind index. BLIND_INDEX_KEY should be set separately from ENCRYPTION_KEY;
+    if it isn't, a distinct key is derived from ENCRYPTION_KEY so the two never coincide.
+    """
+    key = current_app.config.get("BLIND_INDEX_KEY")
+    if key:
+        return key.encode()
+    base = current_app.config["ENCRYPTION_KEY"].encode()
+    return hmac.new(base, b"medbeta-blind-index", hashlib.sha256).digest()
+
+
+def normalize_terms(text: str) -> set:
+    """Lowercase, strip accents/punctuation and split into words; the whole phrase is kept as a term too."""
+    if not text:
+        return set()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    words = _WORD_RE.findall(text)
+    terms = {w for w in words if len(w) > 1}
+    if len(words) > 1:
+        terms.add(" ".join(words))
+    return terms
+
+
+def blind_token(field: str, term: str) -> str:
+    """HMAC-SHA256 of a normalized term, scoped to its field."""
+    return hmac.new(_index_key(), f"{field}:{term}".encode(), hashlib.sha256).hexdigest()
+
+
+def query_tokens(field: str, query: str, exact: bool = False) -> list:
+    """
+    Tokens a record must all carry to match `query`: every word by default,
+    or the whole normalized phrase when `exact` is set.
+    """
+    terms = normalize_terms(query)
+    if exact:
+        phrase = max(terms, key=len, default=None)
+        return [blind_token(field, phrase)] if phrase else []
+    return sorted(blind_token(field, t) for t in terms if " " not in t)
+
+
+def index_medical_record(record, plain_fields: dict):
+    """
+    Replace the blind-index terms of `record` for every field present in `plain_fields`
+    (plaintext values, before encryption). Call before the commit that saves the record.
+    """
+    from app.models.medicalrecord import MedicalRecordTerm  # avoid circular import
+
+    for field, value in plain_fields.items():
+        if field not in INDEXED_FIELDS:
+            continue
+        record.terms = [t for t in record.terms if t.field != field]
+        record.terms.extend(
+            MedicalRecordTerm(field=field, token=blind_token(field, term))
+            for term in normalize_terms(value)
+        )
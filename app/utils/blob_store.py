@@ -0,0 +1,83 @@
+"""Content-addressed on-disk blob store (profile pictures and their thumbnails).
+
+A blob is stored once under its SHA-256, fanned out as <root>/ab/cd/abcd...; writing the
+same bytes again is a no-op, so identical uploads are deduplicated. Files are written to a
+temporary name and renamed, so readers never see a partial blob. Because a hash always
+names the same bytes, it doubles as a strong ETag and responses can be cached forever.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from flask import current_app
+
+THUMBNAIL_SIZES = (64, 128, 256)
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)  # send_file resolves relative paths against the app package
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def thumbnail_path(self, digest, size):
+        return os.path.join(self.root, "thumbs", digest[:2], f"{digest}_{size}.jpg")
+
+    def thumbnail(self, digest, size):
+        """Path of a size×size (max) JPEG thumbnail of a blob, generated on first request and kept."""
+        path = self.thumbnail_path(digest, size)
+        if os.path.exists(path):
+            return path
+        from PIL import Image
+
+        with Image.open(self.path(digest)) as image:
+            image.thumbnail((size, size))
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, "JPEG", quality=85, optimize=True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as out:
+            out.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+        return path
+
+
+def get_blob_store():
+    """Store under BLOB_STORE_DIR; a relative directory is taken relative to the instance folder."""
+    return BlobStore(os.path.join(current_app.instance_path, current_app.config["BLOB_STORE_DIR"]))
+
+
+def sniff_image(data: bytes):
+    """MIME type of an uploaded image, or None if Pillow cannot read it as one."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+            return Image.MIME.get(image.format)
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return None
@@ -0,0 +1,215 @@
+"""Ranked doctor search.
+
+Each doctor has a precomputed row in doctor_search and the normalized words of their name
+and specialization in doctor_search_terms. A query matches doctors having, for every query
+word, a term that starts with it (`token LIKE 'word%'` on an index), and results come back in
+score order, paged with a keyset cursor. Neither step reads users, reviews or appointments.
+
+    score = (1 - w) * rating / 5 + w * availability
+    rating = (C * m + sum of ratings) / (C + number of reviews)  # Bayesian average
+    availability = 1 - appointments in the next 7 days / DOCTOR_WEEKLY_CAPACITY
+
+m and C are DOCTOR_RATING_PRIOR and DOCTOR_RATING_PRIOR_WEIGHT, so a doctor with two five-star
+reviews doesn't outrank one with two hundred 4.8s. The rows are refreshed by mapper events
+whenever a doctor, their name, a review or an appointment changes. Availability also shifts as
+days pass, so run `flask refresh-doctor-search` daily (it also backfills and repairs).
+"""
+import base64
+import json
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from flask import current_app
+from sqlalchemy import delete, event, exists, func, inspect, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import Appointment, Doctor, DoctorSearchEntry, DoctorSearchTerm, Review, User
+from app.utils.time import utc_now
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+MAX_QUERY_WORDS = 5
+AVAILABILITY_DAYS = 7
+BOOKED_STATUSES = ("pending", "accepted")
+
+
+def search_words(text):
+    """Lowercase, strip accents/punctuation and split into words (at most 64 characters each)."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return [w[:64] for w in _WORD_RE.findall(text)]
+
+
+def score_doctor(review_count, rating_sum, upcoming, is_active, config):
+    """(rating, availability, score) for one doctor."""
+    prior, weight = config["DOCTOR_RATING_PRIOR"], config["DOCTOR_RATING_PRIOR_WEIGHT"]
+    rating = (weight * prior + rating_sum) / (weight + review_count) if weight + review_count else prior
+    availability = max(0.0, 1 - upcoming / config["DOCTOR_WEEKLY_CAPACITY"]) if is_active is not False else 0.0
+    share = config["DOCTOR_AVAILABILITY_WEIGHT"]
+    return rating, availability, (1 - share) * rating / 5 + share * availability
+
+
+def _today():
+    return datetime.now(ZoneInfo(current_app.config["APPOINTMENT_TIMEZONE"])).date()
+
+
+def refresh_doctor_search(connection, doctor_ids):
+    """Recompute the search rows and terms of `doctor_ids` from doctors, users, reviews and appointments."""
+    doctor_ids = sorted({d for d in doctor_ids if d is not None})
+    if not doctor_ids:
+        return 0
+
+    doctors = connection.execute(
+        select(Doctor.id, Doctor.hospital_id, Doctor.specialization, Doctor.is_active, User.name)
+        .join(User, User.id == Doctor.user_id)
+        .where(Doctor.id.in_(doctor_ids))
+    ).all()
+    reviews = {
+        row.doctor_id: (row.n, row.total or 0)
+        for row in connection.execute(
+            select(Review.doctor_id, func.count().label("n"), func.sum(Review.rating).label("total"))
+            .where(Review.doctor_id.in_(doctor_ids))
+            .group_by(Review.doctor_id)
+        )
+    }
+    today = _today()
+    upcoming = dict(connection.execute(
+        select(Appointment.doctor_id, func.count())
+        .where(Appointment.doctor_id.in_(doctor_ids), Appointment.status.in_(BOOKED_STATUSES),
+               Appointment.date.between(today, today + timedelta(days=AVAILABILITY_DAYS - 1)))
+        .group_by(Appointment.doctor_id)
+    ).all())
+
+    entries, terms = [], []
+    for d in doctors:
+        review_count, rating_sum = reviews.get(d.id, (0, 0))
+        booked = upcoming.get(d.id, 0)
+        rating, availability, score = score_doctor(review_count, rating_sum, booked, d.is_active, current_app.config)
+        entries.append(dict(
+            doctor_id=d.id, hospital_id=d.hospital_id, name=d.name, specialization=d.specialization,
+            is_active=d.is_active is not False, review_count=review_count, rating_sum=rating_sum, rating=rating,
+            upcoming_appointments=booked, availability=availability, score=score, updated_at=utc_now(),
+        ))
+        terms.extend({"doctor_id": d.id, "token": w}
+                     for w in set(search_words(d.name)) | set(search_words(d.specialization)))
+
+    entry_table, term_table = DoctorSearchEntry.__table__, DoctorSearchTerm.__table__
+    connection.execute(delete(term_table).where(term_table.c.doctor_id.in_(doctor_ids)))
+    gone = set(doctor_ids) - {d.id for d in doctors}
+    if gone:
+        connection.execute(delete(entry_table).where(entry_table.c.doctor_id.in_(gone)))
+    if entries:
+        insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(entry_table)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=["doctor_id"],
+            set_={c: stmt.excluded[c] for c in entries[0] if c != "doctor_id"},
+        ), entries)
+    if terms:
+        connection.execute(term_table.insert(), terms)
+    return len(entries)
+
+
+# Keep the rows current: model -> (attributes that matter, doctors a row affects given its old values)
+def _moved_doctors(target, previous):
+    return (target.doctor_id, previous.get("doctor_id"))
+
+
+def _doctor_ids(target, previous):
+    return (target.id,)
+
+
+def _user_doctors(connection, target):
+    return connection.execute(select(Doctor.id).where(Doctor.user_id == target.id)).scalars().all()
+
+
+SEARCH_SOURCES = {
+    Doctor: (("user_id", "hospital_id", "specialization", "is_active"), _doctor_ids),
+    Review: (("doctor_id", "rating"), _moved_doctors),
+    Appointment: (("doctor_id", "date", "status"), _moved_doctors),
+}
+
+
+def _previous(target, fields):
+    state = inspect(target)
+    return {f: state.attrs[f].history.deleted[0] for f in fields if state.attrs[f].history.deleted}
+
+
+def _written(mapper, connection, target):
+    _, doctors = SEARCH_SOURCES[mapper.class_]
+    refresh_doctor_search(connection, doctors(target, {}))
+
+
+def _updated(mapper, connection, target):
+    fields, doctors = SEARCH_SOURCES[mapper.class_]
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in fields):
+        refresh_doctor_search(connection, doctors(target, _previous(target, fields)))
+
+
+def _user_renamed(mapper, connection, target):
+    if inspect(target).attrs.name.history.has_changes():
+        refresh_doctor_search(connection, _user_doctors(connection, target))
+
+
+for _model, (_fields, _) in SEARCH_SOURCES.items():
+    event.listen(_model, "after_insert", _written)
+    event.listen(_model, "after_update", _updated)
+    event.listen(_model, "after_delete", _written)
+    # Load old values on set, so a moved review or appointment also refreshes the doctor it left
+    for _field in _fields:
+        event.listen(getattr(_model, _field), "set", lambda *args: None, active_history=True)
+event.listen(User, "after_update", _user_renamed)
+
+
+def encode_cursor(score, doctor_id):
+    raw = json.dumps([score, doctor_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (score, doctor_id) or raise ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, doctor_id = json.loads(raw)
+        return float(score), int(doctor_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def search_doctors(session, query=None, hospital_id=None, limit=20, cursor=None):
+    """Page of active doctors matching every word of `query` by prefix, best score first."""
+    entry = DoctorSearchEntry
+    stmt = select(entry).where(entry.is_active.is_(True))
+    for word in search_words(query)[:MAX_QUERY_WORDS]:
+        stmt = stmt.where(exists().where(
+            DoctorSearchTerm.doctor_id == entry.doctor_id, DoctorSearchTerm.token.like(f"{word}%")
+        ))
+    if hospital_id is not None:
+        stmt = stmt.where(entry.hospital_id == hospital_id)
+
+    # Resume strictly after the cursor in (score desc, doctor_id asc) order
+    if cursor:
+        score, doctor_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(entry.score < score, (entry.score == score) & (entry.doctor_id > doctor_id)))
+
+    rows = session.execute(stmt.order_by(entry.score.desc(), entry.doctor_id).limit(limit + 1)).scalars().all()
+    page = rows[:limit]
+    return {
+        "items": [
+            {
+                "id": e.doctor_id,
+                "name": e.name,
+                "specialization": e.specialization,
+                "hospital_id": e.hospital_id,
+                "rating": round(e.rating, 2),
+                "review_count": e.review_count,
+                "average_rating": round(e.rating_sum / e.review_count, 2) if e.review_count else None,
+                "availability": round(e.availability, 2),
+                "score": round(e.score, 4),
+            }
+            for e in page
+        ],
+        "next_cursor": encode_cursor(page[-1].score, page[-1].doctor_id) if len(rows) > limit else None,
+    }
@@ -0,0 +1,246 @@
+"""HTTP transport for the email providers (Brevo, SendGrid).
+
+One transport per provider is kept for the life of the process. It owns a pooled
+keep-alive `requests.Session`, so consecutive sends reuse the TLS connection. Every call
+has a timeout, transient failures (connection errors, timeouts, 429 and 5xx) are retried
+with exponential backoff and full jitter, and a circuit breaker fails fast while the
+provider is down instead of tying up request threads.
+
+Bulk sends go through the providers' batch APIs: one request per chunk of recipients,
+with per-recipient values substituted into `{{placeholders}}` by the provider (SendGrid
+personalizations, Brevo messageVersions).
+
+EMAIL_API_BASE_URL points a transport at another host (e.g. a local HTTP stub).
+"""
+import os
+import random
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class EmailTransportError(Exception):
+    pass
+
+
+class CircuitOpenError(EmailTransportError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one trial call through after `reset_timeout` seconds."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                raise CircuitOpenError("Email provider circuit is open; not sending")
+            if self.state == "half-open":
+                self._opened_at = time.monotonic()  # one trial call per reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class EmailTransport:
+    name = None
+    default_base_url = None
+    path = None
+    max_batch = 1000  # recipients per request the provider accepts
+
+    def __init__(self, api_key, from_email, base_url=None, timeout=(3.05, 10), max_retries=3,
+                 backoff=0.5, max_backoff=8.0, pool_size=10, breaker=None):
+        self.api_key = api_key
+        self.from_email = from_email
+        self.url = (base_url or self.default_base_url).rstrip("/") + self.path
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers())
+
+    def headers(self):
+        raise NotImplementedError
+
+    def single_payload(self, to_email, subject, html_content):
+        raise NotImplementedError
+
+    def batch_payload(self, subject, html_template, recipients):
+        raise NotImplementedError
+
+    def _sleep_before_retry(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = min(float(retry_after), self.max_backoff)
+        else:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))  # full jitter
+        time.sleep(delay)
+
+    def post(self, payload):
+        """POST one API call with retries, guarded by the circuit breaker."""
+        self.breaker.before_call()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if response.status_code < 300:
+                    self.breaker.record_success()
+                    return response
+                last_error = EmailTransportError(f"{self.name} returned {response.status_code}: {response.text[:200]}")
+                if response.status_code not in RETRY_STATUSES:
+                    break  # the request itself is wrong; retrying will not help
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = EmailTransportError(f"{self.name} unreachable: {e}")
+            if attempt < self.max_retries:
+                self._sleep_before_retry(attempt, response)
+        self.breaker.record_failure()
+        raise last_error
+
+    def send(self, to_email, subject, html_content):
+        return self.post(self.single_payload(to_email, subject, html_content))
+
+    def send_batch(self, subject, html_template, recipients, chunk_size=None):
+        """
+        Send one template to many recipients, `chunk_size` per API call.
+        `recipients` is a list of (email, {placeholder: value}). Returns the emails whose
+        chunk failed; other chunks are still attempted.
+        """
+        chunk_size = min(chunk_size or self.max_batch, self.max_batch)
+        failed = []
+        for i in range(0, len(recipients), chunk_size):
+            chunk = recipients[i:i + chunk_size]
+            try:
+                self.post(self.batch_payload(subject, html_template, chunk))
+            except EmailTransportError as e:
+                print(f"Batch email to {len(chunk)} recipients failed: {e}")
+                failed.extend(email for email, _ in chunk)
+        return failed
+
+
+class SendGridTransport(EmailTransport):
+    name = "sendgrid"
+    default_base_url = "https://api.sendgrid.com"
+    path = "/v3/mail/send"
+
+    def headers(self):
+        return {"authorization": f"Bearer {self.api_key}", "content-type": "application/json"}
+
+    def single_payload(self, to_email, subject, html_content):
+        return {
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "from": {"email": self.from_email},
+            "subject": subject,
+            "content": [{"type": "text/html", "value": html_content}],
+        }
+
+    def batch_payload(self, subject, html_template, recipients):
+        # Each personalization is delivered separately; substitutions fill the {{placeholders}}
+        return {
+            "personalizations": [
+                {
+                    "to": [{"email": email}],
+                    "substitutions": {"{{%s}}" % key: str(value) for key, value in params.items()},
+                }
+                for email, params in recipients
+            ],
+            "from": {"email": self.from_email},
+            "subject": subject,
+            "content": [{"type": "text/html", "value": PLACEHOLDER_RE.sub(r"{{\1}}", html_template)}],
+        }
+
+
+class BrevoTransport(EmailTransport):
+    name = "brevo"
+    default_base_url = "https://api.brevo.com"
+    path = "/v3/smtp/email"
+
+    def headers(self):
+        return {"accept": "application/json", "api-key": self.api_key, "content-type": "application/json"}
+
+    def single_payload(self, to_email, subject, html_content):
+        return {
+            "sender": {"email": self.from_email, "name": "MedBeta"},
+            "to": [{"email": to_email}],
+            "subject": subject,
+            "htmlContent": html_content,
+        }
+
+    def batch_payload(self, subject, html_template, recipients):
+        # messageVersions: one message per recipient, {{params.x}} filled from each version's params
+        return {
+            "sender": {"email": self.from_email, "name": "MedBeta"},
+            "subject": subject,
+            "htmlContent": PLACEHOLDER_RE.sub(r"{{params.\1}}", html_template),
+            "messageVersions": [
+                {"to": [{"email": email}], "params": {key: str(value) for key, value in params.items()}}
+                for email, params in recipients
+            ],
+        }
+
+
+PROVIDERS = {"sendgrid": SendGridTransport, "brevo": BrevoTransport}
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport():
+    """
+    The shared transport for EMAIL_PROVIDER, or None when its API key is not set (dev mode).
+    Transports are cached per provider/key/base URL so their connection pools are reused.
+    """
+    provider = os.getenv("EMAIL_PROVIDER", "sendgrid").lower()
+    cls = PROVIDERS.get(provider, SendGridTransport)
+    api_key = os.getenv("BREVO_API_KEY" if cls is BrevoTransport else "SENDGRID_API_KEY")
+    if not api_key:
+        return None
+
+    base_url = os.getenv("EMAIL_API_BASE_URL")
+    key = (cls.name, api_key, base_url)
+    with _transports_lock:
+        if key not in _transports:
+            _transports[key] = cls(
+                api_key,
+                os.getenv("FROM_EMAIL", "noreply@yourapp.com"),
+                base_url=base_url,
+                timeout=(3.05, float(os.getenv("EMAIL_TIMEOUT", "10"))),
+                max_retries=int(os.getenv("EMAIL_MAX_RETRIES", "3")),
+            )
+        return _transports[key]
+
+
+def render(template, params):
+    """Fill {{placeholders}} locally (dev mode and single sends)."""
+    return PLACEHOLDER_RE.sub(lambda m: str(params.get(m.group(1), m.group(0))), template)
@@ -1,85 +1,133 @@
 import os
-import requests
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import httpx
+from app.utils.email_transport import get_transport, render, EmailTransportError
 
-def send_email(to_email, subject, html_content):
+# Recipients per provider batch call for bulk invites
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "500"))
+
+
+def _print_dev_mode(to_email, subject, html_content):
+    provider = os.getenv("EMAIL_PROVIDER", "sendgrid").lower()
+    print(f"\n[DEV MODE] Email not sent (no {provider.upper()} API key).")
+    print(f"To: {to_email}")
+    print(f"Subject: {subject}")
+    print(f"Content:\n{html_content}\n")
+
+
+def send_email(to_email, subject, html_content, raise_errors=False):
     """
-    Send an email using the provider defined in EMAIL_PROVIDER.
-    Supports Brevo or SendGrid.
+    Send an email using the provider defined in EMAIL_PROVIDER (Brevo or SendGrid),
+    over the provider's pooled transport (timeouts, retries, circuit breaker).
+    Returns True when the provider accepted the message. Failures are logged and
+    return False, or raise EmailTransportError when raise_errors is set.
     """
-    provider = os.getenv("EMAIL_PROVIDER", "sendgrid").lower()
-    from_email = os.getenv("FROM_EMAIL", "noreply@yourapp.com")
-
-    # BREVO 
-    if provider == "brevo":
-        api_key = os.getenv("BREVO_API_KEY")
-        if not api_key:
-            print("\n[DEV MODE] Email not sent (no BREVO_API_KEY).")
-            print(f"To: {to_email}")
-            print(f"Subject: {subject}")
-            print(f"Content:\n{html_content}\n")
-            return
-
-        url = "https://api.brevo.com/v3/smtp/email"
-        headers = {
-            "accept": "application/json",
-            "api-key": api_key,
-            "content-type": "application/json"
-        }
-        payload = {
-            "sender": {"email": from_email, "name": "MedBeta"},
-            "to": [{"email": to_email}],
-            "subject": subject,
-            "htmlContent": html_content
-        }
-
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            if response.status_code == 201:
-                print(f"Email sent to {to_email} via Brevo!")
-            else:
-                print(f" Failed to send email via Brevo: {response.status_code} - {response.text}")
-        except Exception as e:
-            print(f"Error sending Brevo email: {e}")
-
-    # -------------------- SENDGRID --------------------
-    else:
-        api_key = os.getenv("SENDGRID_API_KEY")
-        if not api_key:
-            print("\n[DEV MODE] Email not sent (no SENDGRID_API_KEY).")
-            print(f"To: {to_email}")
-            print(f"Subject: {subject}")
-            print(f"Content:\n{html_content}\n")
-            return
-
-        try:
-            message = Mail(
-                from_email=from_email,
-                to_emails=to_email,
-                subject=subject,
-                html_content=html_content,
-            )
-            sg = SendGridAPIClient(api_key)
-            response = sg.send(message)
-            print(f" Email sent to {to_email} via SendGrid — Status {response.status_code}")
-        except Exception as e:
-            print(f" Failed to send email to {to_email}: {e}")
+    transport = get_transport()
+    if transport is None:
+        _print_dev_mode(to_email, subject, html_content)
+        return False
 
+    try:
+        transport.send(to_email, subject, html_content)
+        print(f"Email sent to {to_email} via {transport.name}")
+        return True
+    except EmailTransportError as e:
+        print(f" Failed to send email to {to_email} via {transport.name}: {e}")
+        if raise_errors:
+            raise
+        return False
 
-def send_invite_email(to_email, token):
+
+def send_bulk_email(subject, html_template, recipients):
     """
-    Sends an invitation email with a setup link.
+    Send one template to many recipients through the provider's batch API.
+    `recipients` is a list of (email, {placeholder: value}) filling {{placeholder}} in the
+    template. Returns the list of emails that could not be sent.
     """
-    setup_link = f"{os.getenv('FRONTEND_URL', 'http://localhost:5173')}/setup-password/{token}"
-    subject = "You're invited to join MedBeta!"
-    html_content = f"""
+    transport = get_transport()
+    if transport is None:
+        for email, params in recipients:
+            _print_dev_mode(email, subject, render(html_template, params))
+        return []
+    return transport.send_batch(subject, html_template, recipients, chunk_size=EMAIL_BATCH_SIZE)
+
+
+# Shared async client for the ASGI mode: keeps connections to the provider alive between sends
+_async_client = None
+
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(timeout=10.0)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+
+
+async def send_email_async(to_email, subject, html_content):
+    """
+    Async variant of send_email for the ASGI mode, so the event loop
+    keeps serving other requests while the provider call is in flight.
+    """
+    transport = get_transport()
+    if transport is None:
+        _print_dev_mode(to_email, subject, html_content)
+        return False
+
+    # Same payload, endpoint and circuit breaker as the sync transport
+    try:
+        transport.breaker.before_call()
+        response = await _get_async_client().post(
+            transport.url, json=transport.single_payload(to_email, subject, html_content), headers=transport.headers()
+        )
+        if response.status_code < 300:
+            transport.breaker.record_success()
+            print(f"Email sent to {to_email} via {transport.name}!")
+            return True
+        transport.breaker.record_failure()
+        print(f" Failed to send email via {transport.name}: {response.status_code} - {response.text}")
+    except EmailTransportError as e:
+        print(f" Not sending to {to_email}: {e}")
+    except httpx.HTTPError as e:
+        transport.breaker.record_failure()
+        print(f"Error sending {transport.name} email: {e}")
+    return False
+
+
+INVITE_SUBJECT = "You're invited to join MedBeta!"
+INVITE_TEMPLATE = """
         <h2>Welcome to MedBeta </h2>
         <p>You’ve been invited to join our platform. Please click below to set your password and activate your account:</p>
-        <p><a href="{setup_link}" target="_blank" style="color:#1a73e8;">Set up your account</a></p>
+        <p><a href="{{setup_link}}" target="_blank" style="color:#1a73e8;">Set up your account</a></p>
         <p>This link will expire in 7 days.</p>
     """
-    send_email(to_email, subject, html_content)
+
+
+def _setup_link(token):
+    return f"{os.getenv('FRONTEND_URL', 'http://localhost:5173')}/setup-password/{token}"
+
+
+def send_invite_email(to_email, token):
+    """
+    Sends an invitation email with a setup link.
+    """
+    return send_email(to_email, INVITE_SUBJECT, render(INVITE_TEMPLATE, {"setup_link": _setup_link(token)}))
+
+
+def send_invite_emails(invites):
+    """
+    Sends invitation emails for a list of (email, token) in provider batches.
+    Returns the emails that could not be sent.
+    """
+    return send_bulk_email(
+        INVITE_SUBJECT,
+        INVITE_TEMPLATE,
+        [(email, {"setup_link": _setup_link(token)}) for email, token in invites],
+    )
 
 
 def send_reset_email(to_email, token):
@@ -94,4 +142,4 @@ def send_reset_email(to_email, token):
         <p><a href="{reset_link}" target="_blank" style="color:#1a73e8;">Reset Password</a></p>
         <p>If you didn’t request this, you can safely ignore this email.</p>
     """
-    send_email(to_email, subject, html_content)
+    return send_email(to_email, subject, html_content)
@@ -1,18 +1,79 @@
-from cryptography.fernet import Fernet
+import hashlib
+from functools import lru_cache
+from cryptography.fernet import Fernet, MultiFernet
 from flask import current_app
+from sqlalchemy.ext.hybrid import hybrid_property
+
+
+# Key ring: ENCRYPTION_KEY encrypts; ENCRYPTION_PREVIOUS_KEYS (comma-separated, newest first)
+# can still decrypt, so ENCRYPTION_KEY can be rotated while old ciphertext is re-encrypted
+# in the background (flask rotate-encryption-key).
+
+def _key_ring():
+    previous = current_app.config.get("ENCRYPTION_PREVIOUS_KEYS") or ""
+    return (current_app.config["ENCRYPTION_KEY"],) + tuple(k.strip() for k in previous.split(",") if k.strip())
+
+
+@lru_cache(maxsize=8)
+def _multi_fernet(keys):
+    return MultiFernet([Fernet(k.encode()) for k in keys])
+
+
+def get_fernet() -> MultiFernet:
+    """MultiFernet over the configured key ring (built once per ring)."""
+    return _multi_fernet(_key_ring())
+
+
+def key_id(key: str = None) -> str:
+    """Short fingerprint of a key (the current ENCRYPTION_KEY by default), safe to store and log."""
+    key = key or current_app.config["ENCRYPTION_KEY"]
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
 
 def encrypt_text(plain_text: str) -> str:
-    """Encrypt plain text using Fernet AES encryption."""
+    """Encrypt plain text using Fernet AES encryption with the current key."""
     if not plain_text:
         return None
-    key = current_app.config["ENCRYPTION_KEY"].encode()
-    fernet = Fernet(key)
-    return fernet.encrypt(plain_text.encode()).decode()
+    return get_fernet().encrypt(plain_text.encode()).decode()
 
 def decrypt_text(cipher_text: str) -> str:
-    """Decrypt encrypted text using Fernet AES decryption."""
+    """Decrypt encrypted text using Fernet AES decryption, trying every key in the ring."""
     if not cipher_text:
         return None
-    key = current_app.config["ENCRYPTION_KEY"].encode()
-    fernet = Fernet(key)
-    return fernet.decrypt(cipher_text.encode()).decode()
+    return get_fernet().decrypt(cipher_text.encode()).decode()
+
+def rotate_text(cipher_text: str, fernet: MultiFernet = None) -> str:
+    """Re-encrypt ciphertext under the current key (original timestamp is kept)."""
+    if not cipher_text:
+        return cipher_text
+    return (fernet or get_fernet()).rotate(cipher_text.encode()).decode()
+
+
+def encrypted_field(column_attr):
+    """
+    Plaintext view of a Fernet-encrypted column mapped as `column_attr` (e.g. "_diagnosis").
+
+    Reading decrypts on first access and caches the plaintext on the instance, keyed by the
+    ciphertext it came from, so rows that are loaded but never read are never decrypted and
+    a refreshed row is decrypted again. Assigning encrypts exactly once. At class level it is
+    the underlying column, so queries compare ciphertext.
+    """
+    def fget(self):
+        cipher = getattr(self, column_attr)
+        cache = self.__dict__.setdefault("_plaintext_cache", {})
+        cached = cache.get(column_attr)
+        if cached is not None and cached[0] == cipher:
+            return cached[1]
+        plain = decrypt_text(cipher)
+        cache[column_attr] = (cipher, plain)
+        return plain
+
+    def fset(self, value):
+        cipher = encrypt_text(value)
+        setattr(self, column_attr, cipher)
+        self.__dict__.setdefault("_plaintext_cache", {})[column_attr] = (cipher, value or None)
+
+    def expr(cls):
+        return getattr(cls, column_attr)
+
+    return hybrid_property(fget, fset, expr=expr)
@@ -0,0 +1,234 @@
+"""Set-based hospital deletion, run as a resumable background job.
+
+Every step is a bounded `DELETE ... WHERE id IN (SELECT id ... LIMIT n)` (or an UPDATE that
+detaches rows owned by other hospitals), repeated until it affects no rows. Steps run in
+foreign-key dependency order and each batch commits together with the job's progress, so a
+crashed or failed job resumes at the step it was on without redoing finished work.
+
+A worker claims a job before running it (`claim_hospital_deletion`), so a job is never run by
+two workers at once. Each committed batch bumps the job's updated_at; a running job that has
+not committed for DELETION_LEASE is taken to be dead and can be claimed again.
+"""
+import threading
+import traceback
+from datetime import timedelta
+from sqlalchemy import case, delete, null, update, select, or_
+from app.db import db
+from app.models import (
+    Hospital, HospitalDeletionJob, User, Doctor, Technician, Pharmacy, PendingUser, Appointment,
+    MedicalRecord, MedicalRecordTerm, Prescription, TestRequest, AccessLog, Review, Notification,
+    DoctorPatientPanel, LabResultValue, DoctorSearchEntry, DoctorSearchTerm, HospitalDailyActivity, HospitalDoctorDailyActivity, HospitalHourlyAppointments,
+)
+from app.utils.time import utc_now
+
+DEFAULT_BATCH_SIZE = 1000
+DELETION_LEASE = timedelta(minutes=10)
+
+
+def _doctors(hospital_id):
+    return select(Doctor.id).where(Doctor.hospital_id == hospital_id)
+
+
+def _technicians(hospital_id):
+    return select(Technician.id).where(Technician.hospital_id == hospital_id)
+
+
+def _pharmacies(hospital_id):
+    return select(Pharmacy.id).where(Pharmacy.hospital_id == hospital_id)
+
+
+def _appointments(hospital_id):
+    return select(Appointment.id).where(Appointment.hospital_id == hospital_id)
+
+
+def _hospital_records(hospital_id):
+    return select(MedicalRecord.id).where(or_(
+        MedicalRecord.hospital_id == hospital_id,
+        MedicalRecord.doctor_id.in_(_doctors(hospital_id)),
+        MedicalRecord.appointment_id.in_(_appointments(hospital_id)),
+    ))
+
+
+def _delete_batch(model, condition):
+    def step(hospital_id, batch_size):
+        ids = select(model.id).where(condition(hospital_id)).limit(batch_size)
+        return db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)).rowcount
+    return step
+
+
+def _detach_batch(model, column, condition):
+    """Null out references from rows that belong to other hospitals (e.g. prescriptions claimed by our pharmacy)."""
+    def step(hospital_id, batch_size):
+        ids = select(model.id).where(condition(hospital_id)).limit(batch_size)
+        stmt = update(model).where(model.id.in_(ids)).values({column.key: None})
+        return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    return step
+
+
+def _release_prescriptions_batch(hospital_id, batch_size):
+    """
+    Detach other hospitals' prescriptions from our pharmacies. Claimed and verified ones go back
+    to issued, so another pharmacy can claim them; dispensed and cancelled ones keep their status.
+    """
+    ids = select(Prescription.id).where(Prescription.pharmacy_id.in_(_pharmacies(hospital_id))).limit(batch_size)
+    in_progress = Prescription.status.in_(("claimed", "verified"))
+    stmt = update(Prescription).where(Prescription.id.in_(ids)).values(
+        pharmacy_id=None,
+        status=case((in_progress, "issued"), else_=Prescription.status),
+        claimed_at=case((in_progress, null()), else_=Prescription.claimed_at),
+        verified_at=case((in_progress, null()), else_=Prescription.verified_at),
+    )
+    return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def _delete_staff_batch(model):
+    """Delete a batch of staff profiles together with their login accounts."""
+    def step(hospital_id, batch_size):
+        rows = db.session.execute(
+            select(model.id, model.user_id).where(model.hospital_id == hospital_id).limit(batch_size)
+        ).all()
+        if not rows:
+            return 0
+        user_ids = [r.user_id for r in rows]
+        db.session.execute(delete(Notification).where(Notification.user_id.in_(user_ids)))
+        db.session.execute(delete(model).where(model.id.in_([r.id for r in rows])))
+        db.session.execute(delete(User).where(User.id.in_(user_ids)))
+        return len(rows)
+    return step
+
+
+def _delete_panel_batch(hospital_id, batch_size):
+    """Drop the panel rows of a batch of the hospital's doctors (progress is counted per doctor)."""
+    panel = DoctorPatientPanel.__table__
+    doctor_ids = db.session.execute(
+        select(panel.c.doctor_id).where(panel.c.doctor_id.in_(_doctors(hospital_id))).distinct().limit(batch_size)
+    ).scalars().all()
+    if not doctor_ids:
+        return 0
+    db.session.execute(delete(panel).where(panel.c.doctor_id.in_(doctor_ids)))
+    return len(doctor_ids)
+
+
+def _delete_search_batch(hospital_id, batch_size):
+    """Drop the search rows and terms of a batch of the hospital's doctors."""
+    doctor_ids = db.session.execute(
+        select(DoctorSearchEntry.doctor_id).where(DoctorSearchEntry.doctor_id.in_(_doctors(hospital_id))).limit(batch_size)
+    ).scalars().all()
+    if not doctor_ids:
+        return 0
+    db.session.execute(delete(DoctorSearchTerm).where(DoctorSearchTerm.doctor_id.in_(doctor_ids)))
+    db.session.execute(delete(DoctorSearchEntry).where(DoctorSearchEntry.doctor_id.in_(doctor_ids)))
+    return len(doctor_ids)
+
+
+def _delete_rollup_batch(model):
+    """Drop a batch of days of the hospital's activity rollups (progress is counted per day)."""
+    def step(hospital_id, batch_size):
+        days = db.session.execute(
+            select(model.day).where(model.hospital_id == hospital_id).distinct().limit(batch_size)
+        ).scalars().all()
+        if not days:
+            return 0
+        db.session.execute(delete(model).where(model.hospital_id == hospital_id, model.day.in_(days)))
+        return len(days)
+    return step
+
+
+# (name, step) in dependency order: children before the rows they reference
+STEPS = [
+    ("medical_record_terms", _delete_batch(MedicalRecordTerm, lambda h: MedicalRecordTerm.record_id.in_(_hospital_records(h)))),
+    ("medical_records", _delete_batch(MedicalRecord, lambda h: MedicalRecord.id.in_(_hospital_records(h)))),
+    ("prescriptions", _delete_batch(Prescription, lambda h: or_(Prescription.hospital_id == h, Prescription.doctor_id.in_(_doctors(h))))),
+    ("prescriptions_unclaimed", _release_prescriptions_batch),
+    ("lab_result_values", _delete_batch(LabResultValue, lambda h: or_(
+        LabResultValue.hospital_id == h,
+        LabResultValue.test_request_id.in_(select(TestRequest.id).where(TestRequest.doctor_id.in_(_doctors(h))))
+    ))),
+    ("test_requests", _delete_batch(TestRequest, lambda h: or_(TestRequest.hospital_id == h, TestRequest.doctor_id.in_(_doctors(h))))),
+    ("test_requests_unassigned", _detach_batch(TestRequest, TestRequest.technician_id, lambda h: TestRequest.technician_id.in_(_technicians(h)))),
+    ("access_logs", _delete_batch(AccessLog, lambda h: or_(AccessLog.hospital_id == h, AccessLog.doctor_id.in_(_doctors(h))))),
+    ("reviews", _delete_batch(Review, lambda h: or_(Review.hospital_id == h, Review.doctor_id.in_(_doctors(h))))),
+    ("appointments", _delete_batch(Appointment, lambda h: or_(Appointment.hospital_id == h, Appointment.doctor_id.in_(_doctors(h))))),
+    ("doctor_patient_panel", _delete_panel_batch),
+    ("hospital_daily_activity", _delete_rollup_batch(HospitalDailyActivity)),
+    ("hospital_doctor_daily_activity", _delete_rollup_batch(HospitalDoctorDailyActivity)),
+    ("hospital_hourly_appointments", _delete_rollup_batch(HospitalHourlyAppointments)),
+    ("doctor_search", _delete_search_batch),
+    ("doctors", _delete_staff_batch(Doctor)),
+    ("technicians", _delete_staff_batch(Technician)),
+    ("pharmacies", _delete_staff_batch(Pharmacy)),
+    ("pending_users", _delete_batch(PendingUser, lambda h: PendingUser.hospital_id == h)),
+    ("hospital", _delete_batch(Hospital, lambda h: Hospital.id == h)),
+]
+
+
+def claim_hospital_deletion(job_id, lease=DELETION_LEASE):
+    """
+    Mark a pending or failed job (or a running one silent for `lease`) as running for the caller.
+    Returns False when the job is completed or another worker holds it.
+    """
+    now = utc_now()
+    job = HospitalDeletionJob
+    claimable = or_(
+        job.status.in_(("pending", "failed")),
+        (job.status == "running") & (job.updated_at < now - lease),
+    )
+    claimed = db.session.execute(
+        update(job).where(job.id == job_id, claimable).values(status="running", error=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def run_hospital_deletion(job_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Run (or resume) a job claimed with claim_hospital_deletion to completion. Must be called inside an app context."""
+    job = db.session.get(HospitalDeletionJob, job_id)
+    if not job or job.status != "running":
+        return job
+
+    names = [name for name, _ in STEPS]
+    start = names.index(job.current_step) if job.current_step in names else 0
+
+    try:
+        for name, step in STEPS[start:]:
+            job.current_step = name
+            db.session.commit()
+            while True:
+                deleted = step(job.hospital_id, batch_size)
+                if deleted:
+                    counts = dict(job.deleted_counts or {})
+                    counts[name] = counts.get(name, 0) + deleted
+                    job.deleted_counts = counts
+                job.updated_at = utc_now()  # heartbeat for DELETION_LEASE
+                db.session.commit()  # batch and its progress land together
+                if deleted < batch_size:
+                    break
+
+        job.status = "completed"
+        job.current_step = None
+        job.completed_at = utc_now()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(HospitalDeletionJob, job_id)
+        job.status = "failed"
+        job.error = str(e)
+        db.session.commit()
+        print(f"Hospital deletion job {job_id} failed: {e}")
+        traceback.print_exc()
+    return job
+
+
+def start_hospital_deletion(app, job_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Run a claimed job on a daemon thread so the request returns immediately."""
+    def target():
+        with app.app_context():
+            try:
+                run_hospital_deletion(job_id, batch_size)
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=target, name=f"hospital-deletion-{job_id}", daemon=True)
+    thread.start()
+    return thread
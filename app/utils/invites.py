@@ -0,0 +1,88 @@
+"""Invite expiry: lookups that only see live invites, and a batched sweeper for expired ones.
+
+PendingUser.expires_at is naive UTC (the invite routes store datetime.utcnow() + 7 days).
+The token lookup goes through the unique invite_token index and the sweeper walks the
+(is_accepted, expires_at) index, so neither scans pending_users.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, delete, and_, or_
+from app.db import db
+from app.models import PendingUser
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def live_invite():
+    """Filter for invites that are still usable: not accepted and not expired."""
+    return and_(
+        PendingUser.is_accepted == False,
+        or_(PendingUser.expires_at.is_(None), PendingUser.expires_at > _now()),
+    )
+
+
+def find_live_invite(token):
+    return PendingUser.query.filter(PendingUser.invite_token == token, live_invite()).first()
+
+
+def release_expired_invite(email):
+    """Drop an expired, unaccepted invite for `email` so the address can be invited again."""
+    return db.session.execute(
+        delete(PendingUser).where(
+            PendingUser.email == email,
+            PendingUser.is_accepted == False,
+            PendingUser.expires_at <= _now(),
+        )
+    ).rowcount
+
+
+def _archive(rows, archive_dir):
+    """Append rows to today's archive; each call adds a gzip member, fsynced before the rows are deleted."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"pending_users_{_now():%Y_%m_%d}.ndjson.gz")
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for invite in rows:
+                out.write(json.dumps({
+                    "id": invite.id,
+                    "email": invite.email,
+                    "name": invite.name,
+                    "role": invite.role,
+                    "hospital_id": invite.hospital_id,
+                    "created_at": invite.created_at.isoformat() if invite.created_at else None,
+                    "expires_at": invite.expires_at.isoformat(),
+                }).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    return path
+
+
+def sweep_expired_invites(batch_size=1000, grace_days=0, archive_dir=None):
+    """
+    Delete unaccepted invites that expired more than `grace_days` ago, `batch_size` rows per
+    transaction, optionally archiving them first. Returns the number of invites removed.
+    """
+    cutoff = _now() - timedelta(days=grace_days)
+    total = 0
+    while True:
+        rows = db.session.execute(
+            select(PendingUser)
+            .where(PendingUser.is_accepted == False, PendingUser.expires_at < cutoff)
+            .order_by(PendingUser.expires_at)
+            .limit(batch_size)
+        ).scalars().all()
+        if not rows:
+            break
+        if archive_dir:
+            _archive(rows, archive_dir)
+        db.session.execute(delete(PendingUser).where(PendingUser.id.in_([r.id for r in rows])))
+        db.session.commit()
+        db.session.expunge_all()
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
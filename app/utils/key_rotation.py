@@ -0,0 +1,108 @@
+"""Online re-encryption of medical records after ENCRYPTION_KEY is rotated.
+
+Rotation steps: put the old key in ENCRYPTION_PREVIOUS_KEYS and the new one in ENCRYPTION_KEY
+(everything stays readable), then run `flask rotate-encryption-key`. The job walks
+medical_records in primary-key batches; a thread pool re-encrypts each batch's ciphertext
+under the new key and the batch is written back with one executemany UPDATE in its own short
+transaction, together with the checkpoint (last_id). A crashed or failed job resumes after
+the last committed batch. Once it completes, the old key can be dropped.
+
+A row that is edited while its batch is in flight is left alone: the UPDATE matches on the
+updated_at value that was read, and the edit itself was already encrypted with the new key.
+"""
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import select, update, bindparam
+from app.db import db
+from app.models import KeyRotationJob, MedicalRecord
+from app.utils.encryption import get_fernet, key_id, rotate_text
+from app.utils.time import utc_now
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+ENCRYPTED_COLUMNS = ("diagnosis", "treatment", "notes")  # medical_records columns holding Fernet tokens
+
+
+def get_or_create_job():
+    """The unfinished (or finished) job for the current key, or a new one."""
+    target = key_id()
+    job = (
+        KeyRotationJob.query
+        .filter_by(table_name=MedicalRecord.__tablename__, key_id=target)
+        .order_by(KeyRotationJob.id.desc())
+        .first()
+    )
+    if not job:
+        job = KeyRotationJob(table_name=MedicalRecord.__tablename__, key_id=target)
+        db.session.add(job)
+        db.session.commit()
+    return job
+
+
+def _rotate_chunk(rows, fernet):
+    return [
+        {
+            "b_id": row.id,
+            "b_updated_at": row.updated_at,
+            **{f"b_{c}": rotate_text(getattr(row, c), fernet) for c in ENCRYPTED_COLUMNS},
+        }
+        for row in rows
+    ]
+
+
+def run_key_rotation(job_id, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS, on_batch=None):
+    """Run (or resume) a rotation job to completion. Must be called inside an app context."""
+    job = db.session.get(KeyRotationJob, job_id)
+    if not job or job.status == "completed":
+        return job
+    if job.key_id != key_id():
+        raise RuntimeError(f"Job {job.id} targets key {job.key_id}, but ENCRYPTION_KEY is {key_id()}")
+
+    table = MedicalRecord.__table__
+    fernet = get_fernet()  # captured here; worker threads have no app context
+    write = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.updated_at.is_not_distinct_from(bindparam("b_updated_at")))
+        .values(updated_at=bindparam("b_updated_at"), **{c: bindparam(f"b_{c}") for c in ENCRYPTED_COLUMNS})
+    )
+
+    job.status = "running"
+    job.error = None
+    db.session.commit()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="key-rotation") as pool:
+            while True:
+                rows = db.session.execute(
+                    select(table.c.id, table.c.updated_at, *(table.c[c] for c in ENCRYPTED_COLUMNS))
+                    .where(table.c.id > job.last_id)
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+
+                size = -(-len(rows) // workers)
+                chunks = [rows[i:i + size] for i in range(0, len(rows), size)]
+                params = [p for part in pool.map(partial(_rotate_chunk, fernet=fernet), chunks) for p in part]
+
+                db.session.execute(write, params)
+                job.last_id = rows[-1].id
+                job.rows_rotated += len(rows)
+                db.session.commit()  # batch and checkpoint land together
+                if on_batch:
+                    on_batch(job)
+
+        job.status = "completed"
+        job.completed_at = utc_now()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(KeyRotationJob, job_id)
+        job.status = "failed"
+        job.error = str(e)
+        db.session.commit()
+        print(f"Key rotation job {job_id} failed: {e}")
+        traceback.print_exc()
+    return job
@@ -0,0 +1,229 @@
+"""Vectorized analytics over lab result series (lab_result_values).
+
+A patient's values are read in one query ordered by (analyte, measured_at) and split into
+NumPy arrays per analyte. Everything else is array arithmetic:
+
+* reference-range flags (L / N / H) against each value's own range;
+* delta checks: change from the previous value, flagged when it exceeds `delta_percent`;
+* rolling mean / sample std over the last `window` values (cumulative sums, no Python loop);
+* population percentile bands of an analyte across a hospital.
+
+Patient results are cached per (patient, hospital scope, parameters). `lab.update_test`
+invalidates a patient's entries when it writes values; each entry also records the
+count and highest id of the patient's values, so a worker that missed the invalidation
+recomputes instead of serving a stale series.
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+from app.models import LabResultValue
+
+DEFAULT_WINDOW = 5
+DEFAULT_DELTA_PERCENT = 25.0
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def load_patient_series(session, patient_id, analytes=None):
+    """{analyte: {"measured_at", "value", "ref_low", "ref_high", "test_id" arrays, "unit"}} for a patient."""
+    stmt = (
+        select(LabResultValue.analyte, LabResultValue.measured_at, LabResultValue.value,
+               LabResultValue.ref_low, LabResultValue.ref_high, LabResultValue.test_request_id,
+               LabResultValue.unit)
+        .where(LabResultValue.patient_id == patient_id)
+        .order_by(LabResultValue.analyte, LabResultValue.measured_at)
+    )
+    if analytes:
+        stmt = stmt.where(LabResultValue.analyte.in_(analytes))
+    rows = session.execute(stmt).all()
+    if not rows:
+        return {}
+
+    analyte, measured_at, value, ref_low, ref_high, test_id, unit = zip(*rows)
+    analyte = np.array(analyte, dtype=object)
+    columns = {
+        "measured_at": np.array(measured_at, dtype="datetime64[us]"),
+        "value": np.array(value, dtype=float),
+        "ref_low": np.array(ref_low, dtype=float),   # None -> nan
+        "ref_high": np.array(ref_high, dtype=float),
+        "test_id": np.array(test_id, dtype=np.int64),
+    }
+    units = np.array(unit, dtype=object)
+
+    # Rows are sorted by analyte, so each analyte is one contiguous slice
+    starts = np.concatenate(([0], np.flatnonzero(analyte[1:] != analyte[:-1]) + 1))
+    ends = np.append(starts[1:], len(analyte))
+    return {
+        analyte[start]: {**{k: col[start:end] for k, col in columns.items()}, "unit": units[end - 1]}
+        for start, end in zip(starts, ends)
+    }
+
+
+def range_flags(value, ref_low, ref_high):
+    """L / H outside each value's reference range, N inside, None where it has no range."""
+    flags = np.full(value.shape, None, dtype=object)
+    flags[~(np.isnan(ref_low) & np.isnan(ref_high))] = "N"
+    flags[value < ref_low] = "L"  # comparisons with nan are False
+    flags[value > ref_high] = "H"
+    return flags
+
+
+def deltas(value, delta_percent):
+    """Change from the previous value, as absolute and percent, and whether it fails the delta check."""
+    delta = np.full(value.shape, np.nan)
+    delta[1:] = np.diff(value)
+    previous = np.full(value.shape, np.nan)
+    previous[1:] = value[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(previous != 0, delta / np.abs(previous) * 100, np.nan)
+    return delta, percent, np.abs(percent) > delta_percent
+
+
+def rolling_stats(value, window):
+    """Mean and sample std of each value with up to `window - 1` values before it."""
+    n = len(value)
+    idx = np.arange(n)
+    start = np.maximum(idx - window + 1, 0)
+    count = idx - start + 1
+    s1 = np.concatenate(([0.0], np.cumsum(value)))
+    s2 = np.concatenate(([0.0], np.cumsum(value * value)))
+    total = s1[idx + 1] - s1[start]
+    total_sq = s2[idx + 1] - s2[start]
+    mean = total / count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.where(count > 1, (total_sq - total * mean) / (count - 1), np.nan)
+    return mean, np.sqrt(np.maximum(var, 0))
+
+
+def _json(values, digits=4):
+    """Array -> list with nan as None."""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), None, np.round(values, digits)).tolist()
+
+
+def analyze_series(series, window=DEFAULT_WINDOW, delta_percent=DEFAULT_DELTA_PERCENT):
+    value = series["value"]
+    flags = range_flags(value, series["ref_low"], series["ref_high"])
+    delta, percent, delta_check = deltas(value, delta_percent)
+    mean, std = rolling_stats(value, window)
+    hours = np.full(value.shape, np.nan)
+    hours[1:] = np.diff(series["measured_at"]).astype("timedelta64[s]").astype(float) / 3600
+
+    abnormal = (flags == "L") | (flags == "H")
+    points = [
+        {
+            "measured_at": m, "test_id": t, "value": v, "flag": f, "delta": d, "delta_percent": p,
+            "delta_check": c, "hours_since_previous": h, "rolling_mean": rm, "rolling_std": rs,
+        }
+        for m, t, v, f, d, p, c, h, rm, rs in zip(
+            np.datetime_as_string(series["measured_at"], unit="s").tolist(), series["test_id"].tolist(),
+            _json(value), flags.tolist(), _json(delta), _json(percent, 2), delta_check.tolist(),
+            _json(hours, 2), _json(mean), _json(std),
+        )
+    ]
+    return {
+        "unit": series["unit"],
+        "count": int(value.size),
+        "min": float(value.min()),
+        "max": float(value.max()),
+        "mean": round(float(value.mean()), 4),
+        "abnormal_count": int(abnormal.sum()),
+        "delta_check_count": int(delta_check.sum()),
+        "latest": points[-1],
+        "points": points,
+    }
+
+
+def patient_analytics(session, patient_id, analytes=None, window=DEFAULT_WINDOW, delta_percent=DEFAULT_DELTA_PERCENT):
+    series = load_patient_series(session, patient_id, analytes)
+    return {name: analyze_series(s, window, delta_percent) for name, s in series.items()}
+
+
+def population_bands(session, analyte, hospital_id=None, since=None, percentiles=PERCENTILES):
+    """Percentiles, mean/std and flag counts of one analyte across a hospital (all hospitals for None)."""
+    stmt = (
+        select(LabResultValue.value, LabResultValue.flag, LabResultValue.patient_id)
+        .where(LabResultValue.analyte == analyte)
+    )
+    if hospital_id is not None:
+        stmt = stmt.where(LabResultValue.hospital_id == hospital_id)
+    if since is not None:
+        stmt = stmt.where(LabResultValue.measured_at >= since)
+    rows = session.execute(stmt).all()
+    if not rows:
+        return {"analyte": analyte, "count": 0}
+
+    value, flag, patient_id = zip(*rows)
+    value = np.array(value, dtype=float)
+    flags, counts = np.unique(np.array([f or "none" for f in flag]), return_counts=True)
+    return {
+        "analyte": analyte,
+        "count": int(value.size),
+        "patients": int(np.unique(np.array(patient_id)).size),
+        "mean": round(float(value.mean()), 4),
+        "std": round(float(value.std(ddof=1)), 4) if value.size > 1 else None,
+        "min": float(value.min()),
+        "max": float(value.max()),
+        "percentiles": {f"p{p}": round(float(b), 4) for p, b in zip(percentiles, np.percentile(value, percentiles))},
+        "flags": dict(zip(flags.tolist(), counts.tolist())),
+    }
+
+
+class LabAnalyticsCache:
+    """LRU of patient analytics, keyed by patient and validated against the patient's value version."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (patient_id, scope, params) -> (version, result)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, result):
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, patient_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == patient_id]:
+                del self._entries[key]
+
+
+def _cache():
+    return current_app.extensions.setdefault(
+        "lab_analytics_cache", LabAnalyticsCache(current_app.config["LAB_ANALYTICS_CACHE_SIZE"])
+    )
+
+
+def series_version(session, patient_id):
+    """Changes whenever the patient's values are added or replaced (one index-only read)."""
+    count, last_id = session.execute(
+        select(func.count(), func.max(LabResultValue.id)).where(LabResultValue.patient_id == patient_id)
+    ).one()
+    return count, last_id
+
+
+def cached_patient_analytics(session, patient_id, scope, analytes=None, window=DEFAULT_WINDOW,
+                             delta_percent=DEFAULT_DELTA_PERCENT):
+    """patient_analytics() through the per-patient cache; `scope` is the caller's hospital (or None)."""
+    key = (patient_id, scope, tuple(sorted(analytes or ())), window, delta_percent)
+    version = series_version(session, patient_id)
+    result = _cache().get(key, version)
+    if result is None:
+        result = patient_analytics(session, patient_id, analytes, window, delta_percent)
+        _cache().put(key, version, result)
+    return result
+
+
+def invalidate_patient(patient_id):
+    _cache().invalidate(patient_id)
@@ -0,0 +1,143 @@
+"""Structured lab result values.
+
+`lab.update_test` stores one LabResultValue per measured analyte next to the free-text
+results, so a patient's trend for an analyte is a single range scan on
+(patient_id, analyte, measured_at). Technicians send the values as a list:
+
+    {"values": [{"analyte": "HGB", "value": 13.2, "unit": "g/dL", "ref_low": 12, "ref_high": 16}]}
+
+Clients that only send text still get values for lines shaped like
+``HGB: 13.2 g/dL (12-16)`` or ``WBC: 6.1 10^9/L`` whose code is in KNOWN_ANALYTES; other
+lines (dates, notes, unknown codes) are left to the text.
+"""
+import math
+import re
+from datetime import datetime, timedelta
+from app.models import LabResultValue
+
+ANALYTE_RE = re.compile(r"^[A-Z0-9][A-Z0-9_.\-]{0,31}$")
+NUMBER = r"-?\d+(?:\.\d+)?"
+# A unit starts with a letter or symbol (g/dL, %, x10^9/L) or a power of ten (10^9/L), never a
+# bare digit or '-', so the rest of a date or a number range is not taken for one
+UNIT = r"(?:\d+\^\d+)?[^\s()\[\]\d\-][^\s()\[\]]{0,19}"
+RESULT_LINE_RE = re.compile(
+    rf"^\s*(?P<analyte>[A-Za-z0-9][\w.\-]{{0,31}})\s*[:=]\s*(?P<value>{NUMBER})\s*"
+    rf"(?P<unit>{UNIT})?\s*"
+    rf"(?:[(\[]\s*(?P<low>{NUMBER})\s*-\s*(?P<high>{NUMBER})\s*[)\]])?\s*$"
+)
+
+
+# Codes the free-text fallback recognizes; explicit "values" accept any well-formed code
+KNOWN_ANALYTES = frozenset({
+    # Full blood count
+    "HGB", "HB", "HCT", "RBC", "WBC", "PLT", "MCV", "MCH", "MCHC", "RDW", "MPV",
+    "NEUT", "LYMPH", "MONO", "EOS", "BASO", "ESR", "RETIC",
+    # Chemistry
+    "GLU", "FBS", "RBS", "HBA1C", "NA", "K", "CL", "HCO3", "CO2", "BUN", "UREA", "CREAT", "EGFR",
+    "CA", "MG", "PHOS", "URIC", "ALT", "AST", "ALP", "GGT", "TBIL", "DBIL", "ALB", "TP", "LDH", "CK",
+    "AMYLASE", "LIPASE", "CRP", "TROP", "BNP", "FERRITIN", "IRON", "TIBC", "B12", "FOLATE", "VITD",
+    # Lipids, thyroid, coagulation, other
+    "CHOL", "LDL", "HDL", "TG", "TSH", "FT3", "FT4", "T3", "T4", "INR", "PT", "APTT", "PSA", "HCG",
+})
+
+
+class LabValueError(ValueError):
+    pass
+
+
+def normalize_analyte(code):
+    analyte = str(code or "").strip().upper()
+    if not ANALYTE_RE.match(analyte):
+        raise LabValueError(f"Invalid analyte code {code!r}: use up to 32 letters, digits, '.', '_' or '-'")
+    return analyte
+
+
+def _number(item, key, analyte, required=False):
+    value = item.get(key)
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise LabValueError(f"{analyte}: {key} must be a number")
+    return float(value)
+
+
+def flag_for(value, ref_low, ref_high):
+    """L / H outside the reference range, N inside it, None without a range."""
+    if ref_low is None and ref_high is None:
+        return None
+    if ref_low is not None and value < ref_low:
+        return "L"
+    if ref_high is not None and value > ref_high:
+        return "H"
+    return "N"
+
+
+def parse_result_lines(text):
+    """Values from ``CODE: value [unit] [(low-high)]`` lines of free-text results, known codes only."""
+    items, seen = [], set()
+    for line in (text or "").splitlines():
+        m = RESULT_LINE_RE.match(line)
+        if not m:
+            continue
+        analyte = m["analyte"].upper()
+        if analyte not in KNOWN_ANALYTES or analyte in seen:
+            continue
+        low, high = (float(m["low"]), float(m["high"])) if m["low"] else (None, None)
+        if low is not None and low > high:
+            low = high = None  # not a reference range; keep the value
+        seen.add(analyte)
+        items.append({
+            "analyte": analyte,
+            "value": float(m["value"]),
+            "unit": m["unit"],
+            "ref_low": low,
+            "ref_high": high,
+        })
+    return items
+
+
+def build_result_values(test, items, measured_at):
+    """LabResultValue rows for `test` from request items; raises LabValueError on bad input."""
+    values, seen = [], set()
+    for item in items:
+        if not isinstance(item, dict):
+            raise LabValueError("Each value must be an object with analyte and value")
+        analyte = normalize_analyte(item.get("analyte"))
+        if analyte in seen:
+            raise LabValueError(f"Duplicate analyte {analyte}")
+        seen.add(analyte)
+
+        value = _number(item, "value", analyte, required=True)
+        ref_low, ref_high = _number(item, "ref_low", analyte), _number(item, "ref_high", analyte)
+        if ref_low is not None and ref_high is not None and ref_low > ref_high:
+            raise LabValueError(f"{analyte}: ref_low is above ref_high")
+        unit = item.get("unit")
+        if unit is not None and (not isinstance(unit, str) or len(unit.strip()) > 20):
+            raise LabValueError(f"{analyte}: unit must be text of at most 20 characters")
+
+        values.append(LabResultValue(
+            test_request_id=test.id,
+            hospital_id=test.hospital_id,
+            patient_id=test.patient_id,
+            analyte=analyte,
+            value=value,
+            unit=unit.strip() if unit else None,
+            ref_low=ref_low,
+            ref_high=ref_high,
+            flag=flag_for(value, ref_low, ref_high),
+            measured_at=measured_at,
+        ))
+    return values
+
+
+def apply_trend_window(stmt, args):
+    """Restrict to ?from=&to= (ISO dates; a bare `to` date includes that day). Raises ValueError."""
+    if args.get("from"):
+        stmt = stmt.where(LabResultValue.measured_at >= datetime.fromisoformat(args["from"]))
+    if args.get("to"):
+        end = datetime.fromisoformat(args["to"])
+        if len(args["to"]) == 10:
+            stmt = stmt.where(LabResultValue.measured_at < end + timedelta(days=1))
+        else:
+            stmt = stmt.where(LabResultValue.measured_at <= end)
+    return stmt
@@ -0,0 +1,55 @@
+"""Transactional email outbox.
+
+`enqueue_email` adds a row to the caller's session, so the email is only queued if the
+surrounding transaction commits. `drain_outbox` sends due rows and reschedules failures
+with exponential backoff until `max_attempts`, after which they are marked failed.
+"""
+import traceback
+from datetime import timedelta
+from sqlalchemy import select
+from app.db import db
+from app.models import EmailOutbox
+from app.utils.email_utils import send_email
+from app.utils.email_transport import EmailTransportError
+from app.utils.time import utc_now
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = timedelta(minutes=1)
+
+
+def enqueue_email(to_email, subject, html_content):
+    email = EmailOutbox(to_email=to_email, subject=subject, html_content=html_content)
+    db.session.add(email)
+    return email
+
+
+def drain_outbox(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Send up to `batch_size` due emails. Returns (sent, failed). Must be called inside an app context."""
+    due = db.session.scalars(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= utc_now())
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # several drainers never pick the same row
+    ).all()
+
+    sent = failed = 0
+    for email in due:
+        email.attempts += 1
+        try:
+            # Provider errors raise; a False result (e.g. no API key, printed only) is not a delivery either
+            if not send_email(email.to_email, email.subject, email.html_content, raise_errors=True):
+                raise EmailTransportError("Email was not accepted by a provider")
+            email.status = "sent"
+            email.sent_at = utc_now()
+            sent += 1
+        except Exception as e:
+            email.last_error = str(e)
+            if email.attempts >= max_attempts:
+                email.status = "failed"
+            else:
+                email.next_attempt_at = utc_now() + BASE_BACKOFF * 2 ** (email.attempts - 1)
+            failed += 1
+            traceback.print_exc()
+    db.session.commit()
+    return sent, failed
@@ -0,0 +1,190 @@
+"""Live feed of unclaimed prescriptions for pharmacies.
+
+The create, claim, cancel and delete routes publish an event after they commit:
+
+* ``created``  — a new unclaimed prescription (its summary row);
+* ``claimed``  — a pharmacy claimed it, drop it from the unclaimed list;
+* ``removed``  — it was deleted or cancelled before anyone claimed it.
+
+Events go through a fan-out to every worker's PrescriptionFeed, an in-memory ring buffer
+that the stream (SSE) and long-poll endpoints read from. Readers hold a cursor
+("<epoch>-<seq>"); the epoch changes when a worker restarts, and a cursor from another epoch
+or older than the buffer is stale, so the client reloads the unclaimed list.
+
+PRESCRIPTION_FEED_FANOUT picks the fan-out: ``local`` (default) delivers to this process
+only, which is enough for a single worker and for development; ``postgres`` sends events
+with NOTIFY and every worker LISTENs, so pharmacists see them whichever worker they hit.
+Events are scoped to the prescription's hospital like the tenant filter.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from flask import current_app
+from sqlalchemy import text
+
+FEED_CHANNEL = "prescription_feed"
+EVENT_TYPES = ("created", "claimed", "removed")
+
+
+class StaleCursor(ValueError):
+    pass
+
+
+class PrescriptionFeed:
+    def __init__(self, buffer_size=500):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=buffer_size)  # (seq, type, hospital_id, data as JSON)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._async_waiters = set()  # (loop, asyncio.Event)
+
+    def cursor(self, seq=None):
+        return f"{self.epoch}-{self._seq if seq is None else seq}"
+
+    def deliver(self, event):
+        """Append an event (as published) and wake every waiting reader."""
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event["type"], event.get("hospital_id"), event["data"]))
+            self._cond.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, flag in waiters:
+            loop.call_soon_threadsafe(flag.set)
+
+    def read(self, cursor, hospital_id=None):
+        """Events after `cursor` visible to `hospital_id` (None sees all) and the cursor after them."""
+        epoch, _, seq = (cursor or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            raise StaleCursor(cursor)
+        since = int(seq)
+        with self._cond:
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            if since > self._seq or since < oldest - 1:
+                raise StaleCursor(cursor)
+            events = [
+                e for e in self._events
+                if e[0] > since and (hospital_id is None or e[2] == hospital_id)
+            ]
+            return events, self.cursor()
+
+    def wait(self, cursor, hospital_id=None, timeout=25.0):
+        """Like read(), blocking up to `timeout` seconds until there is something to return."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events, cursor = self.read(cursor, hospital_id)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events, cursor
+                self._cond.wait(remaining)
+
+    async def wait_async(self, cursor, hospital_id=None, timeout=25.0):
+        """wait() for the event loop: parks the coroutine instead of a thread."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            flag = asyncio.Event()
+            waiter = (loop, flag)
+            with self._cond:
+                self._async_waiters.add(waiter)
+            try:
+                events, cursor = self.read(cursor, hospital_id)
+                remaining = deadline - loop.time()
+                if events or remaining <= 0:
+                    return events, cursor
+                try:
+                    await asyncio.wait_for(flag.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._cond:
+                    self._async_waiters.discard(waiter)
+
+
+class LocalFanout:
+    """Delivers to this process only: the stand-in for a cross-worker fan-out."""
+
+    def __init__(self, feed):
+        self.feed = feed
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.feed.deliver(event)
+
+
+class PostgresFanout:
+    """NOTIFY on publish; a listener thread in each worker delivers to its own feed."""
+
+    def __init__(self, feed, engine, reconnect_seconds=5):
+        self.feed = feed
+        self.engine = engine
+        self.reconnect_seconds = reconnect_seconds
+        self._thread = None
+
+    def publish(self, event):
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": FEED_CHANNEL, "payload": json.dumps(event)})
+
+    def listen_forever(self):
+        import psycopg
+        url = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            try:
+                with psycopg.connect(url, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {FEED_CHANNEL}")
+                    for notify in conn.notifies():
+                        self.feed.deliver(json.loads(notify.payload))
+            except Exception as e:
+                print(f"Prescription feed listener failed: {e}")
+            time.sleep(self.reconnect_seconds)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.listen_forever, name="prescription-feed", daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+def init_prescription_feed(app, engine):
+    feed = PrescriptionFeed(app.config["PRESCRIPTION_FEED_BUFFER"])
+    if app.config["PRESCRIPTION_FEED_FANOUT"] == "postgres":
+        fanout = PostgresFanout(feed, engine)
+    else:
+        fanout = LocalFanout(feed)
+    fanout.start()
+    app.extensions["prescription_feed"] = feed
+    app.extensions["prescription_feed_fanout"] = fanout
+    return feed
+
+
+def publish_prescription_event(event_type, prescription, data=None):
+    """Announce a committed change to an unclaimed prescription. Never fails the request."""
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown prescription event {event_type!r}")
+    fanout = current_app.extensions.get("prescription_feed_fanout")
+    if fanout is None:
+        return
+    event = {
+        "type": event_type,
+        "hospital_id": prescription.hospital_id,
+        "data": current_app.json.dumps(data if data is not None else {"id": prescription.id}),
+    }
+    try:
+        fanout.publish(event)
+    except Exception as e:
+        print(f"Failed to publish prescription {event_type} event: {e}")
+
+
+def sse_message(event_type, data, event_id=None):
+    """One Server-Sent Events message; `data` is already JSON."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
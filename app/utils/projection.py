@@ -0,0 +1,44 @@
+"""Field projection for list endpoints (?fields= / ?detail=).
+
+The large free-text columns (prescription medication details, lab results, record notes,
+technician notes) are deferred on their models, so a plain query never reads them. List
+endpoints describe their output as an ordered {field: getter} map and return a summary
+subset by default:
+
+    ?fields=id,status,results   only these fields (id is always included)
+    ?detail=true                every field, deferred text included
+
+Deferred columns are undeferred in the same query when a requested field needs them, so
+asking for them does not turn into one extra SELECT per row.
+"""
+from sqlalchemy.orm import undefer
+
+
+class FieldError(ValueError):
+    pass
+
+
+def requested_fields(args, getters, summary):
+    """Names of the fields to return for a request's query args (a dict-like with .get)."""
+    if str(args.get("detail", "")).lower() in ("1", "true", "yes"):
+        return set(getters)
+
+    raw = args.get("fields")
+    if not raw:
+        return set(summary)
+
+    fields = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = fields - set(getters)
+    if unknown:
+        raise FieldError(f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(getters)}")
+    return fields | {"id"}
+
+
+def undefer_options(fields, deferred):
+    """Loader options undeferring the columns behind the requested fields ({field: column attribute})."""
+    return [undefer(column) for name, column in deferred.items() if name in fields]
+
+
+def project(obj, fields, getters):
+    """Serialize `obj` with only the requested getters, in the order they are declared."""
+    return {name: getter(obj) for name, getter in getters.items() if name in fields}
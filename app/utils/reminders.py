@@ -0,0 +1,269 @@
+"""In-process appointment reminder scheduler.
+
+Only one worker schedules at a time: the one holding a Postgres advisory lock (taken on a
+dedicated connection, so it is released if the process dies). The leader keeps upcoming
+accepted appointments in a heap ordered by reminder time:
+
+* the look-ahead window (longest offset plus a day) is loaded with indexed range reads on
+  (status, date), one new day at a time as it advances;
+* appointments created or changed since the last tick are picked up through
+  appointments.updated_at, so the table is never scanned;
+* heap entries are invalidated lazily: an entry fires only if the appointment is still
+  scheduled at the time it was pushed with, and it is re-checked against the database.
+
+Every reminder sent is recorded in appointment_reminders with the slot it was sent for, so a
+restart or a leader change never sends one twice, while a rescheduled appointment still gets
+reminders for its new slot. Reminder emails go through the outbox (app/utils/outbox.py).
+"""
+import heapq
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, func, text
+from sqlalchemy.orm import aliased
+from app.db import db
+from app.models import Appointment, AppointmentReminder, Notification, Patient, Doctor, User
+from app.utils.outbox import enqueue_email, drain_outbox
+
+ADVISORY_LOCK_KEY = 7305120311  # arbitrary, shared by every worker of this app
+WATERMARK_OVERLAP = timedelta(minutes=1)  # re-read recent changes in case of late commits
+
+
+def parse_offsets(value):
+    """'1440,120' -> (1440, 120): reminder offsets in minutes, longest first."""
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    return tuple(sorted({int(v) for v in value}, reverse=True))
+
+
+class ReminderScheduler:
+    def __init__(self, app, offsets=None, poll_seconds=None, batch_size=500):
+        self.app = app
+        self.offsets = parse_offsets(offsets or app.config["REMINDER_OFFSETS_MINUTES"])
+        self.poll_seconds = poll_seconds or app.config["REMINDER_POLL_SECONDS"]
+        self.tz = ZoneInfo(app.config["APPOINTMENT_TIMEZONE"])
+        self.batch_size = batch_size
+        self.horizon = timedelta(minutes=self.offsets[0], days=1)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_conn = None
+        self._reset()
+
+    def _reset(self):
+        self._heap = []        # (fire_at, appointment_id, offset, slot)
+        self._slots = {}       # appointment_id -> (date, time) its heap entries were pushed for
+        self._loaded_until = None
+        self._watermark = None
+
+    # Leadership
+
+    def _acquire_leadership(self):
+        if db.engine.dialect.name != "postgresql":
+            return True  # single-process development database
+        conn = db.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        if conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+            self._lock_conn = conn
+            return True
+        conn.close()
+        return False
+
+    def _still_leader(self):
+        if self._lock_conn is None:
+            return db.engine.dialect.name != "postgresql"
+        try:
+            self._lock_conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            self._release_leadership()
+            return False
+
+    def _release_leadership(self):
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.close()  # closing the session releases the advisory lock
+            except Exception:
+                pass
+        self._lock_conn = None
+
+    # Heap maintenance
+
+    def appointment_at(self, day, at):
+        return datetime.combine(day, at, tzinfo=self.tz).astimezone(timezone.utc)
+
+    def _track(self, appointment_id, day, at, status, now):
+        slot = (day, at)
+        if status != "accepted" or day is None or at is None:
+            self._slots.pop(appointment_id, None)
+            return
+        if self._slots.get(appointment_id) == slot:
+            return
+        starts = self.appointment_at(day, at)
+        if starts <= now:
+            self._slots.pop(appointment_id, None)
+            return
+        self._slots[appointment_id] = slot
+        for offset in self.offsets:
+            heapq.heappush(self._heap, (starts - timedelta(minutes=offset), appointment_id, offset, slot))
+
+    def _load_window(self, now):
+        """Load accepted appointments for the dates that entered the look-ahead window."""
+        end = (now + self.horizon).astimezone(self.tz).date()
+        start = self._loaded_until + timedelta(days=1) if self._loaded_until else now.astimezone(self.tz).date()
+        if start > end:
+            return 0
+        rows = db.session.execute(
+            select(Appointment.id, Appointment.date, Appointment.time, Appointment.status)
+            .where(Appointment.status == "accepted", Appointment.date.between(start, end))
+            .execution_options(yield_per=self.batch_size)
+        )
+        count = 0
+        for row in rows:
+            self._track(row.id, row.date, row.time, row.status, now)
+            count += 1
+        self._loaded_until = end
+        return count
+
+    def _refresh_changes(self, now):
+        """Apply appointments created or updated since the last tick."""
+        rows = db.session.execute(
+            select(Appointment.id, Appointment.date, Appointment.time, Appointment.status, Appointment.updated_at)
+            .where(Appointment.updated_at > self._watermark - WATERMARK_OVERLAP)
+            .order_by(Appointment.updated_at)
+        ).all()
+        today = now.astimezone(self.tz).date()
+        for row in rows:
+            if row.date is None or today <= row.date <= self._loaded_until:
+                self._track(row.id, row.date, row.time, row.status, now)
+            self._watermark = max(self._watermark, row.updated_at)
+        return len(rows)
+
+    # Firing
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, appointment_id, offset, slot = heapq.heappop(self._heap)
+            if self._slots.get(appointment_id) != slot:
+                continue  # rescheduled or no longer accepted
+            if offset == self.offsets[-1]:
+                self._slots.pop(appointment_id, None)  # last reminder for this slot
+            starts = fire_at + timedelta(minutes=offset)
+            # When catching up, skip a reminder that a shorter offset already supersedes
+            if any(o < offset and starts - timedelta(minutes=o) <= now for o in self.offsets):
+                continue
+            due.append((appointment_id, offset, slot))
+        return due
+
+    def _fire(self, due):
+        if not due:
+            return 0
+        patient_user, doctor_user = aliased(User), aliased(User)
+        rows = {
+            row.id: row for row in db.session.execute(
+                select(
+                    Appointment.id, Appointment.date, Appointment.time, Appointment.status,
+                    patient_user.id.label("patient_user_id"), patient_user.email.label("patient_email"),
+                    doctor_user.name.label("doctor_name"),
+                )
+                .join(Patient, Patient.id == Appointment.patient_id)
+                .join(patient_user, patient_user.id == Patient.user_id)
+                .join(Doctor, Doctor.id == Appointment.doctor_id)
+                .join(doctor_user, doctor_user.id == Doctor.user_id)
+                .where(Appointment.id.in_({d[0] for d in due}))
+            )
+        }
+        already_sent = {
+            (row.appointment_id, row.offset_minutes, (row.appointment_date, row.appointment_time))
+            for row in db.session.execute(
+                select(
+                    AppointmentReminder.appointment_id, AppointmentReminder.offset_minutes,
+                    AppointmentReminder.appointment_date, AppointmentReminder.appointment_time,
+                ).where(AppointmentReminder.appointment_id.in_({d[0] for d in due}))
+            )
+        }
+
+        fired = 0
+        for appointment_id, offset, slot in due:
+            row = rows.get(appointment_id)
+            if not row or row.status != "accepted" or (row.date, row.time) != slot:
+                continue
+            if (appointment_id, offset, slot) in already_sent:
+                continue
+            when = f"{row.date:%A %d %B} at {row.time:%H:%M}"
+            db.session.add(AppointmentReminder(
+                appointment_id=appointment_id, offset_minutes=offset,
+                appointment_date=row.date, appointment_time=row.time,
+            ))
+            db.session.add(Notification(
+                user_id=row.patient_user_id,
+                message=f"Reminder: your appointment with Dr. {row.doctor_name} is on {when}.",
+            ))
+            enqueue_email(
+                row.patient_email,
+                "Appointment reminder",
+                f"""
+                    <h2>Appointment reminder</h2>
+                    <p>Your appointment with Dr. {row.doctor_name} is on <strong>{when}</strong>.</p>
+                    <p>If you can no longer attend, please cancel it so the slot can be offered to another patient.</p>
+                """,
+            )
+            fired += 1
+        db.session.commit()
+        return fired
+
+    # Loop
+
+    def tick(self, now=None):
+        """One scheduling pass. Must be called inside an app context by the leader."""
+        now = now or datetime.now(timezone.utc)
+        if self._watermark is None:
+            # Taken before the window load so changes made during it are picked up next tick
+            self._watermark = db.session.scalar(select(func.max(Appointment.updated_at))) or datetime(1970, 1, 1)
+        self._load_window(now)
+        self._refresh_changes(now)
+        fired = self._fire(self._pop_due(now))
+        drain_outbox()
+        return fired
+
+    def _sleep_seconds(self):
+        if not self._heap:
+            return self.poll_seconds
+        until_next = (self._heap[0][0] - datetime.now(timezone.utc)).total_seconds()
+        return max(1.0, min(self.poll_seconds, until_next))
+
+    def run_forever(self):
+        leader = False
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    if leader and not self._still_leader():
+                        print("Reminder scheduler lost leadership")
+                        leader = False
+                    if not leader:
+                        leader = self._acquire_leadership()
+                        if leader:
+                            print("Reminder scheduler is the leader")
+                            self._reset()
+                    if leader:
+                        self.tick()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Reminder scheduler tick failed: {e}")
+                    traceback.print_exc()
+                finally:
+                    db.session.remove()
+            self._stop.wait(self._sleep_seconds() if leader else self.poll_seconds)
+        self._release_leadership()
+
+    def start(self):
+        """Run the scheduler on a daemon thread."""
+        self._thread = threading.Thread(target=self.run_forever, name="appointment-reminders", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
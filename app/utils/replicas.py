@@ -0,0 +1,112 @@
+"""Read-replica routing.
+
+Replicas are SQLAlchemy binds named replica_0, replica_1, ... (DATABASE_REPLICA_URLS). The
+session (app.db.RoutingSession) asks the router for a bind on every statement, and a
+statement goes to a replica only when:
+
+* it runs inside a GET/HEAD request whose view is not marked @use_primary;
+* it is a plain SELECT (not SELECT ... FOR UPDATE);
+* the session has not written yet. After its first flush or DML statement every later
+  statement, reads included, stays on the primary, so a request always reads its own writes;
+* a replica is healthy. Lag is probed at most every REPLICA_CHECK_SECONDS per replica, and
+  one that is unreachable or more than REPLICA_MAX_LAG_SECONDS behind is skipped.
+
+Replicas are used round robin. With none healthy, and outside requests (CLI commands,
+background jobs, the reminder scheduler), everything goes to the primary.
+"""
+import itertools
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import text
+
+REPLICA_BIND_PREFIX = "replica_"
+READ_METHODS = {"GET", "HEAD"}
+
+
+def use_primary(fn):
+    """Keep a read-only view on the primary, e.g. a page that must show a write made just before."""
+    fn.use_primary = True
+    return fn
+
+
+def reads_may_use_replica():
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    if g.get("use_primary"):
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return not getattr(view, "use_primary", False)
+
+
+def replica_lag(connection):
+    """Seconds a replica is behind its primary, 0 when caught up. Other dialects than Postgres report 0."""
+    if connection.dialect.name != "postgresql":
+        return 0.0
+    # An idle primary sends no new transactions, so compare WAL positions before the replay timestamp
+    return connection.execute(text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )).scalar()
+
+
+class ReplicaRouter:
+    def __init__(self, bind_keys, max_lag=5.0, check_interval=10.0, lag_probe=replica_lag):
+        self.bind_keys = list(bind_keys)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._health = {}  # bind key -> (checked_at, healthy)
+        self._cycle = itertools.cycle(self.bind_keys)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_app(cls, app):
+        binds = app.config.get("SQLALCHEMY_BINDS") or {}
+        return cls(
+            sorted(key for key in binds if key.startswith(REPLICA_BIND_PREFIX)),
+            max_lag=app.config["REPLICA_MAX_LAG_SECONDS"],
+            check_interval=app.config["REPLICA_CHECK_SECONDS"],
+        )
+
+    def healthy(self, key, engine):
+        now = time.monotonic()
+        checked = self._health.get(key)
+        if checked and now - checked[0] < self.check_interval:
+            return checked[1]
+
+        try:
+            with engine.connect() as conn:
+                lag = float(self.lag_probe(conn))
+            ok = lag <= self.max_lag
+            if not ok:
+                print(f"Replica {key} is {lag:.1f}s behind; reading from the primary")
+        except Exception as e:
+            ok = False
+            print(f"Replica {key} unavailable: {e}")
+        self._health[key] = (now, ok)
+        return ok
+
+    def route(self, session, clause):
+        """Bind key of the replica to run `clause` on, or None for the primary."""
+        if session.info.get("wrote"):
+            return None
+        if clause is None or not getattr(clause, "is_select", False) or clause._for_update_arg is not None:
+            session.info["wrote"] = True  # flush, DML or raw SQL: stay on the primary from now on
+            return None
+        if not reads_may_use_replica():
+            return None
+        return self.pick(session._db.engines)
+
+    def pick(self, engines):
+        """Bind key of the next healthy replica, or None to use the primary."""
+        for _ in self.bind_keys:
+            with self._lock:
+                key = next(self._cycle)
+            if self.healthy(key, engines[key]):
+                return key
+        return None
+
+    def reset(self):
+        """Forget cached health so the next read probes every replica again."""
+        self._health.clear()
@@ -0,0 +1,49 @@
+from sqlalchemy import select, union_all, literal
+from app.db import db
+from app.models import User, Doctor, Technician, Pharmacy
+
+# roster role -> staff model, in the order the roster lists them
+STAFF_ROLES = {
+    "doctor": Doctor,
+    "labtech": Technician,
+    "pharmacist": Pharmacy,
+}
+
+ROLE_ALIASES = {"technician": "labtech", "pharmacy": "pharmacist"}
+
+
+def normalize_role(role):
+    """Map a ?role= filter onto a roster role; returns None for unknown roles."""
+    if not role:
+        return None
+    role = ROLE_ALIASES.get(role.lower(), role.lower())
+    return role if role in STAFF_ROLES else None
+
+
+def staff_roster(hospital_id, role=None, limit=None, offset=0):
+    """
+    Whole staff roster of a hospital (or one role) in a single query:
+    UNION ALL over doctors/technicians/pharmacies joined once to users for name and email.
+    Returns rows with id, name, email and role.
+    """
+    parts = [
+        select(
+            model.id.label("id"),
+            model.user_id.label("user_id"),
+            literal(name).label("role"),
+            literal(rank).label("rank"),
+        ).where(model.hospital_id == hospital_id)
+        for rank, (name, model) in enumerate(STAFF_ROLES.items())
+        if role is None or role == name
+    ]
+    staff = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+
+    query = (
+        select(staff.c.id, User.name, User.email, staff.c.role)
+        .join(User, User.id == staff.c.user_id)
+        .order_by(staff.c.rank, staff.c.id)
+        .offset(offset)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
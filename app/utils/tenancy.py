@@ -0,0 +1,134 @@
+"""Hospital tenancy.
+
+Medical records, prescriptions, test requests and access logs carry the hospital_id of the
+doctor who wrote them (stamped on insert by `stamp_hospital`; record terms and lab result
+values copy it from their record or test). Appointments are booked with a hospital_id, but
+`stamp_hospital` replaces it with the doctor's hospital, so a doctor always sees their own
+appointments; the booked one is kept only when the doctor has no hospital. Per-hospital queries filter that column instead of joining through doctors, and on
+Postgres, where medical_records, prescriptions and test_requests are hash-partitioned by
+hospital_id, they only touch that hospital's partition.
+
+Staff of a hospital (hospital admins, doctors, technicians, pharmacies) only see their own
+hospital's rows. Their access token carries a `hospital_id` claim (`tenant_claims`), and
+every ORM SELECT, UPDATE and DELETE they run gets `hospital_id = <claim>` added for the
+TENANT_MODELS. Staff not assigned to a hospital are scoped to NO_HOSPITAL and only see
+rows without one (`hospital_id IS NULL`); as appointments always have a hospital, they see
+none. Patients and admins are not scoped. Internal
+lookups can opt out with .execution_options(skip_tenant_filter=True).
+"""
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, with_loader_criteria
+
+TENANT_ROLES = {"hospital", "hospital_admin", "doctor", "technician", "labtech", "pharmacy", "pharmacist"}
+NO_HOSPITAL = object()  # scope of staff without a hospital: matches no hospital_id
+
+
+def _models():
+    from app import models  # the models import this package; resolve them lazily
+    return models
+
+
+def hospital_for_user(session, role, user_id):
+    """Hospital a staff account belongs to, or None."""
+    m = _models()
+    if role in ("hospital", "hospital_admin"):
+        stmt = select(m.Hospital.id).where(m.Hospital.user_id == user_id)
+    elif role == "doctor":
+        stmt = select(m.Doctor.hospital_id).where(m.Doctor.user_id == user_id)
+    elif role in ("technician", "labtech"):
+        stmt = select(m.Technician.hospital_id).where(m.Technician.user_id == user_id)
+    elif role in ("pharmacy", "pharmacist"):
+        stmt = select(m.Pharmacy.hospital_id).where(m.Pharmacy.user_id == user_id)
+    else:
+        return None
+    return session.execute(stmt.limit(1).execution_options(skip_tenant_filter=True)).scalar()
+
+
+def tenant_claims(session, user):
+    """Extra access token claims for `user`: the hospital of a staff account."""
+    if user.role not in TENANT_ROLES:
+        return {}
+    return {"hospital_id": hospital_for_user(session, user.role, user.id)}
+
+
+def current_hospital_id(session):
+    """Hospital the current caller is scoped to, NO_HOSPITAL for unassigned staff, or None for unscoped callers."""
+    if "tenant_hospital_id" in session.info:
+        return session.info["tenant_hospital_id"]  # set by the async handlers
+    if not has_request_context():
+        return None
+    if "tenant_hospital_id" not in g:
+        try:
+            claims = get_jwt()
+        except RuntimeError:
+            return None  # token not verified (yet); nothing to scope by
+        hospital_id = None
+        if claims.get("role") in TENANT_ROLES:
+            if "hospital_id" in claims:
+                hospital_id = claims["hospital_id"]
+            else:  # token issued before the claim existed
+                hospital_id = hospital_for_user(session, claims["role"], int(claims["sub"]))
+            if hospital_id is None:
+                hospital_id = NO_HOSPITAL
+        g.tenant_hospital_id = hospital_id
+    return g.tenant_hospital_id
+
+
+def tenant_models():
+    m = _models()
+    return (m.MedicalRecord, m.Prescription, m.TestRequest, m.AccessLog, m.Appointment, m.LabResultValue)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def apply_tenant_filter(execute_state):
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return  # the criteria added to the parent query already cover these
+    if execute_state.execution_options.get("skip_tenant_filter"):
+        return
+    hospital_id = current_hospital_id(execute_state.session)
+    if hospital_id is None:
+        return
+    if hospital_id is NO_HOSPITAL:
+        criteria = lambda cls: cls.hospital_id.is_(None)
+    else:
+        criteria = lambda cls: cls.hospital_id == hospital_id
+    execute_state.statement = execute_state.statement.options(*[
+        with_loader_criteria(model, criteria, include_aliases=True)
+        for model in tenant_models()
+    ])
+
+
+@event.listens_for(Session, "before_flush")
+def stamp_hospital(session, flush_context, instances):
+    """Fill hospital_id on new clinical rows and appointments from their doctor (or appointment, for records)."""
+    m = _models()
+    new = [obj for obj in session.new if isinstance(obj, (m.MedicalRecord, m.Prescription, m.TestRequest, m.AccessLog))
+           and obj.hospital_id is None]
+    appointments = [obj for obj in session.new if isinstance(obj, m.Appointment)]
+    doctor_ids = {obj.doctor_id for obj in new + appointments if obj.doctor_id}
+    if doctor_ids:
+        hospitals = dict(session.execute(
+            select(m.Doctor.id, m.Doctor.hospital_id)
+            .where(m.Doctor.id.in_(doctor_ids))
+            .execution_options(skip_tenant_filter=True)
+        ).all())
+        for obj in new:
+            obj.hospital_id = hospitals.get(obj.doctor_id)
+        for obj in appointments:
+            obj.hospital_id = hospitals.get(obj.doctor_id) or obj.hospital_id
+
+    for obj in new:
+        if obj.hospital_id is None and isinstance(obj, m.MedicalRecord) and obj.appointment_id:
+            obj.hospital_id = session.execute(
+                select(m.Appointment.hospital_id)
+                .where(m.Appointment.id == obj.appointment_id)
+                .execution_options(skip_tenant_filter=True)
+            ).scalar()
+
+    for obj in session.new:
+        if isinstance(obj, m.MedicalRecordTerm) and obj.hospital_id is None and obj.record is not None:
+            obj.hospital_id = obj.record.hospital_id
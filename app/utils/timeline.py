@@ -0,0 +1,133 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload, undefer
+from app.models import Appointment, MedicalRecord, Prescription, TestRequest, Doctor
+
+
+def _doctor(d):
+    return {
+        "id": d.id,
+        "name": d.user.name if d.user else None,
+        "specialization": d.specialization,
+    } if d else None
+
+
+def _appointment(a):
+    return {"date": a.date.isoformat(), "time": a.time.strftime("%H:%M"), "status": a.status,
+            "hospital_id": a.hospital_id, "doctor": _doctor(a.doctor)}
+
+
+def _record(r):
+    return {"diagnosis": r.diagnosis, "treatment": r.treatment,
+            "appointment_id": r.appointment_id, "doctor": _doctor(r.doctor)}
+
+
+def _prescription(p):
+    return {"medication_details": p.medication_details, "pharmacy_id": p.pharmacy_id,
+            "doctor": _doctor(p.doctor)}
+
+
+def _lab_test(t):
+    return {"test_name": t.test_name, "status": t.status, "results": t.results,
+            "date_completed": t.date_completed, "doctor": _doctor(t.doctor)}
+
+
+class TimelineSource:
+    """
+    One clinical table in the timeline. `key_columns` is the timestamp (split over several
+    columns for appointments) and must be covered by a (patient_id, *key_columns) index so
+    each page is a single index range scan. `detail_columns` are deferred columns the
+    serializer reads; they are loaded with the page instead of one query per row.
+    """
+
+    def __init__(self, kind, rank, model, key_columns, timestamp, serialize, detail_columns=()):
+        self.kind = kind
+        self.rank = rank  # tie-breaker between tables sharing a timestamp
+        self.model = model
+        self.key_columns = key_columns
+        self.timestamp = timestamp
+        self.serialize = serialize
+        self.detail_columns = detail_columns
+
+    def split(self, ts):
+        return (ts.date(), ts.time()) if len(self.key_columns) == 2 else (ts,)
+
+    def fetch(self, patient_id, limit, cursor=None):
+        cols = tuple_(*self.key_columns)
+        query = (
+            self.model.query
+            .options(joinedload(self.model.doctor).joinedload(Doctor.user),
+                     *[undefer(c) for c in self.detail_columns])
+            .filter(self.model.patient_id == patient_id, *[c.isnot(None) for c in self.key_columns])
+        )
+
+        # Resume strictly after the cursor in (timestamp desc, rank asc, id desc) order
+        if cursor:
+            ts, rank, last_id = cursor
+            key = self.split(ts)
+            if self.rank > rank:
+                query = query.filter(cols <= key)
+            elif self.rank < rank:
+                query = query.filter(cols < key)
+            else:
+                query = query.filter(tuple_(*self.key_columns, self.model.id) < (*key, last_id))
+
+        order = [c.desc() for c in self.key_columns] + [self.model.id.desc()]
+        return [(self.timestamp(row), self.rank, row.id, self, row)
+                for row in query.order_by(*order).limit(limit).all()]
+
+
+SOURCES = [
+    TimelineSource("appointment", 0, Appointment, (Appointment.date, Appointment.time),
+                   lambda a: datetime.combine(a.date, a.time), _appointment),
+    TimelineSource("medical_record", 1, MedicalRecord, (MedicalRecord.created_at,),
+                   lambda r: r.created_at, _record),
+    TimelineSource("prescription", 2, Prescription, (Prescription.issued_date,),
+                   lambda p: p.issued_date, _prescription, (Prescription.medication_details,)),
+    TimelineSource("lab_test", 3, TestRequest, (TestRequest.date_requested,),
+                   lambda t: t.date_requested, _lab_test, (TestRequest.results,)),
+]
+
+
+def encode_cursor(ts, rank, item_id):
+    raw = json.dumps([ts.isoformat(), rank, item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, rank, id) or raise ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, rank, item_id = json.loads(raw)
+        return datetime.fromisoformat(ts), int(rank), int(item_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def patient_timeline(patient_id, limit=20, cursor=None):
+    """
+    Newest-first page of a patient's appointments, medical records, prescriptions and lab tests.
+    Each table contributes at most `limit` + 1 rows from one LIMIT query; the sorted streams are
+    k-way merged and the position of the last emitted item becomes the next cursor.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    streams = [source.fetch(patient_id, limit + 1, position) for source in SOURCES]
+    merged = heapq.merge(*streams, key=lambda item: (item[0], -item[1], item[2]), reverse=True)
+
+    items, next_cursor = [], None
+    for ts, rank, item_id, source, row in merged:
+        if len(items) == limit:
+            next_cursor = encode_cursor(*items[-1][:3])
+            break
+        items.append((ts, rank, item_id, source, row))
+
+    return {
+        "items": [
+            {"type": source.kind, "id": item_id, "timestamp": ts.isoformat(), **source.serialize(row)}
+            for ts, rank, item_id, source, row in items
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,5 @@
+from app.asgi import create_asgi_app
+from dotenv import load_dotenv
+
+load_dotenv()
+application = create_asgi_app()
@@ -0,0 +1,67 @@
+"""Compare requests/sec and latency per worker between the sync and ASGI deployments.
+
+Start one worker of each, pointing at the same database:
+
+    gunicorn -w 1 --threads 4 -b :5000 main:app
+    uvicorn asgi:application --workers 1 --port 8000
+
+then run:
+
+    python benchmarks/async_concurrency.py --token <JWT> \\
+        --path /medical-records/patient/1 --concurrency 1 8 32 128
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+async def run_level(base_url, path, token, concurrency, requests_per_client):
+    latencies = []
+    errors = 0
+
+    async def client_loop(client):
+        nonlocal errors
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sync-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--async-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/patients/appointments")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=20, help="requests per simulated client")
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'5xx':>5}")
+    for concurrency in args.concurrency:
+        for mode, url in (("sync", args.sync_url), ("async", args.async_url)):
+            r = await run_level(url, args.path, args.token, concurrency, args.requests)
+            print(f"{mode:<6} {concurrency:>5} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['errors']:>5}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""List query cost with and without the deferred text columns.
+
+Fills a throwaway SQLite database with prescriptions and lab tests carrying large
+free-text bodies, then times the list queries the way the endpoints run them: summary
+rows (deferred columns left out) against ?detail=true rows (undeferred in the same query).
+Reports median latency and the bytes of text read and serialized per list.
+
+    python benchmarks/deferred_columns.py --rows 2000 --text-kb 8
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.db import db
+from app.models import Prescription, TestRequest
+from app.utils.json_provider import ORJSONProvider
+from app.utils.projection import requested_fields, undefer_options, project
+
+PRESCRIPTION_FIELDS = {
+    "id": lambda p: p.id,
+    "doctor_id": lambda p: p.doctor_id,
+    "patient_id": lambda p: p.patient_id,
+    "medication_details": lambda p: p.medication_details,
+    "issued_date": lambda p: p.issued_date,
+}
+LAB_TEST_FIELDS = {
+    "id": lambda t: t.id,
+    "test_name": lambda t: t.test_name,
+    "status": lambda t: t.status,
+    "results": lambda t: t.results,
+    "date_requested": lambda t: t.date_requested,
+}
+CASES = [
+    ("prescriptions", Prescription, PRESCRIPTION_FIELDS, {"medication_details": Prescription.medication_details}),
+    ("lab tests", TestRequest, LAB_TEST_FIELDS, {"results": TestRequest.results}),
+]
+
+
+def text(size):
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 10))) for _ in range(200)]
+    out = []
+    while sum(len(w) + 1 for w in out) < size:
+        out.append(random.choice(words))
+    return " ".join(out)[:size]
+
+
+def seed(rows, text_bytes):
+    start = datetime(2025, 1, 1)
+    body = [text(text_bytes) for _ in range(50)]
+    db.session.execute(Prescription.__table__.insert(), [{
+        "doctor_id": i % 50 + 1, "patient_id": i % 500 + 1, "medication_details": body[i % 50],
+        "issued_date": start + timedelta(minutes=i),
+    } for i in range(rows)])
+    db.session.execute(TestRequest.__table__.insert(), [{
+        "test_name": "Full blood count", "status": "Completed", "results": body[i % 50],
+        "doctor_id": i % 50 + 1, "patient_id": i % 500 + 1, "date_requested": start + timedelta(minutes=i),
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def measure(app, model, getters, deferred, args, repeats):
+    summary = [name for name in getters if name not in deferred]
+    fields = requested_fields(args, getters, summary)
+    timings = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        rows = model.query.options(*undefer_options(fields, deferred)).all()
+        body = app.json.dumps([project(row, fields, getters) for row in rows])
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--text-kb", type=float, default=8, help="size of each text body")
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.json = ORJSONProvider(app)
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            seed(args.rows, int(args.text_kb * 1024))
+
+            print(f"{args.rows} rows per table, {args.text_kb} KB text bodies")
+            print(f"{'list':<14} {'mode':<8} {'median ms':>10} {'response':>12}")
+            for label, model, getters, deferred in CASES:
+                full_ms, full_bytes = measure(app, model, getters, deferred, {"detail": "true"}, args.repeats)
+                summary_ms, summary_bytes = measure(app, model, getters, deferred, {}, args.repeats)
+                print(f"{label:<14} {'detail':<8} {full_ms * 1000:10.1f} {full_bytes / 1024:10.0f} KB")
+                print(f"{label:<14} {'summary':<8} {summary_ms * 1000:10.1f} {summary_bytes / 1024:10.0f} KB"
+                      f"   ({full_ms / summary_ms:.1f}x faster, {1 - summary_bytes / full_bytes:.0%} fewer bytes)")
+            db.session.remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Email transport benchmark against a local HTTP stub of the provider API.
+
+Compares sending N invites the old way (a fresh `requests.post` per message), one
+message at a time over the pooled transport, and through the batch API. The stub counts
+requests and TCP connections and can inject latency and transient failures, so retries
+and the circuit breaker can be exercised too.
+
+    python benchmarks/email_transport.py --invites 1000 --latency-ms 20 --fail-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils.email_transport import SendGridTransport, BrevoTransport, CircuitBreaker, CircuitOpenError
+from app.utils.email_utils import INVITE_SUBJECT, INVITE_TEMPLATE
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.recipients = 0
+        self.connections = set()
+
+
+def make_handler(stats, latency, fail_rate):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            recipients = len(body.get("personalizations") or body.get("messageVersions") or body.get("to") or [])
+            time.sleep(latency)
+            with stats.lock:
+                stats.requests += 1
+                stats.connections.add(self.client_address)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            with stats.lock:
+                stats.recipients += recipients
+            self.send_response(202)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def run(label, stats, fn):
+    stats.reset()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  requests={stats.requests:<6} "
+          f"connections={len(stats.connections):<6} delivered={stats.recipients}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invites", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--provider", choices=["sendgrid", "brevo"], default="sendgrid")
+    args = parser.parse_args()
+
+    stats = StubStats()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(stats, args.latency_ms / 1000, args.fail_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    cls = SendGridTransport if args.provider == "sendgrid" else BrevoTransport
+    transport = cls("test-key", "noreply@example.com", base_url=base_url, backoff=0.01,
+                    breaker=CircuitBreaker(failure_threshold=10_000))
+    recipients = [(f"user{i}@example.com", {"setup_link": f"http://localhost/setup-password/{i}"})
+                  for i in range(args.invites)]
+
+    def per_message_unpooled():
+        for email, params in recipients:
+            payload = transport.single_payload(email, INVITE_SUBJECT, INVITE_TEMPLATE.replace("{{setup_link}}", params["setup_link"]))
+            requests.post(transport.url, json=payload, headers=transport.headers(), timeout=10)
+
+    def per_message_pooled():
+        for email, params in recipients:
+            try:
+                transport.send(email, INVITE_SUBJECT, INVITE_TEMPLATE.replace("{{setup_link}}", params["setup_link"]))
+            except Exception:
+                pass
+
+    def batched():
+        transport.send_batch(INVITE_SUBJECT, INVITE_TEMPLATE, recipients, chunk_size=500)
+
+    print(f"{args.invites} invites via {args.provider} stub, latency {args.latency_ms} ms, fail rate {args.fail_rate}")
+    run("per message, new connection", stats, per_message_unpooled)
+    run("per message, pooled+retry", stats, per_message_pooled)
+    run("batched (500/request)", stats, batched)
+
+    # Circuit breaker: a dead provider fails fast after the threshold
+    server.shutdown()
+    server.server_close()
+    dead = cls("test-key", "noreply@example.com", base_url=base_url, max_retries=0,
+               breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30))
+    outcomes = []
+    for email, _ in recipients[:10]:
+        start = time.perf_counter()
+        try:
+            dead.send(email, INVITE_SUBJECT, "x")
+        except CircuitOpenError:
+            outcomes.append(f"open({(time.perf_counter() - start) * 1e6:.0f}us)")
+        except Exception:
+            outcomes.append("error")
+    print("provider down:", " ".join(outcomes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Serialization benchmark: Flask's default JSON provider vs ORJSONProvider.
+
+Payloads mirror the shape of our largest responses (admin access logs, prescription
+listings, decrypted medical records, hospital staff rosters) at realistic row counts.
+
+    python benchmarks/json_serialization.py --rows 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, date, time as dtime, timedelta
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils.json_provider import ORJSONProvider
+
+
+def access_logs(n):
+    start = datetime(2025, 1, 1)
+    return [{
+        "id": i,
+        "doctor_id": i % 500,
+        "doctor_name": f"Doctor {i % 500}",
+        "patient_id": i % 20000,
+        "patient_name": f"Patient {i % 20000}",
+        "accessed_at": start + timedelta(seconds=i * 37),
+        "purpose": "viewed record",
+    } for i in range(n)]
+
+
+def prescriptions(n):
+    start = datetime(2025, 1, 1)
+    return [{
+        "id": i,
+        "doctor": f"Doctor {i % 500}",
+        "patient": f"Patient {i % 20000}",
+        "medication_details": "Amoxicillin 500mg, 1 capsule three times daily for 7 days. " * 3,
+        "issued_date": start + timedelta(minutes=i),
+        "quantity": Decimal("21.00"),
+    } for i in range(n)]
+
+
+def medical_records(n):
+    return [{
+        "id": i,
+        "diagnosis": "Acute upper respiratory tract infection",
+        "treatment": "Rest, fluids, paracetamol 1g PRN",
+        "notes": "Patient reports 3 days of sore throat and mild fever. " * 4,
+        "doctor": {"id": i % 500, "name": f"Doctor {i % 500}", "specialization": "General Practice"},
+        "patient": {"id": i % 20000},
+        "appointment": {"id": i, "date": date(2025, 1, 1) + timedelta(days=i % 365), "time": str(dtime(9, 30))},
+        "created_at": datetime(2025, 1, 1) + timedelta(hours=i),
+    } for i in range(n)]
+
+
+def staff_roster(n):
+    roles = ("doctor", "labtech", "pharmacist")
+    return [{"id": i, "name": f"Staff {i}", "email": f"staff{i}@hospital.org", "role": roles[i % 3]} for i in range(n)]
+
+
+PAYLOADS = {
+    "access_logs": access_logs,
+    "prescriptions": prescriptions,
+    "medical_records": medical_records,
+    "staff_roster": staff_roster,
+}
+
+
+def bench(provider, payload, repeat):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = provider.response(payload).get_data()
+        best = min(best, time.perf_counter() - start)
+        size = len(body)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default, fast = DefaultJSONProvider(app), ORJSONProvider(app)
+
+    print(f"{'payload':<16} {'rows':>7} {'default ms':>11} {'orjson ms':>10} {'speedup':>8} {'bytes':>11}")
+    with app.app_context():
+        for name, build in PAYLOADS.items():
+            for rows in args.rows:
+                payload = build(rows)
+                slow_t, _ = bench(default, payload, args.repeat)
+                fast_t, size = bench(fast, payload, args.repeat)
+                print(f"{name:<16} {rows:>7} {slow_t * 1000:>11.1f} {fast_t * 1000:>10.1f} {slow_t / fast_t:>7.1f}x {size:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Row-by-row Python against the vectorized lab analytics.
+
+Builds a synthetic result series for one analyte and computes range flags, deltas with
+delta checks and rolling mean/std both ways: a loop over row dicts (what the endpoint
+would do without NumPy) and app.utils.lab_analytics.analyze_series. Checks that both
+agree, then reports median latency.
+
+    python benchmarks/lab_analytics.py --points 20000 --window 10
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils.lab_analytics import analyze_series
+
+
+def series(points):
+    rng = np.random.default_rng(7)
+    return {
+        "measured_at": np.datetime64("2024-01-01T08:00:00", "us") + np.arange(points) * np.timedelta64(6, "h"),
+        "value": np.round(rng.normal(14, 1.8, points), 1),
+        "ref_low": np.full(points, 12.0),
+        "ref_high": np.full(points, 16.0),
+        "test_id": np.arange(1, points + 1),
+        "unit": "g/dL",
+    }
+
+
+def row_by_row(rows, window, delta_percent):
+    out, previous = [], None
+    for i, row in enumerate(rows):
+        value = row["value"]
+        flag = "L" if value < row["ref_low"] else "H" if value > row["ref_high"] else "N"
+        delta = percent = None
+        if previous is not None:
+            delta = value - previous
+            percent = delta / abs(previous) * 100 if previous else None
+        recent = [r["value"] for r in rows[max(0, i - window + 1):i + 1]]
+        mean = sum(recent) / len(recent)
+        std = math.sqrt(sum((x - mean) ** 2 for x in recent) / (len(recent) - 1)) if len(recent) > 1 else None
+        out.append({"flag": flag, "delta": delta, "delta_check": percent is not None and abs(percent) > delta_percent,
+                    "rolling_mean": mean, "rolling_std": std})
+        previous = value
+    return out
+
+
+def timed(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--delta-percent", type=float, default=25.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    data = series(args.points)
+    rows = [
+        {"value": float(v), "ref_low": float(lo), "ref_high": float(hi)}
+        for v, lo, hi in zip(data["value"], data["ref_low"], data["ref_high"])
+    ]
+
+    loop_s, expected = timed(lambda: row_by_row(rows, args.window, args.delta_percent), args.repeats)
+    numpy_s, result = timed(lambda: analyze_series(data, args.window, args.delta_percent), args.repeats)
+
+    for want, got in zip(expected, result["points"]):
+        assert want["flag"] == got["flag"] and want["delta_check"] == got["delta_check"]
+        assert abs(want["rolling_mean"] - got["rolling_mean"]) < 1e-3
+
+    print(f"{args.points} points, window {args.window}")
+    print(f"{'row by row':<12} {loop_s * 1000:10.1f} ms")
+    print(f"{'numpy':<12} {numpy_s * 1000:10.1f} ms   ({loop_s / numpy_s:.1f}x faster, including JSON-ready output)")
+
+
+if __name__ == "__main__":
+    main()
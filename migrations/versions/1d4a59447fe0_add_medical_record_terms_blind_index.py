@@ -0,0 +1,40 @@
+"""add medical_record_terms blind index
+
+Revision ID: 1d4a59447fe0
+Revises: 8071a6ec50c7
+Create Date: 2026-10-19 09:12:41.503128
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d4a59447fe0'
+down_revision = '8071a6ec50c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('medical_record_terms',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('field', sa.String(length=20), nullable=False),
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.ForeignKeyConstraint(['record_id'], ['medical_records.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('medical_record_terms', schema=None) as batch_op:
+        batch_op.create_index('ix_medical_record_terms_field_token', ['field', 'token'], unique=False)
+        batch_op.create_index(batch_op.f('ix_medical_record_terms_record_id'), ['record_id'], unique=False)
+
+    # Existing records are indexed with: flask reindex-medical-records
+
+
+def downgrade():
+    with op.batch_alter_table('medical_record_terms', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_medical_record_terms_record_id'))
+        batch_op.drop_index('ix_medical_record_terms_field_token')
+
+    op.drop_table('medical_record_terms')
@@ -0,0 +1,42 @@
+"""add hospital_deletion_jobs
+
+Revision ID: 2c8b2a9ec304
+Revises: 4be4ce603d4d
+Create Date: 2026-10-19 13:40:52.117305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8b2a9ec304'
+down_revision = '4be4ce603d4d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hospital_deletion_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hospital_id', sa.Integer(), nullable=False),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('current_step', sa.String(length=50), nullable=True),
+    sa.Column('deleted_counts', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('hospital_deletion_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_hospital_deletion_jobs_hospital_id'), ['hospital_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('hospital_deletion_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hospital_deletion_jobs_hospital_id'))
+
+    op.drop_table('hospital_deletion_jobs')
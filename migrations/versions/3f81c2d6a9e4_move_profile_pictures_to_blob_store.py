@@ -0,0 +1,90 @@
+"""move patients.profile_pic into the blob store
+
+Revision ID: 3f81c2d6a9e4
+Revises: e2a6f90c5b17
+Create Date: 2026-10-19 18:02:44.671390
+
+"""
+import base64
+import binascii
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f81c2d6a9e4'
+down_revision = 'e2a6f90c5b17'
+branch_labels = None
+depends_on = None
+
+patients = sa.table('patients',
+    sa.column('id', sa.Integer),
+    sa.column('profile_pic', sa.Text),
+    sa.column('profile_pic_hash', sa.String),
+    sa.column('profile_pic_type', sa.String),
+)
+
+
+def upgrade():
+    from app.utils.blob_store import get_blob_store, sniff_image
+
+    with op.batch_alter_table('patients', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_pic_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('profile_pic_type', sa.String(length=50), nullable=True))
+
+    # Copy base64 images into the blob store in batches; image URLs cannot be carried over
+    conn = op.get_bind()
+    store = get_blob_store()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(patients.c.id, patients.c.profile_pic)
+            .where(patients.c.id > last_id, patients.c.profile_pic.isnot(None))
+            .order_by(patients.c.id)
+            .limit(500)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            try:
+                data = base64.b64decode(row.profile_pic.split(",", 1)[-1], validate=True)
+            except (binascii.Error, ValueError):
+                print(f"patients.{row.id}: profile_pic is not base64, dropped")
+                continue
+            mimetype = sniff_image(data)
+            if not mimetype:
+                print(f"patients.{row.id}: profile_pic is not an image, dropped")
+                continue
+            conn.execute(
+                patients.update().where(patients.c.id == row.id)
+                .values(profile_pic_hash=store.put(data), profile_pic_type=mimetype)
+            )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('patients', schema=None) as batch_op:
+        batch_op.drop_column('profile_pic')
+
+
+def downgrade():
+    from app.utils.blob_store import get_blob_store
+
+    with op.batch_alter_table('patients', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_pic', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    store = get_blob_store()
+    rows = conn.execute(
+        sa.select(patients.c.id, patients.c.profile_pic_hash, patients.c.profile_pic_type)
+        .where(patients.c.profile_pic_hash.isnot(None))
+    ).all()
+    for row in rows:
+        with open(store.path(row.profile_pic_hash), "rb") as f:
+            encoded = base64.b64encode(f.read()).decode()
+        conn.execute(
+            patients.update().where(patients.c.id == row.id)
+            .values(profile_pic=f"data:{row.profile_pic_type};base64,{encoded}")
+        )
+
+    with op.batch_alter_table('patients', schema=None) as batch_op:
+        batch_op.drop_column('profile_pic_type')
+        batch_op.drop_column('profile_pic_hash')
@@ -0,0 +1,44 @@
+"""add patient timeline indexes
+
+Revision ID: 4be4ce603d4d
+Revises: 1d4a59447fe0
+Create Date: 2026-10-19 11:03:27.918214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4be4ce603d4d'
+down_revision = '1d4a59447fe0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_patient_date_time', ['patient_id', 'date', 'time'], unique=False)
+
+    with op.batch_alter_table('medical_records', schema=None) as batch_op:
+        batch_op.create_index('ix_medical_records_patient_created', ['patient_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('prescriptions', schema=None) as batch_op:
+        batch_op.create_index('ix_prescriptions_patient_issued', ['patient_id', 'issued_date'], unique=False)
+
+    with op.batch_alter_table('test_requests', schema=None) as batch_op:
+        batch_op.create_index('ix_test_requests_patient_requested', ['patient_id', 'date_requested'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('test_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_test_requests_patient_requested')
+
+    with op.batch_alter_table('prescriptions', schema=None) as batch_op:
+        batch_op.drop_index('ix_prescriptions_patient_issued')
+
+    with op.batch_alter_table('medical_records', schema=None) as batch_op:
+        batch_op.drop_index('ix_medical_records_patient_created')
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_patient_date_time')
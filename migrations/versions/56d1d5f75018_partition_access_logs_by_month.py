@@ -0,0 +1,102 @@
+"""partition access_logs by month
+
+Revision ID: 56d1d5f75018
+Revises: c5a2fa75f11d
+Create Date: 2026-10-19 16:48:33.270915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '56d1d5f75018'
+down_revision = 'c5a2fa75f11d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        # Range partitioning is Postgres-only; elsewhere just index the audit queries
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.create_index('ix_access_logs_accessed_at', ['accessed_at'], unique=False)
+            batch_op.create_index('ix_access_logs_doctor_accessed', ['doctor_id', 'accessed_at'], unique=False)
+            batch_op.create_index('ix_access_logs_patient_accessed', ['patient_id', 'accessed_at'], unique=False)
+        return
+
+    # Keep the id sequence alive while the old table is swapped out
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_unpartitioned")
+    op.execute("ALTER TABLE access_logs_unpartitioned RENAME CONSTRAINT access_logs_pkey TO access_logs_unpartitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_access_logs_accessed_at")
+    op.execute("DROP INDEX IF EXISTS ix_access_logs_doctor_accessed")
+    op.execute("DROP INDEX IF EXISTS ix_access_logs_patient_accessed")
+
+    op.execute("""
+        CREATE TABLE access_logs (
+            id INTEGER NOT NULL DEFAULT nextval('access_logs_id_seq'),
+            doctor_id INTEGER REFERENCES doctors (id),
+            patient_id INTEGER REFERENCES patients (id),
+            accessed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            purpose VARCHAR(255),
+            PRIMARY KEY (id, accessed_at)
+        ) PARTITION BY RANGE (accessed_at)
+    """)
+
+    # One partition per month from the oldest log up to three months ahead
+    op.execute("""
+        DO $$
+        DECLARE m date;
+        BEGIN
+            FOR m IN SELECT generate_series(
+                date_trunc('month', COALESCE((SELECT min(accessed_at) FROM access_logs_unpartitioned), now())),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF access_logs FOR VALUES FROM (%L) TO (%L)',
+                    'access_logs_' || to_char(m, 'YYYY_MM'), m, (m + interval '1 month')::date
+                );
+            END LOOP;
+        END $$;
+    """)
+
+    op.execute("""
+        INSERT INTO access_logs (id, doctor_id, patient_id, accessed_at, purpose)
+        SELECT id, doctor_id, patient_id, COALESCE(accessed_at, now()), purpose FROM access_logs_unpartitioned
+    """)
+    op.execute("DROP TABLE access_logs_unpartitioned")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+
+    op.create_index('ix_access_logs_accessed_at', 'access_logs', ['accessed_at'], unique=False)
+    op.create_index('ix_access_logs_doctor_accessed', 'access_logs', ['doctor_id', 'accessed_at'], unique=False)
+    op.create_index('ix_access_logs_patient_accessed', 'access_logs', ['patient_id', 'accessed_at'], unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.drop_index('ix_access_logs_patient_accessed')
+            batch_op.drop_index('ix_access_logs_doctor_accessed')
+            batch_op.drop_index('ix_access_logs_accessed_at')
+        return
+
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_partitioned")
+    op.execute("""
+        CREATE TABLE access_logs (
+            id INTEGER NOT NULL DEFAULT nextval('access_logs_id_seq') PRIMARY KEY,
+            doctor_id INTEGER REFERENCES doctors (id),
+            patient_id INTEGER REFERENCES patients (id),
+            accessed_at TIMESTAMP WITHOUT TIME ZONE,
+            purpose VARCHAR(255)
+        )
+    """)
+    op.execute("""
+        INSERT INTO access_logs (id, doctor_id, patient_id, accessed_at, purpose)
+        SELECT id, doctor_id, patient_id, accessed_at, purpose FROM access_logs_partitioned
+    """)
+    op.execute("DROP TABLE access_logs_partitioned CASCADE")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
@@ -0,0 +1,228 @@
+"""add hospital_id to clinical tables, hash-partition them by hospital
+
+Revision ID: 6d2f8b1e4c93
+Revises: 3f81c2d6a9e4
+Create Date: 2026-10-19 18:12:05.417283
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2f8b1e4c93'
+down_revision = '3f81c2d6a9e4'
+branch_labels = None
+depends_on = None
+
+HOSPITAL_PARTITIONS = 8
+
+# Postgres column definitions (besides id and hospital_id) and indexes of the partitioned tables
+PARTITIONED = {
+    'medical_records': {
+        'columns': """
+            patient_id INTEGER NOT NULL REFERENCES patients (id),
+            doctor_id INTEGER NOT NULL REFERENCES doctors (id),
+            appointment_id INTEGER REFERENCES appointments (id),
+            diagnosis TEXT,
+            treatment TEXT,
+            notes TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        """,
+        'copy': 'patient_id, doctor_id, appointment_id, diagnosis, treatment, notes, created_at, updated_at',
+        'indexes': {
+            'ix_medical_records_patient_created': ['patient_id', 'created_at'],
+            'ix_medical_records_hospital_created': ['hospital_id', 'created_at'],
+        },
+    },
+    'prescriptions': {
+        'columns': """
+            doctor_id INTEGER NOT NULL REFERENCES doctors (id),
+            patient_id INTEGER NOT NULL REFERENCES patients (id),
+            pharmacy_id INTEGER REFERENCES pharmacies (id),
+            medication_details TEXT NOT NULL,
+            issued_date TIMESTAMP WITHOUT TIME ZONE
+        """,
+        'copy': 'doctor_id, patient_id, pharmacy_id, medication_details, issued_date',
+        'indexes': {
+            'ix_prescriptions_patient_issued': ['patient_id', 'issued_date'],
+            'ix_prescriptions_hospital_issued': ['hospital_id', 'issued_date'],
+        },
+    },
+    'test_requests': {
+        'columns': """
+            test_name VARCHAR(150) NOT NULL,
+            status VARCHAR(20),
+            date_requested TIMESTAMP WITHOUT TIME ZONE,
+            date_completed TIMESTAMP WITHOUT TIME ZONE,
+            results TEXT,
+            doctor_id INTEGER NOT NULL REFERENCES doctors (id),
+            patient_id INTEGER NOT NULL REFERENCES patients (id),
+            technician_id INTEGER REFERENCES technicians (id)
+        """,
+        'copy': 'test_name, status, date_requested, date_completed, results, doctor_id, patient_id, technician_id',
+        'indexes': {
+            'ix_test_requests_patient_requested': ['patient_id', 'date_requested'],
+            'ix_test_requests_hospital_requested': ['hospital_id', 'date_requested'],
+        },
+    },
+}
+
+BACKFILL = {
+    # A record's hospital is its doctor's, or its appointment's when the doctor has none
+    'medical_records': """
+        UPDATE medical_records SET hospital_id = COALESCE(
+            (SELECT doctors.hospital_id FROM doctors WHERE doctors.id = medical_records.doctor_id),
+            (SELECT appointments.hospital_id FROM appointments WHERE appointments.id = medical_records.appointment_id)
+        )
+    """,
+    'prescriptions': """
+        UPDATE prescriptions SET hospital_id =
+            (SELECT doctors.hospital_id FROM doctors WHERE doctors.id = prescriptions.doctor_id)
+    """,
+    'test_requests': """
+        UPDATE test_requests SET hospital_id =
+            (SELECT doctors.hospital_id FROM doctors WHERE doctors.id = test_requests.doctor_id)
+    """,
+    'access_logs': """
+        UPDATE access_logs SET hospital_id =
+            (SELECT doctors.hospital_id FROM doctors WHERE doctors.id = access_logs.doctor_id)
+        WHERE doctor_id IS NOT NULL
+    """,
+    'medical_record_terms': """
+        UPDATE medical_record_terms SET hospital_id =
+            (SELECT medical_records.hospital_id FROM medical_records WHERE medical_records.id = medical_record_terms.record_id)
+    """,
+}
+
+
+def _partition(table, spec):
+    """Swap `table` for a copy hash-partitioned by hospital_id (primary key (id, hospital_id))."""
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+    op.execute(f"ALTER TABLE {table}_unpartitioned RENAME CONSTRAINT {table}_pkey TO {table}_unpartitioned_pkey")
+    for name in spec['indexes']:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    op.execute(f"""
+        CREATE TABLE {table} (
+            id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq'),
+            hospital_id INTEGER NOT NULL REFERENCES hospitals (id),
+            {spec['columns']},
+            PRIMARY KEY (id, hospital_id)
+        ) PARTITION BY HASH (hospital_id)
+    """)
+    for remainder in range(HOSPITAL_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {HOSPITAL_PARTITIONS}, REMAINDER {remainder})"
+        )
+
+    op.execute(f"""
+        INSERT INTO {table} (id, hospital_id, {spec['copy']})
+        SELECT id, hospital_id, {spec['copy']} FROM {table}_unpartitioned
+    """)
+    op.execute(f"DROP TABLE {table}_unpartitioned CASCADE")  # also drops the old medical_record_terms FK
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    for name, columns in spec['indexes'].items():
+        op.create_index(name, table, columns, unique=False)
+
+
+def _unpartition(table, spec):
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+    for name in spec['indexes']:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute(f"""
+        CREATE TABLE {table} (
+            id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq') PRIMARY KEY,
+            {spec['columns']}
+        )
+    """)
+    op.execute(f"""
+        INSERT INTO {table} (id, {spec['copy']})
+        SELECT id, {spec['copy']} FROM {table}_partitioned
+    """)
+    op.execute(f"DROP TABLE {table}_partitioned CASCADE")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    for name, columns in spec['indexes'].items():
+        if 'hospital_id' not in columns:
+            op.create_index(name, table, columns, unique=False)
+
+
+def upgrade():
+    conn = op.get_bind()
+    for table in list(PARTITIONED) + ['access_logs', 'medical_record_terms']:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('hospital_id', sa.Integer(), nullable=True))
+    for statement in BACKFILL.values():
+        op.execute(statement)
+
+    for table in list(PARTITIONED) + ['medical_record_terms']:
+        missing = conn.execute(sa.text(f"SELECT count(*) FROM {table} WHERE hospital_id IS NULL")).scalar()
+        if missing:
+            raise RuntimeError(
+                f"{missing} {table} rows have no hospital (their doctor has none). "
+                f"Assign those doctors to a hospital, then run the migration again."
+            )
+
+    if conn.dialect.name != 'postgresql':
+        # Hash partitioning is Postgres-only; elsewhere the column and its indexes are enough
+        for table, spec in PARTITIONED.items():
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.alter_column('hospital_id', existing_type=sa.Integer(), nullable=False)
+                batch_op.create_foreign_key(f'fk_{table}_hospital_id_hospitals', 'hospitals', ['hospital_id'], ['id'])
+                name, columns = [(n, c) for n, c in spec['indexes'].items() if 'hospital_id' in c][0]
+                batch_op.create_index(name, columns, unique=False)
+        with op.batch_alter_table('medical_record_terms', schema=None) as batch_op:
+            batch_op.alter_column('hospital_id', existing_type=sa.Integer(), nullable=False)
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.create_foreign_key('fk_access_logs_hospital_id_hospitals', 'hospitals', ['hospital_id'], ['id'])
+            batch_op.create_index('ix_access_logs_hospital_accessed', ['hospital_id', 'accessed_at'], unique=False)
+        return
+
+    for table, spec in PARTITIONED.items():
+        _partition(table, spec)
+
+    # Terms reference the record's full key so deleting a record still cascades to them
+    op.alter_column('medical_record_terms', 'hospital_id', existing_type=sa.Integer(), nullable=False)
+    op.create_foreign_key(
+        'medical_record_terms_record_fkey', 'medical_record_terms', 'medical_records',
+        ['record_id', 'hospital_id'], ['id', 'hospital_id'], ondelete='CASCADE'
+    )
+
+    # access_logs stays range-partitioned by month (retention drops whole months); index the hospital instead
+    op.create_foreign_key('fk_access_logs_hospital_id_hospitals', 'access_logs', 'hospitals', ['hospital_id'], ['id'])
+    op.create_index('ix_access_logs_hospital_accessed', 'access_logs', ['hospital_id', 'accessed_at'], unique=False)
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.drop_index('ix_access_logs_hospital_accessed')
+            batch_op.drop_constraint('fk_access_logs_hospital_id_hospitals', type_='foreignkey')
+            batch_op.drop_column('hospital_id')
+        with op.batch_alter_table('medical_record_terms', schema=None) as batch_op:
+            batch_op.drop_column('hospital_id')
+        for table, spec in PARTITIONED.items():
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                name = [n for n, c in spec['indexes'].items() if 'hospital_id' in c][0]
+                batch_op.drop_index(name)
+                batch_op.drop_constraint(f'fk_{table}_hospital_id_hospitals', type_='foreignkey')
+                batch_op.drop_column('hospital_id')
+        return
+
+    op.drop_index('ix_access_logs_hospital_accessed', table_name='access_logs')
+    op.drop_constraint('fk_access_logs_hospital_id_hospitals', 'access_logs', type_='foreignkey')
+    op.drop_column('access_logs', 'hospital_id')
+
+    op.drop_constraint('medical_record_terms_record_fkey', 'medical_record_terms', type_='foreignkey')
+    op.drop_column('medical_record_terms', 'hospital_id')
+    for table, spec in PARTITIONED.items():
+        _unpartition(table, spec)
+    op.create_foreign_key(
+        'medical_record_terms_record_id_fkey', 'medical_record_terms', 'medical_records',
+        ['record_id'], ['id'], ondelete='CASCADE'
+    )
@@ -0,0 +1,41 @@
+"""add prescription status and transition timestamps
+
+Revision ID: 8a4c1e7f2b60
+Revises: 6d2f8b1e4c93
+Create Date: 2026-10-19 20:41:37.902156
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4c1e7f2b60'
+down_revision = '6d2f8b1e4c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('prescriptions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='issued', nullable=False))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('verified_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('dispensed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('cancelled_at', sa.DateTime(), nullable=True))
+
+    # Claimed prescriptions had no status before; when they were claimed is unknown
+    op.execute("UPDATE prescriptions SET status = 'claimed' WHERE pharmacy_id IS NOT NULL")
+
+    with op.batch_alter_table('prescriptions', schema=None) as batch_op:
+        batch_op.create_index('ix_prescriptions_pharmacy_status_issued', ['pharmacy_id', 'status', 'issued_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('prescriptions', schema=None) as batch_op:
+        batch_op.drop_index('ix_prescriptions_pharmacy_status_issued')
+        batch_op.drop_column('cancelled_at')
+        batch_op.drop_column('dispensed_at')
+        batch_op.drop_column('verified_at')
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('status')
@@ -0,0 +1,48 @@
+"""add access_logs default partition
+
+Revision ID: a9c4e7b2d5f1
+Revises: f6a1c8d4e2b9
+Create Date: 2026-10-20 09:12:40.518377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e7b2d5f1'
+down_revision = 'f6a1c8d4e2b9'
+branch_labels = None
+depends_on = None
+
+
+# Without a default partition, an access log for a month nobody created a partition for
+# (e.g. `flask maintain-access-logs` stopped running) fails the request that writes it.
+# ensure_partitions() moves such rows into their own monthly partition on its next run.
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE TABLE IF NOT EXISTS access_logs_default PARTITION OF access_logs DEFAULT")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Give every month still in the default partition its own partition before dropping it
+    op.execute("ALTER TABLE access_logs DETACH PARTITION access_logs_default")
+    op.execute("""
+        DO $$
+        DECLARE m date;
+        BEGIN
+            FOR m IN SELECT DISTINCT date_trunc('month', accessed_at)::date FROM access_logs_default
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF access_logs FOR VALUES FROM (%L) TO (%L)',
+                    'access_logs_' || to_char(m, 'YYYY_MM'), m, (m + interval '1 month')::date
+                );
+            END LOOP;
+        END $$;
+    """)
+    op.execute("INSERT INTO access_logs SELECT * FROM access_logs_default")
+    op.execute("DROP TABLE access_logs_default")
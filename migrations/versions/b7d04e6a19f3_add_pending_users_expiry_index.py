@@ -0,0 +1,26 @@
+"""add pending_users (is_accepted, expires_at) index
+
+Revision ID: b7d04e6a19f3
+Revises: 9e3b7c41d2a8
+Create Date: 2026-10-19 16:48:12.906551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d04e6a19f3'
+down_revision = '9e3b7c41d2a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pending_users', schema=None) as batch_op:
+        batch_op.create_index('ix_pending_users_is_accepted_expires_at', ['is_accepted', 'expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pending_users', schema=None) as batch_op:
+        batch_op.drop_index('ix_pending_users_is_accepted_expires_at')
@@ -0,0 +1,54 @@
+"""add lab_result_values
+
+Revision ID: b7e3d9a1c4f8
+Revises: 8a4c1e7f2b60
+Create Date: 2026-10-19 21:26:50.318844
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3d9a1c4f8'
+down_revision = '8a4c1e7f2b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    # On Postgres test_requests is keyed (id, hospital_id), so the foreign key carries both
+    test_fk = (
+        sa.ForeignKeyConstraint(['test_request_id', 'hospital_id'], ['test_requests.id', 'test_requests.hospital_id'],
+                                name='lab_result_values_test_request_fkey', ondelete='CASCADE')
+        if postgres else
+        sa.ForeignKeyConstraint(['test_request_id'], ['test_requests.id'], ondelete='CASCADE')
+    )
+    op.create_table('lab_result_values',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('test_request_id', sa.Integer(), nullable=False),
+    sa.Column('hospital_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('analyte', sa.String(length=32), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('unit', sa.String(length=20), nullable=True),
+    sa.Column('ref_low', sa.Float(), nullable=True),
+    sa.Column('ref_high', sa.Float(), nullable=True),
+    sa.Column('flag', sa.String(length=1), nullable=True),
+    sa.Column('measured_at', sa.DateTime(), nullable=False),
+    test_fk,
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('lab_result_values', schema=None) as batch_op:
+        batch_op.create_index('ix_lab_result_values_patient_analyte_measured', ['patient_id', 'analyte', 'measured_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_lab_result_values_test_request_id'), ['test_request_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lab_result_values', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_lab_result_values_test_request_id'))
+        batch_op.drop_index('ix_lab_result_values_patient_analyte_measured')
+
+    op.drop_table('lab_result_values')
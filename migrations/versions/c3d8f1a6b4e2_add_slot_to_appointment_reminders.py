@@ -0,0 +1,57 @@
+"""add slot to appointment_reminders
+
+Revision ID: c3d8f1a6b4e2
+Revises: a9c4e7b2d5f1
+Create Date: 2026-10-20 14:31:08.204716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8f1a6b4e2'
+down_revision = 'a9c4e7b2d5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment_reminders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('appointment_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('appointment_time', sa.Time(), nullable=True))
+
+    # Which slot an existing reminder was sent for is not known; the current one keeps it
+    # from being sent again, which is what the old key did.
+    op.execute("""
+        UPDATE appointment_reminders SET
+            appointment_date = (SELECT date FROM appointments WHERE appointments.id = appointment_reminders.appointment_id),
+            appointment_time = (SELECT time FROM appointments WHERE appointments.id = appointment_reminders.appointment_id)
+    """)
+    op.execute("DELETE FROM appointment_reminders WHERE appointment_date IS NULL OR appointment_time IS NULL")
+
+    with op.batch_alter_table('appointment_reminders', schema=None) as batch_op:
+        batch_op.alter_column('appointment_date', existing_type=sa.Date(), nullable=False)
+        batch_op.alter_column('appointment_time', existing_type=sa.Time(), nullable=False)
+        batch_op.drop_constraint('uq_appointment_reminders_appointment_offset', type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_appointment_reminders_appointment_offset_slot',
+            ['appointment_id', 'offset_minutes', 'appointment_date', 'appointment_time'],
+        )
+
+
+def downgrade():
+    # Keep the latest reminder per (appointment, offset) so the old key holds
+    op.execute("""
+        DELETE FROM appointment_reminders WHERE EXISTS (
+            SELECT 1 FROM appointment_reminders AS later
+            WHERE later.appointment_id = appointment_reminders.appointment_id
+              AND later.offset_minutes = appointment_reminders.offset_minutes
+              AND later.id > appointment_reminders.id
+        )
+    """)
+    with op.batch_alter_table('appointment_reminders', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_appointment_reminders_appointment_offset_slot', type_='unique')
+        batch_op.create_unique_constraint('uq_appointment_reminders_appointment_offset', ['appointment_id', 'offset_minutes'])
+        batch_op.drop_column('appointment_time')
+        batch_op.drop_column('appointment_date')
@@ -0,0 +1,47 @@
+"""add doctor_patient_panel
+
+Revision ID: c5a2fa75f11d
+Revises: 2c8b2a9ec304
+Create Date: 2026-10-19 15:21:08.664190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a2fa75f11d'
+down_revision = '2c8b2a9ec304'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('doctor_patient_panel',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('first_visit', sa.Date(), nullable=True),
+    sa.Column('last_visit', sa.Date(), nullable=True),
+    sa.Column('visit_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id', 'patient_id')
+    )
+    with op.batch_alter_table('doctor_patient_panel', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_patient_panel_doctor_last_visit', ['doctor_id', 'last_visit'], unique=False)
+
+    # Backfill from existing appointments
+    op.execute("""
+        INSERT INTO doctor_patient_panel (doctor_id, patient_id, first_visit, last_visit, visit_count, updated_at)
+        SELECT doctor_id, patient_id, MIN(date), MAX(date), COUNT(id), CURRENT_TIMESTAMP
+        FROM appointments
+        GROUP BY doctor_id, patient_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('doctor_patient_panel', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_patient_panel_doctor_last_visit')
+
+    op.drop_table('doctor_patient_panel')
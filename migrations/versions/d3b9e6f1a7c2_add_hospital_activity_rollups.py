@@ -0,0 +1,105 @@
+"""add hospital activity rollups
+
+Revision ID: d3b9e6f1a7c2
+Revises: b7e3d9a1c4f8
+Create Date: 2026-10-19 22:04:13.517402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b9e6f1a7c2'
+down_revision = 'b7e3d9a1c4f8'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('pending', 'accepted', 'declined', 'completed')
+
+
+def _counter(name):
+    return sa.Column(name, sa.Integer(), server_default='0', nullable=False)
+
+
+def upgrade():
+    op.create_table('hospital_daily_activity',
+    sa.Column('hospital_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    *[_counter(f'appointments_{s}') for s in STATUSES],
+    _counter('prescriptions_issued'),
+    _counter('lab_tests_requested'),
+    _counter('lab_tests_completed'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hospital_id', 'day')
+    )
+    op.create_table('hospital_doctor_daily_activity',
+    sa.Column('hospital_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    *[_counter(f'appointments_{s}') for s in STATUSES],
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hospital_id', 'day', 'doctor_id')
+    )
+    op.create_table('hospital_hourly_appointments',
+    sa.Column('hospital_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('hour', sa.SmallInteger(), nullable=False),
+    _counter('appointments'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hospital_id', 'day', 'hour')
+    )
+
+    # Backfill from existing rows (same as `flask rebuild-activity-rollups`)
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    hour = 'EXTRACT(HOUR FROM time)' if postgres else "CAST(strftime('%H', time) AS INTEGER)"
+    counts = [f"SUM(CASE WHEN COALESCE(status, 'pending') = '{s}' THEN 1 ELSE 0 END)" for s in STATUSES]
+    by_status = ', '.join(counts)
+    zeros = ', '.join('0' for _ in STATUSES)
+    appointment_columns = ', '.join(f'appointments_{s}' for s in STATUSES)
+
+    op.execute(f"""
+        INSERT INTO hospital_daily_activity (hospital_id, day, {appointment_columns},
+            prescriptions_issued, lab_tests_requested, lab_tests_completed, updated_at)
+        SELECT hospital_id, day, {', '.join(f'SUM(appointments_{s})' for s in STATUSES)},
+            SUM(rx), SUM(requested), SUM(completed), CURRENT_TIMESTAMP
+        FROM (
+            SELECT hospital_id, date AS day, {', '.join(f'{c} AS appointments_{s}' for c, s in zip(counts, STATUSES))},
+                0 AS rx, 0 AS requested, 0 AS completed
+            FROM appointments GROUP BY hospital_id, date
+            UNION ALL
+            SELECT hospital_id, date(issued_date), {zeros}, COUNT(*), 0, 0
+            FROM prescriptions WHERE issued_date IS NOT NULL GROUP BY hospital_id, date(issued_date)
+            UNION ALL
+            SELECT hospital_id, date(date_requested), {zeros}, 0, COUNT(*), 0
+            FROM test_requests WHERE date_requested IS NOT NULL GROUP BY hospital_id, date(date_requested)
+            UNION ALL
+            SELECT hospital_id, date(date_completed), {zeros}, 0, 0, COUNT(*)
+            FROM test_requests WHERE status = 'Completed' AND date_completed IS NOT NULL
+            GROUP BY hospital_id, date(date_completed)
+        ) AS s
+        GROUP BY hospital_id, day
+    """)
+    op.execute(f"""
+        INSERT INTO hospital_doctor_daily_activity (hospital_id, day, doctor_id, {appointment_columns}, updated_at)
+        SELECT hospital_id, date, doctor_id, {by_status}, CURRENT_TIMESTAMP
+        FROM appointments
+        GROUP BY hospital_id, date, doctor_id
+    """)
+    op.execute(f"""
+        INSERT INTO hospital_hourly_appointments (hospital_id, day, hour, appointments, updated_at)
+        SELECT hospital_id, date, {hour}, COUNT(*), CURRENT_TIMESTAMP
+        FROM appointments
+        WHERE time IS NOT NULL
+        GROUP BY hospital_id, date, {hour}
+    """)
+
+
+def downgrade():
+    op.drop_table('hospital_hourly_appointments')
+    op.drop_table('hospital_doctor_daily_activity')
+    op.drop_table('hospital_daily_activity')
@@ -0,0 +1,35 @@
+"""move appointments to their doctor's hospital
+
+Revision ID: d7a2e5c9f3b1
+Revises: c3d8f1a6b4e2
+Create Date: 2026-10-20 16:02:51.730164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2e5c9f3b1'
+down_revision = 'c3d8f1a6b4e2'
+branch_labels = None
+depends_on = None
+
+
+# Appointments kept the hospital_id the patient booked with, so a doctor whose hospital differs
+# did not see them through the tenant filter. New ones are stamped by stamp_hospital.
+def upgrade():
+    op.execute("""
+        UPDATE appointments
+        SET hospital_id = (SELECT doctors.hospital_id FROM doctors WHERE doctors.id = appointments.doctor_id)
+        WHERE EXISTS (
+            SELECT 1 FROM doctors
+            WHERE doctors.id = appointments.doctor_id
+              AND doctors.hospital_id IS NOT NULL
+              AND doctors.hospital_id <> appointments.hospital_id
+        )
+    """)
+
+
+def downgrade():
+    pass  # the booked hospital_id is not kept
@@ -0,0 +1,41 @@
+"""add key_rotation_jobs
+
+Revision ID: e2a6f90c5b17
+Revises: b7d04e6a19f3
+Create Date: 2026-10-19 17:31:06.254870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a6f90c5b17'
+down_revision = 'b7d04e6a19f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('key_rotation_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('key_id', sa.String(length=12), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('rows_rotated', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('key_rotation_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_key_rotation_jobs_key_id'), ['key_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('key_rotation_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_key_rotation_jobs_key_id'))
+
+    op.drop_table('key_rotation_jobs')
@@ -0,0 +1,72 @@
+"""add doctor search tables
+
+Revision ID: f6a1c8d4e2b9
+Revises: d3b9e6f1a7c2
+Create Date: 2026-10-19 22:47:51.206338
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a1c8d4e2b9'
+down_revision = 'd3b9e6f1a7c2'
+branch_labels = None
+depends_on = None
+
+
+# The tables start empty: run `flask refresh-doctor-search` after upgrading. Scores need the
+# DOCTOR_* ranking settings and terms need the app's word normalization, so there is no SQL backfill.
+def upgrade():
+    op.create_table('doctor_search',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('hospital_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=150), nullable=True),
+    sa.Column('specialization', sa.String(length=100), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.Float(), nullable=False),
+    sa.Column('upcoming_appointments', sa.Integer(), nullable=False),
+    sa.Column('availability', sa.Float(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id')
+    )
+    with op.batch_alter_table('doctor_search', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_search_score', [sa.text('score DESC'), 'doctor_id'], unique=False)
+        batch_op.create_index('ix_doctor_search_hospital_score', ['hospital_id', sa.text('score DESC'), 'doctor_id'], unique=False)
+
+    op.create_table('doctor_search_terms',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id', 'token')
+    )
+    with op.batch_alter_table('doctor_search_terms', schema=None) as batch_op:
+        batch_op.create_index('ix_doctor_search_terms_token', ['token', 'doctor_id'], unique=False,
+                              postgresql_ops={'token': 'varchar_pattern_ops'})
+
+    # Per-doctor lookups made when a review or appointment refreshes a doctor's row
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_doctor_date', ['doctor_id', 'date'], unique=False)
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reviews_doctor_id'), ['doctor_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reviews_doctor_id'))
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_doctor_date')
+
+    with op.batch_alter_table('doctor_search_terms', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_search_terms_token')
+    op.drop_table('doctor_search_terms')
+
+    with op.batch_alter_table('doctor_search', schema=None) as batch_op:
+        batch_op.drop_index('ix_doctor_search_hospital_score')
+        batch_op.drop_index('ix_doctor_search_score')
+    op.drop_table('doctor_search')
@@ -0,0 +1,95 @@
+"""The app on a throwaway SQLite database, plus helpers to create accounts and sign requests."""
+from datetime import date, time
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.db import db
+from app.models import Doctor, Hospital, Patient, Pharmacy, Technician, User, Appointment
+from app.utils.tenancy import tenant_claims
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    for key, value in {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'medbeta.db'}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {},  # the defaults are Postgres connection options
+        "SQLALCHEMY_BINDS": {},
+        "SECRET_KEY": "test-secret",
+        "JWT_SECRET_KEY": "test-jwt-secret-of-at-least-32-bytes",
+        "ENCRYPTION_KEY": "ZmDfcTF7_60GrrY167zsiPd67pEvs0aGOv2oasOM1Pg=",
+        "REMINDER_SCHEDULER_ENABLED": False,
+    }.items():
+        monkeypatch.setattr(Config, key, value)
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(name, role):
+    user = User(name=name, email=f"{name}@medbeta.test", role=role)
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def make_hospital(name):
+    hospital = Hospital(user_id=make_user(f"{name}-admin", "hospital").id, name=name)
+    db.session.add(hospital)
+    db.session.flush()
+    return hospital
+
+
+def make_doctor(name, hospital=None):
+    doctor = Doctor(user_id=make_user(name, "doctor").id, hospital_id=hospital.id if hospital else None,
+                    license_number=f"L-{name}", specialization="gp")
+    db.session.add(doctor)
+    db.session.flush()
+    return doctor
+
+
+def make_pharmacy(name, hospital=None):
+    pharmacy = Pharmacy(user_id=make_user(name, "pharmacist").id, hospital_id=hospital.id if hospital else None, name=name)
+    db.session.add(pharmacy)
+    db.session.flush()
+    return pharmacy
+
+
+def make_technician(name, hospital=None):
+    technician = Technician(user_id=make_user(name, "technician").id, hospital_id=hospital.id if hospital else None)
+    db.session.add(technician)
+    db.session.flush()
+    return technician
+
+
+def make_patient(name):
+    patient = Patient(user_id=make_user(name, "patient").id)
+    db.session.add(patient)
+    db.session.flush()
+    return patient
+
+
+def make_appointment(patient, doctor, hospital_id, day=date(2026, 1, 2), at=time(9, 30), status="accepted"):
+    appointment = Appointment(patient_id=patient.id, doctor_id=doctor.id, hospital_id=hospital_id,
+                              date=day, time=at, status=status)
+    db.session.add(appointment)
+    db.session.flush()
+    return appointment
+
+
+def auth(user_id):
+    """Authorization header for a user, with the claims login would issue."""
+    user = db.session.get(User, user_id)
+    claims = {"role": user.role, **tenant_claims(db.session, user)}
+    return {"Authorization": "Bearer " + create_access_token(identity=str(user.id), additional_claims=claims)}
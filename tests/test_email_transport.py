@@ -0,0 +1,166 @@
+"""Email transport against a local HTTP stub of the provider API (no real provider calls)."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.utils import email_transport
+from app.utils.email_transport import (
+    BrevoTransport, CircuitBreaker, CircuitOpenError, EmailTransportError, SendGridTransport,
+)
+
+
+class StubProvider:
+    """Answers each POST with the next queued (status, headers), then 202; records every request body."""
+
+    def __init__(self):
+        self.responses = []
+        self.bodies = []
+        self.lock = threading.Lock()
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.bodies.append(body)
+                    status, headers = stub.responses.pop(0) if stub.responses else (202, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stub():
+    provider = StubProvider()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), provider.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    provider.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield provider
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(email_transport.time, "sleep", delays.append)
+    return delays
+
+
+def sendgrid(stub, **kwargs):
+    return SendGridTransport("key", "noreply@medbeta.test", base_url=stub.base_url, timeout=(1, 2), **kwargs)
+
+
+def test_retries_after_retry_after_delay(stub, sleeps):
+    stub.responses = [(429, {"Retry-After": "2"}), (503, {"Retry-After": "1"})]
+    response = sendgrid(stub).send("a@x.test", "Hi", "<p>hi</p>")
+
+    assert response.status_code == 202
+    assert len(stub.bodies) == 3
+    assert sleeps == [2.0, 1.0]
+
+
+def test_retry_after_is_capped_at_max_backoff(stub, sleeps):
+    stub.responses = [(429, {"Retry-After": "120"})]
+    sendgrid(stub, max_backoff=4.0).send("a@x.test", "Hi", "<p>hi</p>")
+
+    assert sleeps == [4.0]
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    stub.responses = [(503, {})] * 3
+    with pytest.raises(EmailTransportError, match="503"):
+        sendgrid(stub, max_retries=2).send("a@x.test", "Hi", "<p>hi</p>")
+
+    assert len(stub.bodies) == 3
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    stub.responses = [(400, {})]
+    with pytest.raises(EmailTransportError, match="400"):
+        sendgrid(stub).send("a@x.test", "Hi", "<p>hi</p>")
+
+    assert len(stub.bodies) == 1
+    assert sleeps == []
+
+
+def test_circuit_opens_fails_fast_and_recovers(stub):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    transport = sendgrid(stub, max_retries=0, breaker=breaker)
+    stub.responses = [(503, {})] * 2
+
+    for _ in range(2):
+        with pytest.raises(EmailTransportError):
+            transport.send("a@x.test", "Hi", "<p>hi</p>")
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        transport.send("a@x.test", "Hi", "<p>hi</p>")
+    assert len(stub.bodies) == 2  # the provider was not called
+
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    transport.send("a@x.test", "Hi", "<p>hi</p>")
+    assert breaker.state == "closed"
+    assert len(stub.bodies) == 3
+
+
+def test_failed_trial_call_reopens_circuit(stub):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    transport = sendgrid(stub, max_retries=0, breaker=breaker)
+    stub.responses = [(503, {}), (503, {})]
+
+    with pytest.raises(EmailTransportError):
+        transport.send("a@x.test", "Hi", "<p>hi</p>")
+    time.sleep(0.25)
+    with pytest.raises(EmailTransportError):
+        transport.send("a@x.test", "Hi", "<p>hi</p>")  # the half-open trial
+    assert breaker.state == "open"
+
+
+def test_send_batch_splits_into_chunks(stub, sleeps):
+    recipients = [(f"user{i}@x.test", {"name": f"User {i}"}) for i in range(5)]
+    failed = sendgrid(stub).send_batch("Invite", "<p>Hi {{ name }}</p>", recipients, chunk_size=2)
+
+    assert failed == []
+    assert [len(body["personalizations"]) for body in stub.bodies] == [2, 2, 1]
+    first = stub.bodies[0]
+    assert first["content"][0]["value"] == "<p>Hi {{name}}</p>"
+    assert first["personalizations"][1] == {"to": [{"email": "user1@x.test"}], "substitutions": {"{{name}}": "User 1"}}
+
+
+def test_send_batch_returns_emails_of_failed_chunks(stub, sleeps):
+    recipients = [(f"user{i}@x.test", {}) for i in range(5)]
+    stub.responses = [(202, {}), (400, {})]
+    failed = sendgrid(stub).send_batch("Invite", "<p>Hi</p>", recipients, chunk_size=2)
+
+    assert failed == ["user2@x.test", "user3@x.test"]
+    assert len(stub.bodies) == 3  # later chunks are still sent
+
+
+def test_batch_size_is_capped_at_provider_limit(stub, sleeps, monkeypatch):
+    monkeypatch.setattr(BrevoTransport, "max_batch", 3)
+    transport = BrevoTransport("key", "noreply@medbeta.test", base_url=stub.base_url, timeout=(1, 2))
+    recipients = [(f"user{i}@x.test", {"link": i}) for i in range(7)]
+    transport.send_batch("Invite", "<a href='{{link}}'>join</a>", recipients, chunk_size=100)
+
+    assert [len(body["messageVersions"]) for body in stub.bodies] == [3, 3, 1]
+    assert stub.bodies[0]["htmlContent"] == "<a href='{{params.link}}'>join</a>"
+    assert stub.bodies[0]["messageVersions"][0] == {"to": [{"email": "user0@x.test"}], "params": {"link": "0"}}
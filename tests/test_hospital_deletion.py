@@ -0,0 +1,92 @@
+"""Hospital deletion jobs: what happens to rows other hospitals still need."""
+from datetime import timedelta
+
+from app.db import db
+from app.models import Hospital, HospitalDeletionJob, Pharmacy, Prescription
+from app.utils.hospital_deletion import DELETION_LEASE, claim_hospital_deletion, run_hospital_deletion
+from app.utils.time import utc_now
+
+from conftest import auth, make_doctor, make_hospital, make_patient, make_pharmacy, make_user
+
+
+def delete_hospital(hospital_id):
+    job = HospitalDeletionJob(hospital_id=hospital_id, status="pending")
+    db.session.add(job)
+    db.session.commit()
+    assert claim_hospital_deletion(job.id)
+    return run_hospital_deletion(job.id, batch_size=2)
+
+
+def prescription_at(doctor, patient, pharmacy, *statuses):
+    prescription = Prescription(doctor_id=doctor.id, patient_id=patient.id, medication_details="amoxicillin")
+    db.session.add(prescription)
+    db.session.flush()
+    prescription.pharmacy_id = pharmacy.id
+    for status in statuses:
+        prescription.transition_to(status)
+    return prescription
+
+
+def test_prescriptions_in_progress_at_a_deleted_pharmacy_can_be_claimed_again(client):
+    closing, other = make_hospital("closing"), make_hospital("other")
+    closing_pharmacy, other_pharmacy = make_pharmacy("closing-pharmacy", closing), make_pharmacy("other-pharmacy", other)
+    doctor, patient = make_doctor("doc", other), make_patient("pat")
+    claimed = prescription_at(doctor, patient, closing_pharmacy, "claimed")
+    verified = prescription_at(doctor, patient, closing_pharmacy, "claimed", "verified")
+    dispensed = prescription_at(doctor, patient, closing_pharmacy, "claimed", "verified", "dispensed")
+    db.session.commit()
+    ids = claimed.id, verified.id, dispensed.id
+    closing_id, other_pharmacy_user = closing.id, other_pharmacy.user_id
+
+    job = delete_hospital(closing_id)
+    assert job.status == "completed"
+    assert job.deleted_counts["prescriptions_unclaimed"] == 3
+    db.session.expire_all()
+    assert db.session.get(Hospital, closing_id) is None
+
+    rows = {p.id: p for p in Prescription.query.filter(Prescription.id.in_(ids))}
+    for prescription_id in ids[:2]:
+        row = rows[prescription_id]
+        assert (row.pharmacy_id, row.status, row.claimed_at, row.verified_at) == (None, "issued", None, None)
+    assert (rows[ids[2]].pharmacy_id, rows[ids[2]].status) == (None, "dispensed")
+    assert rows[ids[2]].claimed_at is not None
+
+    for prescription_id in ids[:2]:
+        response = client.put(f"/prescriptions/{prescription_id}/claim", headers=auth(other_pharmacy_user))
+        assert response.status_code == 200, response.json
+    response = client.put(f"/prescriptions/{ids[2]}/claim", headers=auth(other_pharmacy_user))
+    assert response.status_code == 400
+
+    db.session.expire_all()
+    other_pharmacy_id = Pharmacy.query.filter_by(user_id=other_pharmacy_user).one().id
+    assert {p.status for p in Prescription.query.filter_by(pharmacy_id=other_pharmacy_id)} == {"claimed"}
+
+
+def test_a_job_is_claimed_by_one_worker_at_a_time(app, client, monkeypatch):
+    started = []
+    monkeypatch.setattr("app.routes.hospital.start_hospital_deletion", lambda app, job_id: started.append(job_id))
+    superadmin = make_user("root", "superadmin")
+    job = HospitalDeletionJob(hospital_id=make_hospital("closing").id, status="failed")
+    db.session.add(job)
+    db.session.commit()
+    job_id, headers = job.id, auth(superadmin.id)
+
+    assert client.post(f"/hospitals/deletion-jobs/{job_id}/resume", headers=headers).status_code == 202
+    assert client.post(f"/hospitals/deletion-jobs/{job_id}/resume", headers=headers).status_code == 409
+    assert started == [job_id]
+    assert not claim_hospital_deletion(job_id)
+
+    result = app.test_cli_runner().invoke(args=["resume-hospital-deletions"])
+    assert f"Skipping job {job_id}" in result.output
+    assert db.session.get(HospitalDeletionJob, job_id).status == "running"
+
+
+def test_a_silent_running_job_can_be_taken_over(app):
+    job = HospitalDeletionJob(hospital_id=make_hospital("closing").id, status="running",
+                              updated_at=utc_now() - DELETION_LEASE - timedelta(minutes=1))
+    db.session.add(job)
+    db.session.commit()
+
+    assert claim_hospital_deletion(job.id)
+    assert not claim_hospital_deletion(job.id)
+    assert run_hospital_deletion(job.id).status == "completed"
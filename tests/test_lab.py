@@ -0,0 +1,29 @@
+"""Lab result updates from a technician."""
+from app.db import db
+from app.models import LabResultValue
+from app.models import TestRequest as LabTest  # not a test class
+
+from conftest import auth, make_doctor, make_hospital, make_patient, make_technician
+
+
+def test_new_results_text_replaces_parsed_values(client):
+    hospital = make_hospital("general")
+    technician = make_technician("tech", hospital)
+    test = LabTest(test_name="CBC", doctor_id=make_doctor("doc", hospital).id, patient_id=make_patient("pat").id,
+                   technician_id=technician.id)
+    db.session.add(test)
+    db.session.commit()
+    url, headers = f"/labtests/{test.id}/update", auth(technician.user_id)
+
+    response = client.post(url, json={"results": "HGB: 13.5 g/dL (12-16)\nWBC: 6.1"}, headers=headers)
+    assert [v["analyte"] for v in response.json["values"]] == ["HGB", "WBC"]
+
+    response = client.post(url, json={"results": "Sample haemolysed, see attached report"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json["values"] == []
+    assert LabResultValue.query.count() == 0
+
+    # A status-only update keeps the values
+    client.post(url, json={"results": "GLU: 5.2 mmol/L"}, headers=headers)
+    response = client.post(url, json={"status": "Completed"}, headers=headers)
+    assert [v["analyte"] for v in response.json["values"]] == ["GLU"]
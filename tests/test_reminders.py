@@ -0,0 +1,39 @@
+"""Appointment reminders across a reschedule and a scheduler restart."""
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.db import db
+from app.models import Appointment, AppointmentReminder
+from app.utils import reminders
+from app.utils.reminders import ReminderScheduler
+
+from conftest import make_appointment, make_doctor, make_hospital, make_patient
+
+
+@pytest.fixture(autouse=True)
+def no_email(monkeypatch):
+    monkeypatch.setattr(reminders, "drain_outbox", lambda: (0, 0))
+
+
+def test_rescheduled_appointment_is_reminded_for_its_new_slot(app):
+    hospital = make_hospital("general")
+    appointment = make_appointment(make_patient("pat"), make_doctor("doc", hospital), hospital.id, day=date(2030, 1, 2), at=time(10, 0))
+    db.session.commit()
+    appointment_id = appointment.id
+    scheduler = ReminderScheduler(app, offsets="60")
+    first = scheduler.appointment_at(date(2030, 1, 2), time(10, 0))
+
+    assert scheduler.tick(first - timedelta(minutes=30)) == 1
+
+    appointment = db.session.get(Appointment, appointment_id)
+    appointment.date = date(2030, 1, 3)
+    db.session.commit()
+    second = scheduler.appointment_at(date(2030, 1, 3), time(10, 0))
+
+    assert scheduler.tick(second - timedelta(minutes=30)) == 1
+    sent = AppointmentReminder.query.filter_by(appointment_id=appointment_id).order_by(AppointmentReminder.id)
+    assert [(r.appointment_date, r.offset_minutes) for r in sent] == [(date(2030, 1, 2), 60), (date(2030, 1, 3), 60)]
+
+    # A restarted scheduler does not send the new slot's reminder again
+    assert ReminderScheduler(app, offsets="60").tick(second - timedelta(minutes=20)) == 0
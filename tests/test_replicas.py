@@ -0,0 +1,131 @@
+"""Read-replica routing with a primary and a replica SQLite file holding different rows."""
+import pytest
+import sqlalchemy as sa
+from flask import Flask, jsonify
+
+from app.db import db
+from app.utils.replicas import ReplicaRouter, use_primary
+
+# Not part of the app's models: the same table exists in both files with a different row,
+# so a response shows which database answered.
+metadata = sa.MetaData()
+origin = sa.Table("origin", metadata, sa.Column("id", sa.Integer, primary_key=True), sa.Column("name", sa.String))
+
+
+def read_origin():
+    return db.session.execute(sa.select(origin.c.name).order_by(origin.c.id)).scalars().all()
+
+
+@pytest.fixture
+def app(tmp_path):
+    urls = {"primary": f"sqlite:///{tmp_path / 'primary.db'}", "replica": f"sqlite:///{tmp_path / 'replica.db'}"}
+    for name, url in urls.items():
+        engine = sa.create_engine(url)
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(origin.insert(), {"name": name})
+        engine.dispose()
+
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=urls["primary"],
+        SQLALCHEMY_BINDS={"replica_0": urls["replica"]},
+        REPLICA_MAX_LAG_SECONDS=5.0,
+        REPLICA_CHECK_SECONDS=60.0,
+    )
+    db.init_app(app)
+    app.extensions["replica_router"] = ReplicaRouter.from_app(app)
+
+    @app.route("/origin", methods=["GET", "POST"])
+    def get_origin():
+        return jsonify(read_origin())
+
+    @app.get("/origin/primary")
+    @use_primary
+    def get_origin_from_primary():
+        return jsonify(read_origin())
+
+    @app.get("/origin/after-write")
+    def read_after_write():
+        before = read_origin()
+        db.session.execute(origin.insert().values(name="written"))
+        return jsonify({"before": before, "after": read_origin()})
+
+    @app.get("/origin/locked")
+    def read_for_update():
+        return jsonify(db.session.execute(sa.select(origin.c.name).with_for_update()).scalars().all())
+
+    @app.teardown_appcontext
+    def remove_session(exception=None):
+        db.session.remove()
+
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    db.metadatas.pop("replica_0", None)  # init_app registered the bind on the shared db
+
+
+@pytest.fixture
+def router(app):
+    return app.extensions["replica_router"]
+
+
+def test_get_reads_from_replica(app):
+    assert app.test_client().get("/origin").json == ["replica"]
+
+
+def test_non_get_reads_from_primary(app):
+    assert app.test_client().post("/origin").json == ["primary"]
+
+
+def test_outside_requests_reads_from_primary(app):
+    with app.app_context():
+        assert read_origin() == ["primary"]
+
+
+def test_use_primary_keeps_view_on_primary(app):
+    assert app.test_client().get("/origin/primary").json == ["primary"]
+
+
+def test_reads_after_a_write_stay_on_primary(app):
+    response = app.test_client().get("/origin/after-write").json
+    assert response == {"before": ["replica"], "after": ["primary", "written"]}
+
+
+def test_select_for_update_goes_to_primary(app):
+    assert app.test_client().get("/origin/locked").json == ["primary"]
+
+
+def test_lagging_replica_falls_back_to_primary(app, router):
+    probes = []
+    router.lag_probe = lambda conn: probes.append(conn) or 30.0
+    client = app.test_client()
+
+    assert client.get("/origin").json == ["primary"]
+    assert client.get("/origin").json == ["primary"]
+    assert len(probes) == 1  # health is cached for REPLICA_CHECK_SECONDS
+
+    router.lag_probe = lambda conn: 1.0
+    assert client.get("/origin").json == ["primary"]  # still cached as lagging
+    router.reset()
+    assert client.get("/origin").json == ["replica"]
+
+
+def test_unreachable_replica_falls_back_to_primary(app, router):
+    def unreachable(conn):
+        raise sa.exc.OperationalError("probe", {}, Exception("connection refused"))
+
+    router.lag_probe = unreachable
+    assert app.test_client().get("/origin").json == ["primary"]
+
+
+def test_replicas_are_used_round_robin(tmp_path):
+    router = ReplicaRouter(["replica_0", "replica_1"], lag_probe=lambda conn: 0.0)
+    engines = {key: sa.create_engine(f"sqlite:///{tmp_path / key}.db") for key in router.bind_keys}
+
+    assert [router.pick(engines) for _ in range(4)] == ["replica_0", "replica_1", "replica_0", "replica_1"]
+
+    router.lag_probe = lambda conn: 30.0
+    router.reset()
+    assert router.pick(engines) is None
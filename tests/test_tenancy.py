@@ -0,0 +1,104 @@
+"""The hospital tenant filter: which clinical rows each kind of account sees."""
+from contextlib import contextmanager
+
+import pytest
+from flask import g
+from flask_jwt_extended import verify_jwt_in_request
+
+from app.db import db
+from app.models import AccessLog, Appointment, MedicalRecord, Prescription
+from app.models import TestRequest as LabTest  # not a test class
+
+from conftest import auth, make_appointment, make_doctor, make_hospital, make_patient, make_technician, make_user
+
+SCOPED = (MedicalRecord, Prescription, Appointment, AccessLog)
+
+
+@contextmanager
+def signed_in(app, user_id):
+    """Run queries as `user_id`, the way a request carrying their token does."""
+    g.pop("tenant_hospital_id", None)  # g belongs to the fixture's app context, which outlives requests
+    with app.test_request_context(headers=auth(user_id)):
+        verify_jwt_in_request()
+        try:
+            yield
+        finally:
+            g.pop("tenant_hospital_id", None)
+
+
+def write_for(doctor, patient):
+    db.session.add_all([
+        MedicalRecord(patient_id=patient.id, doctor_id=doctor.id),
+        Prescription(patient_id=patient.id, doctor_id=doctor.id, medication_details="amoxicillin"),
+        AccessLog(doctor_id=doctor.id, patient_id=patient.id, purpose="viewed record"),
+    ])
+
+
+@pytest.fixture
+def tenants(app):
+    a, b = make_hospital("a"), make_hospital("b")
+    doctor_a, doctor_b = make_doctor("doc-a", a), make_doctor("doc-b", b)
+    patient = make_patient("pat")
+    for doctor, hospital in ((doctor_a, a), (doctor_b, b)):
+        write_for(doctor, patient)
+        make_appointment(patient, doctor, hospital.id)
+    db.session.commit()
+    return {
+        "a": a.id, "b": b.id, "doctor_a": doctor_a.user_id, "doctor_b": doctor_b.user_id,
+        "technician_b": make_technician("tech-b", b).user_id, "patient": patient.user_id,
+    }
+
+
+def hospitals_seen(model):
+    return sorted(row.hospital_id for row in model.query.all())
+
+
+def test_staff_only_see_their_hospitals_rows(app, tenants):
+    for user, hospital in (("doctor_a", "a"), ("doctor_b", "b"), ("technician_b", "b")):
+        with signed_in(app, tenants[user]):
+            for model in SCOPED:
+                assert hospitals_seen(model) == [tenants[hospital]], (user, model.__name__)
+
+    with signed_in(app, tenants["doctor_a"]):
+        changed = Prescription.query.update({"medication_details": "ibuprofen"}, synchronize_session=False)
+        assert changed == 1
+    db.session.expire_all()
+    assert {p.hospital_id: p.medication_details for p in Prescription.query} == {
+        tenants["a"]: "ibuprofen", tenants["b"]: "amoxicillin",
+    }
+
+
+def test_unassigned_staff_only_see_rows_without_a_hospital(app, tenants):
+    unassigned = make_doctor("doc-none")
+    db.session.add(AccessLog(doctor_id=unassigned.id, purpose="viewed record"))
+    db.session.commit()
+
+    with signed_in(app, unassigned.user_id):
+        assert hospitals_seen(AccessLog) == [None]
+        for model in (MedicalRecord, Prescription, Appointment):
+            assert model.query.all() == []
+
+
+def test_admins_and_patients_are_not_scoped(app, tenants):
+    admin = make_user("root", "admin")
+    db.session.commit()
+    for user_id in (admin.id, tenants["patient"]):
+        with signed_in(app, user_id):
+            for model in (MedicalRecord, Prescription, Appointment):
+                assert hospitals_seen(model) == sorted([tenants["a"], tenants["b"]])
+
+
+def test_new_rows_take_their_doctors_hospital(app):
+    a, b = make_hospital("a"), make_hospital("b")
+    doctor, patient = make_doctor("doc", b), make_patient("pat")
+    write_for(doctor, patient)
+    test = LabTest(test_name="CBC", doctor_id=doctor.id, patient_id=patient.id)
+    db.session.add(test)
+    # Booked under the patient's choice of hospital, which is not the doctor's
+    appointment = make_appointment(patient, doctor, a.id)
+    db.session.commit()
+
+    for model in (MedicalRecord, Prescription, AccessLog, LabTest, Appointment):
+        assert hospitals_seen(model) == [b.id], model.__name__
+    with signed_in(app, doctor.user_id):
+        assert [row.id for row in Appointment.query] == [appointment.id]